@@ -7,18 +7,21 @@ import os
 import threading
 import socket
 import json
+import logging
 import time
 from http.server import HTTPServer, SimpleHTTPRequestHandler
 from functools import partial
 from contextlib import contextmanager
-from models import User, LostAnimal, FoundReport, session_scope
 
 # ************************************************************
 # 1. IMPORTAÇÃO DE DEPENDÊNCIAS
 # ************************************************************
 
-from models import User, LostAnimal, FoundReport, session_scope 
+from models import User, LostAnimal, FoundReport, session_scope, unit_of_work, page_scope_key
 from services.geocoding import geocode_address # Exemplo de importação
+from services.post_repository import get_post, delete_post, user_posts
+from services.db_executor import run_in_background
+from services.image_server import start_image_server
 
 def create_flet_map(center_lat, center_lon, markers=None, on_click_handler=None, zoom=15):
     """Cria um ft.Map com o centro e marcadores especificados."""
@@ -99,59 +102,33 @@ def main(page: ft.Page):
     
     def _handle_edit_post_logic(item_id, is_lost):
         """
-        Define o ID do item a ser editado no estado, CARREGA OS DADOS SERIALIZADOS
-        PARA UM DICIONÁRIO e navega para o formulário de registro.
-        (CORREÇÃO DO DetachedInstanceError)
+        Define o ID do item a ser editado no estado, CARREGA OS DADOS (PostDetail
+        -> dicionário do formulário) e navega para o formulário de registro.
         """
         state["edit_lost_id"] = None
         state["edit_found_id"] = None
         state["post_data_for_edit"] = None 
         
         try:
-            with session_scope() as s:
-                current_user_id = state["current_user"]["id"]
-                post = None
-
-                if is_lost:
-                    # 1. Busca o LostAnimal
-                    post = s.query(LostAnimal).filter_by(id=item_id, owner_id=current_user_id).first()
-                    if post:
-                        # 2. Serializa o objeto para dicionário ANTES da sessão fechar
-                        state["post_data_for_edit"] = {
-                            'id': post.id, 
-                            'name': post.name, 
-                            'species': post.species, 
-                            'lost_location': post.lost_location, 
-                            'desc_animal': post.desc_animal, 
-                            'contact': post.contact, 
-                            'latitude': post.latitude, 
-                            'longitude': post.longitude, 
-                            'image_url': post.image_url
-                        }
-                        state["edit_lost_id"] = item_id # Mantém o ID como flag
-                        route_logics['lost_reg']() 
-                    else:
-                        show_snack("Postagem de animal perdido não encontrada ou não pertence a você.", is_error=True)
+            current_user_id = state["current_user"]["id"]
+            # PostDetail vem de um SELECT só de colunas: não há objeto ORM
+            # preso à sessão, então não existe DetachedInstanceError aqui
+            post = get_post("lost" if is_lost else "found", item_id, owner_id=current_user_id)
+
+            if is_lost:
+                if post:
+                    state["post_data_for_edit"] = post.as_form_data()
+                    state["edit_lost_id"] = item_id # Mantém o ID como flag
+                    route_logics['lost_reg']()
                 else:
-                    # 1. Busca o FoundReport
-                    post = s.query(FoundReport).filter_by(id=item_id, finder_id=current_user_id).first()
-                    if post:
-                        # 2. Serializa o objeto para dicionário ANTES da sessão fechar
-                        state["post_data_for_edit"] = {
-                            'id': post.id, 
-                            'species': post.species, 
-                            'found_description': post.found_description, 
-                            'found_location': post.found_location,
-                            # Converte data para string para evitar DetachedInstanceError
-                            'found_date': str(post.found_date) if post.found_date else "", 
-                            'latitude': post.latitude, 
-                            'longitude': post.longitude, 
-                            'image_url': post.image_url
-                        }
-                        state["edit_found_id"] = item_id # Mantém o ID como flag
-                        route_logics['found_reg']() 
-                    else:
-                        show_snack("Relato de animal encontrado não encontrado ou não pertence a você.", is_error=True)
+                    show_snack("Postagem de animal perdido não encontrada ou não pertence a você.", is_error=True)
+            else:
+                if post:
+                    state["post_data_for_edit"] = post.as_form_data()
+                    state["edit_found_id"] = item_id # Mantém o ID como flag
+                    route_logics['found_reg']()
+                else:
+                    show_snack("Relato de animal encontrado não encontrado ou não pertence a você.", is_error=True)
         except Exception as e:
             print(f"Erro ao carregar dados para edição: {e}")
             show_snack(f"Erro ao carregar dados para edição: {e}", is_error=True)
@@ -162,33 +139,43 @@ def main(page: ft.Page):
         # Retorna a lambda que será o handler de click para o IconButton
         return lambda e: _handle_edit_post_logic(item_id, is_lost)
         
+    def set_busy(flag):
+        """Mostra/esconde a barra de progresso global enquanto há trabalho em background."""
+        page.splash = ft.ProgressBar() if flag else None
+        page.update()
+
     def _handle_delete_post_logic(item_id, is_lost):
-        """Exclui o post e recarrega a tela de Meus Posts."""
-        success_message = None 
-        
-        try:
-            with session_scope() as s:
-                current_user_id = state["current_user"]["id"]
-                
-                # Usando synchronize_session='fetch' para garantir que o BD atualize
-                if is_lost:
-                    s.query(LostAnimal).filter_by(id=item_id, owner_id=current_user_id).delete(synchronize_session='fetch')
-                    success_message = "Animal perdido excluído com sucesso."
-                else:
-                    s.query(FoundReport).filter_by(id=item_id, finder_id=current_user_id).delete(synchronize_session='fetch')
-                    success_message = "Relato de animal encontrado excluído com sucesso."
-            
-            # 1. Recarrega a view de posts APÓS a sessão ser fechada (com commit)
-            route_logics['my_posts']() 
-            
+        """Exclui o post (fora da thread do evento) e recarrega a tela de Meus Posts."""
+        current_user_id = state["current_user"]["id"]
+        success_message = (
+            "Animal perdido excluído com sucesso." if is_lost
+            else "Relato de animal encontrado excluído com sucesso."
+        )
+
+        def delete_and_reload():
+            # Exclusão numa unidade de trabalho curta: o lock de escrita do
+            # SQLite só fica preso durante o DELETE, não enquanto a tela é montada
+            with unit_of_work(page_scope_key(page)):
+                delete_post("lost" if is_lost else "found", item_id, current_user_id)
+            # A lista atualizada segue para on_done (a consulta já enxerga a exclusão)
+            return user_posts(current_user_id)
+
+        def on_done(posts):
+            set_busy(False)
+            # 1. Recarrega a view de posts com a lista já consultada
+            state["my_posts_data"] = posts
+            route_logics['my_posts']()
             # 2. Exibe o snackbar APÓS a view ser recarregada
-            if success_message:
-                 show_snack(success_message)
-                 
-        except Exception as ex:
+            show_snack(success_message)
+
+        def on_error(ex):
+            set_busy(False)
             print(f"Erro ao excluir postagem: {ex}")
             show_snack("Erro ao excluir postagem. Verifique se o item existe.", is_error=True)
 
+        set_busy(True)
+        run_in_background(delete_and_reload, on_done=on_done, on_error=on_error)
+
     def create_delete_handler(item_id, is_lost):
         # Retorna a lambda que será o handler de click para o IconButton
         return lambda e: _handle_delete_post_logic(item_id, is_lost)
@@ -236,4 +223,8 @@ def main(page: ft.Page):
 
 
 if __name__ == "__main__":
+    # Log amostrado de SQL (logger "siara.sql") e demais avisos no console
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    # Fotos servidas com ETag/Range/cache imutável (services/image_server.py)
+    start_image_server()
     ft.app(target=main, assets_dir="static")
\ No newline at end of file
@@ -1,22 +1,68 @@
-from sqlalchemy import create_engine, Column, Integer, String, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, ForeignKey, Float, DateTime, Index, func, inspect
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship, sessionmaker
+from sqlalchemy.orm import relationship, sessionmaker, scoped_session
+from sqlalchemy.schema import CreateIndex
 from contextlib import contextmanager
+import contextvars
+import threading
+from datetime import datetime
 # Use system bcrypt (install with pip install bcrypt)
 import bcrypt
 
-CONN = 'sqlite:///siara.db'
+from services.db_engine import make_engine
 
-engine = create_engine(CONN, echo=True)
-Session = sessionmaker(bind=engine)
-session = Session()
+# Perfil (dev/prod/test) escolhido por SIARA_DB_PROFILE; ver services/db_engine.py
+engine = make_engine()
+CONN = str(engine.url)
 Base = declarative_base()
 
+# Uma única fábrica de sessões para o processo inteiro
+SessionFactory = sessionmaker(bind=engine)
+
+# Chave da unidade de trabalho ativa no contexto atual (ver unit_of_work)
+_current_uow = contextvars.ContextVar("siara_unit_of_work", default=None)
+
+
+def _session_scope_key():
+    key = _current_uow.get()
+    return key if key is not None else ("thread", threading.get_ident())
+
+
+# Registro thread-safe: cada unidade de trabalho (ou thread, fora de uma)
+# enxerga a sua própria Session
+Session = scoped_session(SessionFactory, scopefunc=_session_scope_key)
+
+
+def page_scope_key(page):
+    """
+    Chave de unidade de trabalho de uma página Flet.
+
+    Inclui a thread: o Flet pode disparar dois handlers da mesma página em
+    threads diferentes, e uma Session não pode ser compartilhada entre elas.
+    """
+    page_id = getattr(page, "session_id", None) or id(page)
+    return ("page", page_id, threading.get_ident())
+
+
 @contextmanager
-def session_scope():
-    """Provide a transactional scope around a series of operations."""
-    SessionLocal = sessionmaker(bind=engine)
-    s = SessionLocal()
+def unit_of_work(scope_key=None):
+    """
+    Unidade de trabalho de uma ação do usuário: todas as operações de banco
+    dentro do bloco (inclusive as feitas via session_scope por serviços e
+    repositórios) usam a mesma Session, conexão e transação, com um único
+    commit no final — ou rollback se algo falhar.
+
+    Blocos aninhados reaproveitam a unidade externa; só a mais externa faz
+    commit e devolve a conexão ao pool.
+
+    :param scope_key: chave do registro, ex.: page_scope_key(page).
+    """
+    if _current_uow.get() is not None:
+        yield Session()
+        return
+
+    token = _current_uow.set(scope_key if scope_key is not None else ("uow", threading.get_ident()))
+    s = Session()
     try:
         yield s
         s.commit()
@@ -24,7 +70,18 @@ def session_scope():
         s.rollback()
         raise
     finally:
-        s.close()
+        Session.remove()
+        _current_uow.reset(token)
+
+
+@contextmanager
+def session_scope():
+    """Provide a transactional scope around a series of operations.
+
+    Dentro de um unit_of_work, participa da transação dele em vez de abrir outra.
+    """
+    with unit_of_work() as s:
+        yield s
 
 class User(Base):
     __tablename__ = 'users'
@@ -84,7 +141,10 @@ class LostAnimal(Base):
     # REINTRODUZIDO: NOVO CAMPO PARA O URL DA IMAGEM
     image_url = Column(String)
 
-    owner_id = Column(Integer, ForeignKey('users.id'), nullable=True)
+    # data de criação (ordenação/paginação do feed)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    owner_id = Column(Integer, ForeignKey('users.id'), nullable=True, index=True)
     owner = relationship("User", back_populates="lost_animals")
 
     def __repr__(self):
@@ -105,11 +165,74 @@ class FoundReport(Base):
     # REINTRODUZIDO: NOVO CAMPO PARA O URL DA IMAGEM
     image_url = Column(String)
 
-    finder_id = Column(Integer, ForeignKey('users.id'), nullable=True)
+    # data de criação (ordenação/paginação do feed)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    finder_id = Column(Integer, ForeignKey('users.id'), nullable=True, index=True)
     finder = relationship("User", back_populates="found_reports")
 
     def __repr__(self):
         return f"<FoundReport(id={self.id}, found_location='{self.found_location}', finder_id={self.finder_id})>"
 
+# Índices de expressão para o filtro de espécie do feed (services/feed_query.py)
+Index("ix_lost_animals_species_lower", func.lower(LostAnimal.species))
+Index("ix_found_reports_species_lower", func.lower(FoundReport.species))
+
+# Índices da ordenação cronológica do feed (paginação por cursor)
+Index("ix_lost_animals_created", LostAnimal.created_at, LostAnimal.id)
+Index("ix_found_reports_created", FoundReport.created_at, FoundReport.id)
+
+# Busca de posts por foto (contadores de image_blobs, coletor de órfãos,
+# índice de fotos parecidas)
+Index("ix_lost_animals_image_url", LostAnimal.image_url)
+Index("ix_found_reports_image_url", FoundReport.image_url)
+
+# Registros anteriores à coluna created_at ficam no início dos tempos
+LEGACY_CREATED_AT = datetime(1970, 1, 1)
+
+
+def _add_missing_columns(engine):
+    """ALTER TABLE ADD COLUMN para colunas novas em tabelas que já existiam."""
+    insp = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {c["name"] for c in insp.get_columns(table.name)}
+            for col in table.columns:
+                if col.name in existing:
+                    continue
+                col_type = col.type.compile(dialect=engine.dialect)
+                conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {col.name} {col_type}")
+                if col.name == "created_at":
+                    conn.execute(table.update().values(created_at=LEGACY_CREATED_AT))
+
+
 # Ensure tables exist / create new columns for newly created DBs
-Base.metadata.create_all(engine)
\ No newline at end of file
+Base.metadata.create_all(engine)
+_add_missing_columns(engine)
+
+# create_all só cria índices junto com tabelas novas; em bancos existentes
+# os índices adicionados depois precisam ser criados um a um
+with engine.begin() as _conn:
+    for _table in Base.metadata.sorted_tables:
+        for _index in _table.indexes:
+            _conn.execute(CreateIndex(_index, if_not_exists=True))
+
+# Índice espacial (R*Tree) sobre latitude/longitude, mantido por triggers
+from services.spatial_index import ensure_spatial_index
+ensure_spatial_index(engine)
+
+# Índice de texto completo (FTS5) para a busca do feed, mantido por triggers
+from services.search_index import ensure_search_index
+ensure_search_index(engine)
+
+# View `posts`: perdidos + encontrados numa só projeção (UNION ALL)
+from services.posts_read_model import ensure_posts_view
+ensure_posts_view(engine)
+
+# Contadores de referência das fotos no store endereçado por conteúdo
+from services.image_refs import ensure_image_refs
+ensure_image_refs(engine)
+
+# Hashes perceptuais das fotos (busca de fotos parecidas)
+from services.photo_hash import ensure_photo_hashes
+ensure_photo_hashes(engine)
@@ -0,0 +1,157 @@
+# services/autocomplete.py
+"""
+Sugestões de endereço enquanto o usuário digita.
+
+As sugestões vêm só de fontes locais — o gazetteer offline e os endereços
+já resolvidos no cache persistente de geocodificação — então nenhuma tecla
+gera chamada ao Nominatim. Cada campo usa um AddressAutocomplete: os
+pedidos são agrupados por um debounce e uma resposta atrasada (de um texto
+que o usuário já mudou) é descartada.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from services.gazetteer import gazetteer, normalize
+from services.geocode_cache import geocode_cache
+
+AUTOCOMPLETE_DEBOUNCE = float(os.environ.get("SIARA_AUTOCOMPLETE_DEBOUNCE", "0.25"))
+MIN_PREFIX_CHARS = 3
+SUGGESTION_LIMIT = 8
+
+_PREFIX_CACHE_SIZE = 512
+_PREFIX_CACHE_TTL = 60.0
+
+
+class AddressSuggestion(NamedTuple):
+    label: str
+    lat: float
+    lon: float
+
+
+class _PrefixCache:
+    """
+    LRU prefixo -> sugestões. Uma entrada marcada como completa (nenhuma
+    fonte chegou ao próprio limite) contém todas as respostas possíveis
+    para o prefixo, então um prefixo mais longo basta filtrá-la.
+    """
+
+    def __init__(self, max_entries=_PREFIX_CACHE_SIZE, ttl=_PREFIX_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()   # prefixo normalizado -> (expira_em, sugestões, completa)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            for end in range(len(key), MIN_PREFIX_CHARS - 1, -1):
+                entry = self._entries.get(key[:end])
+                if entry is None or entry[0] < now:
+                    continue
+                self._entries.move_to_end(key[:end])
+                _, suggestions, complete = entry
+                if end == len(key):
+                    return suggestions
+                if complete:
+                    return [s for s in suggestions if normalize(s.label).startswith(key)]
+        return None
+
+    def put(self, key, suggestions, complete):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, suggestions, complete)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_prefix_cache = _PrefixCache()
+
+
+def suggest_addresses(text, limit=SUGGESTION_LIMIT):
+    """Até `limit` AddressSuggestion para o texto digitado (só fontes locais)."""
+    key = normalize(text)
+    if len(key) < MIN_PREFIX_CHARS:
+        return []
+    cached = _prefix_cache.get(key)
+    if cached is not None:
+        return cached[:limit]
+
+    suggestions = []
+    seen = set()
+    # Completa só se cada fonte devolveu menos linhas que o próprio limite
+    # (antes de filtrar e tirar repetidas): senão pode haver mais respostas
+    complete = True
+    if gazetteer is not None:
+        rows = gazetteer.prefix_search(key, limit)
+        complete = len(rows) < limit
+        for label, lat, lon in rows:
+            seen.add(normalize(label))
+            suggestions.append(AddressSuggestion(label, lat, lon))
+    if len(suggestions) < limit:
+        # Busca sem acentos nas chaves do cache de geocodificação
+        rows = geocode_cache.prefix("forward", text, limit)
+        complete = complete and len(rows) < limit
+        for label, (lat, lon) in rows:
+            folded = normalize(label)
+            if folded not in seen and folded.startswith(key):
+                if len(suggestions) >= limit:
+                    complete = False
+                    break
+                seen.add(folded)
+                suggestions.append(AddressSuggestion(label, lat, lon))
+    else:
+        complete = False
+
+    _prefix_cache.put(key, suggestions, complete)
+    return suggestions
+
+
+class AddressAutocomplete:
+    """
+    Debounce por campo de texto.
+
+    :param on_suggestions: chamado com a lista de AddressSuggestion (numa
+        thread de timer) só para o texto mais recente.
+    """
+
+    def __init__(self, on_suggestions, debounce=AUTOCOMPLETE_DEBOUNCE, limit=SUGGESTION_LIMIT):
+        self.on_suggestions = on_suggestions
+        self.debounce = debounce
+        self.limit = limit
+        self._timer = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def update(self, text):
+        """Registra o texto atual; o pedido anterior ainda pendente é cancelado."""
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.debounce, self._fire, args=(text, generation))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def cancel(self):
+        """Descarta o pedido pendente (ex.: ao escolher uma sugestão ou sair da tela)."""
+        with self._lock:
+            self._generation += 1
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _fire(self, text, generation):
+        if generation != self._generation:
+            return
+        try:
+            suggestions = suggest_addresses(text, self.limit)
+        except Exception as e:
+            print(f"Erro no autocomplete de endereço: {e}")
+            return
+        # O texto pode ter mudado durante a consulta
+        if generation == self._generation:
+            self.on_suggestions(suggestions)
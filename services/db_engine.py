@@ -0,0 +1,145 @@
+# services/db_engine.py
+"""
+Fábrica de engine do SQLAlchemy com perfis nomeados (dev / prod / test).
+
+Cada perfil define a URL, os PRAGMAs aplicados em toda conexão nova do
+SQLite (WAL, synchronous, mmap, cache, busy_timeout), a classe de pool e a
+amostragem do log de SQL. O perfil vem de SIARA_DB_PROFILE (padrão "dev");
+SIARA_DB_URL sobrescreve a URL do perfil.
+
+O log de SQL vai para o logger "siara.sql" em vez de `echo=True`: uma fração
+das instruções é registrada (sample_rate) e as lentas (>= slow_ms) sempre.
+Textos e blobs dos parâmetros nunca aparecem no log (só tipo e tamanho):
+linhas de usuário, hashes de senha e imagens ficam fora do console.
+"""
+import logging
+import os
+import random
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool, StaticPool
+
+sql_logger = logging.getLogger("siara.sql")
+
+_FILE_PRAGMAS = {
+    "journal_mode": "WAL",          # leitores não bloqueiam o escritor
+    "synchronous": "NORMAL",        # seguro com WAL, sem fsync a cada commit
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,       # negativo = KiB (64 MiB)
+    "busy_timeout": 5000,           # ms esperando lock antes de "database is locked"
+    "temp_store": "MEMORY",
+}
+
+DB_PROFILES = {
+    "dev": {
+        "url": "sqlite:///siara.db",
+        "pragmas": _FILE_PRAGMAS,
+        "poolclass": QueuePool,
+        "pool_kwargs": {"pool_size": 5, "max_overflow": 5},
+        "sql_sample_rate": 0.1,
+        "slow_ms": 50,
+    },
+    "prod": {
+        "url": "sqlite:///siara.db",
+        "pragmas": _FILE_PRAGMAS,
+        "poolclass": QueuePool,
+        "pool_kwargs": {"pool_size": 10, "max_overflow": 20, "pool_pre_ping": True},
+        "sql_sample_rate": 0.0,
+        "slow_ms": 200,
+    },
+    "test": {
+        # Banco em memória compartilhado por todas as threads numa só conexão
+        "url": "sqlite://",
+        "pragmas": {"synchronous": "OFF", "temp_store": "MEMORY"},
+        "poolclass": StaticPool,
+        "pool_kwargs": {},
+        "sql_sample_rate": 0.0,
+        "slow_ms": None,
+    },
+}
+
+DEFAULT_PROFILE = "dev"
+
+
+def current_profile_name():
+    return os.environ.get("SIARA_DB_PROFILE", DEFAULT_PROFILE)
+
+
+def _install_pragmas(engine, pragmas):
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_conn, _record):
+        cursor = dbapi_conn.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def _redact(value):
+    if isinstance(value, (str, bytes, bytearray, memoryview)):
+        return f"<{type(value).__name__} len={len(value)}>"
+    if value is None or isinstance(value, (bool, int, float)):
+        return repr(value)
+    return f"<{type(value).__name__}>"
+
+
+def _describe_params(parameters, executemany):
+    """Parâmetros para o log: só tipo e tamanho de textos/blobs; executemany vira contagem."""
+    if executemany:
+        rows = list(parameters or ())
+        first = f", 1ª: {_describe_params(rows[0], False)}" if rows else ""
+        return f"[{len(rows)} linhas{first}]"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{k}: {_redact(v)}" for k, v in parameters.items()) + "}"
+    return "(" + ", ".join(_redact(v) for v in parameters or ()) + ")"
+
+
+def _install_sql_logging(engine, sample_rate, slow_ms):
+    if not sample_rate and slow_ms is None:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("siara_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info["siara_query_start"].pop()) * 1000
+        if slow_ms is not None and elapsed_ms >= slow_ms:
+            sql_logger.warning("SQL lento (%.1f ms): %s %s", elapsed_ms, statement,
+                               _describe_params(parameters, executemany))
+        elif sample_rate and random.random() < sample_rate:
+            sql_logger.info("SQL (%.1f ms): %s %s", elapsed_ms, statement,
+                            _describe_params(parameters, executemany))
+
+
+def make_engine(profile=None, url=None):
+    """
+    Cria o engine do perfil informado (ou de SIARA_DB_PROFILE).
+
+    :param profile: "dev", "prod" ou "test".
+    :param url: URL do banco; padrão SIARA_DB_URL ou a URL do perfil.
+    """
+    name = profile or current_profile_name()
+    if name not in DB_PROFILES:
+        raise ValueError(f"Perfil de banco desconhecido: {name!r} (use {', '.join(DB_PROFILES)})")
+    cfg = DB_PROFILES[name]
+    url = url or os.environ.get("SIARA_DB_URL") or cfg["url"]
+
+    connect_args = {}
+    if url.startswith("sqlite"):
+        # As conexões do pool circulam entre as threads do Flet
+        connect_args["check_same_thread"] = False
+
+    engine = create_engine(
+        url,
+        poolclass=cfg["poolclass"],
+        connect_args=connect_args,
+        **cfg["pool_kwargs"],
+    )
+    if engine.dialect.name == "sqlite":
+        _install_pragmas(engine, cfg["pragmas"])
+    _install_sql_logging(engine, cfg["sql_sample_rate"], cfg["slow_ms"])
+    return engine
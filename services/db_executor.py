@@ -0,0 +1,85 @@
+# services/db_executor.py
+"""
+Execução de consultas fora da thread do evento Flet.
+
+Os handlers de evento entregam o trabalho de banco (e de rede) a um pool de
+threads dedicado e aplicam o resultado quando ele chega, via callback. Assim
+uma consulta lenta não congela os outros controles nem as outras sessões.
+
+Há também variantes `async` das consultas principais (run_in_executor), para
+handlers assíncronos do Flet.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from services.feed_query import FEED_PAGE_SIZE, load_feed_page
+from services.post_repository import delete_post, get_post, posts_in_bbox, user_posts
+from services.user_repository import authenticate
+
+DB_WORKERS = int(os.environ.get("SIARA_DB_WORKERS", "4"))
+
+_executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="siara-db")
+
+
+def submit(fn, *args, **kwargs):
+    """Agenda `fn(*args, **kwargs)` no pool de banco e devolve o Future."""
+    return _executor.submit(fn, *args, **kwargs)
+
+
+def run_in_background(fn, *args, on_done=None, on_error=None, **kwargs):
+    """
+    Executa `fn` no pool de banco e chama `on_done(resultado)` ou
+    `on_error(exceção)` ao terminar (na thread do pool).
+
+    Os callbacks normalmente atualizam controles e chamam page.update().
+    Sem `on_error`, a exceção é apenas impressa.
+    """
+    future = submit(fn, *args, **kwargs)
+
+    def _callback(f):
+        exc = f.exception()
+        if exc is not None:
+            if on_error:
+                on_error(exc)
+            else:
+                print(f"Erro em tarefa de banco em background: {exc}")
+            return
+        if on_done:
+            on_done(f.result())
+
+    future.add_done_callback(_callback)
+    return future
+
+
+async def run_async(fn, *args, **kwargs):
+    """Versão awaitable: executa `fn` no pool de banco via run_in_executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, partial(fn, *args, **kwargs))
+
+
+# ---- Variantes assíncronas das consultas principais ----
+
+async def load_feed_page_async(filters, page_size=None, after=None):
+    return await run_async(load_feed_page, filters, page_size or FEED_PAGE_SIZE, after)
+
+
+async def user_posts_async(user_id):
+    return await run_async(user_posts, user_id)
+
+
+async def posts_in_bbox_async(min_lat, min_lon, max_lat, max_lon, **kwargs):
+    return await run_async(posts_in_bbox, min_lat, min_lon, max_lat, max_lon, **kwargs)
+
+
+async def get_post_async(kind, item_id, owner_id=None):
+    return await run_async(get_post, kind, item_id, owner_id)
+
+
+async def authenticate_async(username, password):
+    return await run_async(authenticate, username, password)
+
+
+async def delete_post_async(kind, item_id, owner_id):
+    return await run_async(delete_post, kind, item_id, owner_id)
@@ -0,0 +1,210 @@
+# services/exif.py
+"""
+Leitura de GPS e data de captura do EXIF de fotos JPEG, sem decodificar a
+imagem e sem depender do Pillow.
+
+Só os marcadores do início do arquivo são percorridos até o segmento APP1
+"Exif" (que vem antes dos dados comprimidos); dele saem:
+
+    GPSLatitude/GPSLongitude (+ Ref)  -> graus decimais
+    DateTimeOriginal (ou DateTime)    -> datetime
+
+Fotos sem EXIF, de outro formato ou corrompidas devolvem EMPTY_METADATA;
+nenhuma exceção de parsing sai daqui.
+"""
+import struct
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+# Segmentos JPEG não passam de 64 KiB; nunca lemos mais que isso por segmento
+_MAX_SEGMENT = 0xFFFF
+# Quantos bytes do arquivo percorrer procurando o APP1 antes de desistir
+_MAX_SCAN = 256 * 1024
+
+_SOI = b"\xff\xd8"
+_APP1 = 0xE1
+_SOS = 0xDA
+_EOI = 0xD9
+_EXIF_HEADER = b"Exif\x00\x00"
+
+# Tags usadas
+_TAG_DATETIME = 0x0132
+_TAG_EXIF_IFD = 0x8769
+_TAG_GPS_IFD = 0x8825
+_TAG_DATETIME_ORIGINAL = 0x9003
+_TAG_GPS_LAT_REF = 0x0001
+_TAG_GPS_LAT = 0x0002
+_TAG_GPS_LON_REF = 0x0003
+_TAG_GPS_LON = 0x0004
+
+# tipo TIFF -> tamanho em bytes de um valor
+_TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 7: 1, 9: 4, 10: 8}
+# Ponteiros para sub-IFDs só valem como SHORT/LONG (um racional viraria float)
+_OFFSET_TYPES = (3, 4)
+_POINTER_TAGS = (_TAG_EXIF_IFD, _TAG_GPS_IFD)
+_MAX_IFD_ENTRIES = 512
+
+
+class PhotoMetadata(NamedTuple):
+    latitude: Optional[float]
+    longitude: Optional[float]
+    taken_at: Optional[datetime]
+
+    @property
+    def has_location(self):
+        return self.latitude is not None and self.longitude is not None
+
+
+EMPTY_METADATA = PhotoMetadata(None, None, None)
+
+
+def read_photo_metadata(path):
+    """PhotoMetadata do arquivo em `path` (EMPTY_METADATA se não houver EXIF legível)."""
+    try:
+        with open(path, "rb") as f:
+            segment = _find_exif_segment(f)
+        if segment is None:
+            return EMPTY_METADATA
+        return parse_exif(segment)
+    except (OSError, ValueError, TypeError, struct.error):
+        return EMPTY_METADATA
+
+
+def _find_exif_segment(f):
+    """Conteúdo TIFF do APP1 "Exif" (sem o cabeçalho), ou None."""
+    if f.read(2) != _SOI:
+        return None
+    while f.tell() < _MAX_SCAN:
+        byte = f.read(1)
+        if not byte:
+            return None
+        if byte != b"\xff":
+            return None  # fora de sincronia: arquivo estranho, desiste
+        marker = f.read(1)
+        while marker == b"\xff":  # bytes de preenchimento
+            marker = f.read(1)
+        if not marker:
+            return None
+        code = marker[0]
+        if code in (_SOS, _EOI):
+            return None  # começaram os dados da imagem: não há EXIF
+        if 0xD0 <= code <= 0xD7 or code == 0x01:
+            continue  # marcadores sem tamanho
+        raw_length = f.read(2)
+        if len(raw_length) < 2:
+            return None
+        length = struct.unpack(">H", raw_length)[0] - 2
+        if length < 0:
+            return None
+        if code == _APP1 and length >= len(_EXIF_HEADER):
+            data = f.read(min(length, _MAX_SEGMENT))
+            if data.startswith(_EXIF_HEADER):
+                return data[len(_EXIF_HEADER):]
+            continue  # APP1 de XMP: segue para o próximo
+        f.seek(length, 1)
+    return None
+
+
+def parse_exif(tiff):
+    """PhotoMetadata a partir do bloco TIFF de um segmento EXIF."""
+    order = tiff[:2]
+    if order == b"II":
+        endian = "<"
+    elif order == b"MM":
+        endian = ">"
+    else:
+        return EMPTY_METADATA
+    if struct.unpack(endian + "H", tiff[2:4])[0] != 42:
+        return EMPTY_METADATA
+
+    ifd0_offset = struct.unpack(endian + "I", tiff[4:8])[0]
+    ifd0 = _read_ifd(tiff, ifd0_offset, endian)
+
+    taken = None
+    exif_offset = _first(ifd0.get(_TAG_EXIF_IFD))
+    if exif_offset is not None:
+        exif_ifd = _read_ifd(tiff, exif_offset, endian)
+        taken = _parse_datetime(exif_ifd.get(_TAG_DATETIME_ORIGINAL))
+    if taken is None:
+        taken = _parse_datetime(ifd0.get(_TAG_DATETIME))
+
+    lat = lon = None
+    gps_offset = _first(ifd0.get(_TAG_GPS_IFD))
+    if gps_offset is not None:
+        gps = _read_ifd(tiff, gps_offset, endian)
+        lat = _to_degrees(gps.get(_TAG_GPS_LAT), gps.get(_TAG_GPS_LAT_REF), "S", 90)
+        lon = _to_degrees(gps.get(_TAG_GPS_LON), gps.get(_TAG_GPS_LON_REF), "W", 180)
+        if lat is None or lon is None or (lat == 0 and lon == 0):
+            lat = lon = None  # 0,0 é o valor de GPS sem sinal em vários celulares
+
+    return PhotoMetadata(lat, lon, taken)
+
+
+def _read_ifd(tiff, offset, endian):
+    """{tag: valor} de um IFD; valores numéricos viram tuplas, ASCII vira str."""
+    entries = {}
+    if offset <= 0 or offset + 2 > len(tiff):
+        return entries
+    count = struct.unpack_from(endian + "H", tiff, offset)[0]
+    for i in range(min(count, _MAX_IFD_ENTRIES)):
+        pos = offset + 2 + i * 12
+        if pos + 12 > len(tiff):
+            break
+        tag, typ, n = struct.unpack_from(endian + "HHI", tiff, pos)
+        size = _TYPE_SIZES.get(typ)
+        if size is None or (tag in _POINTER_TAGS and typ not in _OFFSET_TYPES):
+            continue
+        total = size * n
+        if total <= 4:
+            data_at = pos + 8  # valor cabe no próprio campo
+        else:
+            data_at = struct.unpack_from(endian + "I", tiff, pos + 8)[0]
+            if data_at + total > len(tiff):
+                continue
+        entries[tag] = _decode_value(tiff, data_at, typ, n, endian)
+    return entries
+
+
+def _decode_value(tiff, at, typ, n, endian):
+    if typ == 2:  # ASCII
+        return tiff[at:at + n].split(b"\x00", 1)[0].decode("ascii", "replace").strip()
+    if typ in (1, 7):
+        return tuple(tiff[at:at + n])
+    if typ == 3:
+        return struct.unpack_from(f"{endian}{n}H", tiff, at)
+    if typ == 4:
+        return struct.unpack_from(f"{endian}{n}I", tiff, at)
+    if typ == 9:
+        return struct.unpack_from(f"{endian}{n}i", tiff, at)
+    # 5 / 10: racionais (numerador, denominador)
+    code = "I" if typ == 5 else "i"
+    raw = struct.unpack_from(f"{endian}{2 * n}{code}", tiff, at)
+    return tuple(raw[k] / raw[k + 1] if raw[k + 1] else 0.0 for k in range(0, len(raw), 2))
+
+
+def _first(value):
+    """Primeiro valor de um ponteiro de IFD, só se for inteiro."""
+    if isinstance(value, tuple) and value and isinstance(value[0], int):
+        return value[0]
+    return None
+
+
+def _to_degrees(value, ref, negative_ref, limit):
+    if not isinstance(value, tuple) or not value:
+        return None
+    degrees, minutes, seconds = (tuple(value) + (0.0, 0.0))[:3]
+    result = degrees + minutes / 60 + seconds / 3600
+    if isinstance(ref, str) and ref.upper().startswith(negative_ref):
+        result = -result
+    if not -limit <= result <= limit:
+        return None
+    return round(result, 6)
+
+
+def _parse_datetime(value):
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.strptime(value[:19], "%Y:%m:%d %H:%M:%S")
+    except ValueError:
+        return None  # câmeras sem relógio gravam "0000:00:00 00:00:00"
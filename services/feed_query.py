@@ -0,0 +1,210 @@
+# services/feed_query.py
+"""
+Construtor de consultas do feed global.
+
+Converte o formulário de filtros da home (busca, espécie, tipo) numa única
+instrução SQL: um UNION ALL com um ramo por tipo de post (a mesma projeção
+da view `posts`, ver posts_read_model), em que cada ramo já traz os filtros
+de espécie, dono e texto (FTS5). Filtrar por "Perdido" gera só o ramo de
+`lost_animals`.
+
+O feed é paginado por cursor (keyset): cada página continua a partir da
+chave de ordenação da última linha da página anterior, sem OFFSET.
+"""
+import os
+
+from sqlalchemy import (
+    select, func, literal_column, null, and_, or_, table, column, tuple_, union_all,
+)
+
+from models import session_scope
+from services import search_index
+from services.posts_read_model import POST_KINDS, POST_TABLES, post_projection, post_table
+from services.projections import PostSummary, columns_for, fetch
+from services.query_cache import cached_query
+
+# Valores do dropdown "Tipo" da home -> kind
+TYPE_LABELS = {"perdido": "lost", "encontrado": "found"}
+
+# Valor dos dropdowns que significa "sem filtro"
+ANY = "qualquer"
+
+# Quantidade de posts carregados por página no feed (scroll infinito)
+FEED_PAGE_SIZE = int(os.environ.get("SIARA_FEED_PAGE_SIZE", "20"))
+
+# Pesos do bm25 por coluna do FTS: kind, post_id, name, description, location
+_BM25_WEIGHTS = (0.0, 0.0, 3.0, 1.0, 2.0)
+
+_fts = table(search_index.FTS_TABLE, column("kind"), column("post_id"))
+
+
+class FeedFilter:
+    """Filtros do feed já normalizados (minúsculas, "Qualquer" -> vazio)."""
+
+    def __init__(self, search_term="", species="", kinds=POST_KINDS, owner_id=None):
+        self.search_term = (search_term or "").strip()
+        self.species = (species or "").strip().lower()
+        self.kinds = tuple(k for k in POST_KINDS if k in kinds)
+        self.owner_id = owner_id
+
+    @classmethod
+    def from_form(cls, search_term="", species="", post_type="", owner_id=None):
+        """Cria o filtro a partir dos valores crus dos campos da home."""
+        species = (species or "").strip().lower()
+        post_type = (post_type or "").strip().lower()
+        if species == ANY:
+            species = ""
+        if post_type in TYPE_LABELS:
+            kinds = (TYPE_LABELS[post_type],)
+        else:
+            kinds = POST_KINDS
+        return cls(search_term, species, kinds, owner_id)
+
+    def _key(self):
+        return (self.search_term, self.species, self.kinds, self.owner_id)
+
+    # Hashable: o filtro faz parte da chave do cache de consultas
+    def __eq__(self, other):
+        return isinstance(other, FeedFilter) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return "FeedFilter(search_term=%r, species=%r, kinds=%r, owner_id=%r)" % self._key()
+
+
+def _species_prefix(col, prefix):
+    # Intervalo [prefix, prefix + 1) sobre lower(species): usa o índice de
+    # expressão ix_*_species_lower, ao contrário de um LIKE '%...%'
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    expr = func.lower(col)
+    return (expr >= prefix) & (expr < upper)
+
+
+def _after_created(kind, t, cursor):
+    # Posts depois do cursor (created_at, kind, id) na ordem decrescente.
+    # O kind de cada ramo é constante, então a comparação de tupla vira um
+    # intervalo simples sobre (created_at, id) — coberto por ix_*_created.
+    created, cur_kind, cur_id = cursor
+    if kind < cur_kind:
+        return t.c.created_at <= created
+    if kind > cur_kind:
+        return t.c.created_at < created
+    return or_(t.c.created_at < created, and_(t.c.created_at == created, t.c.id < cur_id))
+
+
+def _branch(kind, filters, match, after=None, limit=None):
+    t = post_table(kind)
+    if kind == "lost":
+        owner_col = t.c.owner_id
+        text_cols = (t.c.desc_animal, t.c.lost_location)
+    else:
+        owner_col = t.c.finder_id
+        text_cols = (t.c.found_description, t.c.found_location)
+    cols = post_projection(kind)
+
+    from_ = t
+    score = null()
+    if match is not None:
+        m = (
+            select(
+                _fts.c.post_id,
+                func.bm25(literal_column(search_index.FTS_TABLE), *_BM25_WEIGHTS).label("score"),
+            )
+            .where(literal_column(search_index.FTS_TABLE).op("MATCH")(match))
+            .where(_fts.c.kind == kind)
+            .subquery()
+        )
+        from_ = t.join(m, m.c.post_id == t.c.id)
+        score = m.c.score
+
+    stmt = select(*cols, score.label("score")).select_from(from_)
+
+    if filters.species:
+        stmt = stmt.where(_species_prefix(t.c.species, filters.species))
+    if filters.owner_id is not None:
+        stmt = stmt.where(owner_col == filters.owner_id)
+    if filters.search_term and match is None:
+        # SQLite sem FTS5: LIKE sobre descrição e local
+        pattern = f"%{filters.search_term.lower()}%"
+        stmt = stmt.where(or_(*(func.lower(c).like(pattern) for c in text_cols)))
+
+    if match is None:
+        # Ordem cronológica: cada ramo já para depois de `limit` linhas pelo
+        # índice, então uma página custa O(limit) e não O(tabela)
+        if after is not None:
+            stmt = stmt.where(_after_created(kind, t, after))
+        if limit is not None:
+            stmt = select(
+                stmt.order_by(t.c.created_at.desc(), t.c.id.desc()).limit(limit).subquery()
+            )
+    return stmt
+
+
+def build_feed_query(filters, limit=None, after=None):
+    """
+    Monta a instrução SELECT do feed para os filtros informados.
+
+    Com termo de busca, os resultados vêm ordenados por relevância (bm25);
+    sem termo, pelos mais recentes primeiro — (created_at, kind, id)
+    decrescente, uma ordem total e estável para a paginação por cursor.
+
+    :param after: cursor devolvido por `feed_cursor` para a última linha da
+                  página anterior (None = primeira página).
+    Retorna None quando nenhum post pode casar (sem kinds ou busca vazia).
+    """
+    match = None
+    if filters.search_term and search_index.FTS_AVAILABLE:
+        match = search_index.build_match_query(filters.search_term)
+        if match is None:
+            return None
+    if not filters.kinds:
+        return None
+
+    branches = [_branch(k, filters, match, after, limit) for k in filters.kinds]
+    stmt = branches[0] if len(branches) == 1 else union_all(*branches)
+    sub = stmt.subquery()
+    query = select(*columns_for(PostSummary, sub))
+    if match is not None:
+        if after is not None:
+            query = query.where(tuple_(sub.c.score, sub.c.kind, sub.c.id) > tuple_(*after))
+        query = query.order_by(sub.c.score, sub.c.kind, sub.c.id)
+    else:
+        query = query.order_by(sub.c.created_at.desc(), sub.c.kind.desc(), sub.c.id.desc())
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def feed_cursor(filters, row):
+    """Cursor (chave de ordenação) de uma linha do feed, para pedir a página seguinte."""
+    if filters.search_term and search_index.FTS_AVAILABLE:
+        return (row.score, row.kind, row.id)
+    return (row.created_at, row.kind, row.id)
+
+
+@cached_query(*POST_TABLES)
+def load_feed(filters, limit=None):
+    """Executa a consulta do feed e devolve uma lista de PostSummary."""
+    query = build_feed_query(filters, limit=limit)
+    if query is None:
+        return []
+    with session_scope() as s:
+        return fetch(s, PostSummary, query)
+
+
+@cached_query(*POST_TABLES)
+def load_feed_page(filters, page_size=FEED_PAGE_SIZE, after=None):
+    """
+    Carrega uma página do feed a partir do cursor `after`.
+
+    :return: (PostSummary da página, próximo cursor) — o cursor é None na última página.
+    """
+    query = build_feed_query(filters, limit=page_size, after=after)
+    if query is None:
+        return [], None
+    with session_scope() as s:
+        rows = fetch(s, PostSummary, query)
+    next_cursor = feed_cursor(filters, rows[-1]) if len(rows) == page_size else None
+    return rows, next_cursor
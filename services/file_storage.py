@@ -1,41 +1,73 @@
 # services/file_storage.py
 import os
-import uuid
 from pathlib import Path
-import shutil
+
+from services.exif import EMPTY_METADATA, PhotoMetadata, read_photo_metadata
+from services.image_store import ImageTooLargeError, store_file, store_stream
 
 # Pasta onde as imagens serão salvas (dentro da pasta do projeto)
 # Certifique-se de que a pasta 'static' e 'images' existem
 IMAGE_DIR = Path(os.getcwd()) / "static" / "images"
 IMAGE_DIR.mkdir(parents=True, exist_ok=True) # Garante que a pasta existe
 
+# Tamanho máximo de uma foto, verificado durante a leitura em blocos
+MAX_IMAGE_BYTES = int(os.environ.get("SIARA_MAX_IMAGE_BYTES", str(2 * 1024 * 1024)))
+
+ALLOWED_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.gif']
+EXIF_EXTENSIONS = ['.jpg', '.jpeg']
+
 def save_image_locally(file_path: str, file_name: str) -> str:
     """
-    Salva o arquivo temporário do Flet no diretório estático e retorna a URL relativa.
+    Salva o arquivo temporário do Flet no store endereçado por conteúdo
+    (services.image_store) e retorna a URL relativa. A mesma foto enviada de
+    novo reaproveita o arquivo já salvo.
     
     :param file_path: Caminho temporário do arquivo (fornecido pelo Flet FilePicker).
     :param file_name: Nome original do arquivo.
-    :return: URL relativa da imagem salva (ex: 'static/images/abcdefg.png').
+    :return: URL relativa da imagem salva (ex: '/images/blobs/ab/cd/abcd....png').
+    :raises ImageTooLargeError: se o arquivo passar de MAX_IMAGE_BYTES.
     """
     if not file_path:
         return None
         
     try:
-        # Gera um nome de arquivo único para evitar colisões
         extension = Path(file_name).suffix.lower()
-        if extension not in ['.jpg', '.jpeg', '.png', '.gif']:
+        if extension not in ALLOWED_EXTENSIONS:
             # Opcional: Adicionar validação de extensão aqui
             return None 
             
-        unique_filename = f"{uuid.uuid4()}{extension}"
-        target_path = IMAGE_DIR / unique_filename
-        
-        # Copia o arquivo do caminho temporário para o destino permanente
-        shutil.copyfile(file_path, target_path)
-
+        # Nome = SHA-256 do conteúdo; não grava de novo se o blob já existe.
         # Retorna o caminho relativo (URL) que será usado no banco de dados e no front-end
-        return f"static/images/{unique_filename}"
-        
+        return store_file(file_path, extension, max_bytes=MAX_IMAGE_BYTES)
+
+    except ImageTooLargeError:
+        raise
     except Exception as e:
         print(f"Erro ao salvar arquivo localmente: {e}")
-        return None
\ No newline at end of file
+        return None
+
+def save_image_stream(chunks, file_name: str, max_bytes=MAX_IMAGE_BYTES) -> str:
+    """
+    Salva uma imagem recebida em blocos (iterável de bytes), sem juntar tudo
+    na memória; o limite de tamanho é verificado bloco a bloco.
+
+    :return: URL relativa da imagem salva, ou None para extensão não permitida.
+    :raises ImageTooLargeError: se passar de `max_bytes`.
+    """
+    extension = Path(file_name or "").suffix.lower()
+    if extension not in ALLOWED_EXTENSIONS:
+        return None
+    url, _size = store_stream(chunks, extension, max_bytes=max_bytes)
+    return url
+
+def photo_metadata(file_path: str, file_name: str) -> PhotoMetadata:
+    """
+    GPS e data de captura do EXIF da foto escolhida, lidos só do cabeçalho
+    (services.exif), sem abrir a imagem. Serve para preencher coordenadas e
+    data do formulário antes do upload, dispensando a geocodificação.
+
+    :return: PhotoMetadata; EMPTY_METADATA se não for JPEG ou não houver EXIF.
+    """
+    if not file_path or Path(file_name or file_path).suffix.lower() not in EXIF_EXTENSIONS:
+        return EMPTY_METADATA
+    return read_photo_metadata(file_path)
@@ -0,0 +1,228 @@
+# services/gazetteer.py
+"""
+Geocodificador offline a partir de um gazetteer local (ruas, bairros, pontos
+de referência da região metropolitana).
+
+O CSV de origem (colunas `name,lat,lon`; extrações do OSM servem, desde que
+convertidas para esse formato) é compilado num índice binário ordenado pelas
+chaves normalizadas (minúsculas, sem acentos, abreviações expandidas). O
+índice é aberto com mmap e consultado por busca binária, sem carregar nada
+na memória além das páginas tocadas:
+
+    python -m services.gazetteer import enderecos.csv [gazetteer.idx]
+
+Endereços com mais de um trecho ("Rua X, 120, Curitiba") só são
+respondidos offline pelo primeiro trecho quando todos os demais são
+municípios da região coberta (SIARA_GAZETTEER_LOCALITIES, separados por
+ponto e vírgula; opcionalmente seguidos da UF). Número da casa ou outra
+cidade vão para a rede: o gazetteer só tem o centro de cada rua.
+
+Formato do arquivo:
+    cabeçalho  MAGIC (8 bytes) + quantidade (uint32)
+    registros  quantidade x (offset_chave uint32, offset_nome uint32, lat f64, lon f64)
+    textos     cada texto = tamanho (uint16) + bytes UTF-8
+"""
+import argparse
+import csv
+import mmap
+import os
+import re
+import struct
+import unicodedata
+
+GAZETTEER_PATH = os.environ.get("SIARA_GAZETTEER", "gazetteer.idx")
+# Municípios cobertos pelo índice, ex.: "Curitiba;São José dos Pinhais;Colombo"
+GAZETTEER_LOCALITIES = os.environ.get("SIARA_GAZETTEER_LOCALITIES", "")
+
+MAGIC = b"SIARAGZ1"
+_HEADER = struct.Struct("<8sI")
+_RECORD = struct.Struct("<IIdd")
+_LEN = struct.Struct("<H")
+
+# Abreviações comuns em endereços brasileiros
+_ABBREVIATIONS = {
+    "r": "rua",
+    "av": "avenida",
+    "al": "alameda",
+    "tv": "travessa",
+    "trav": "travessa",
+    "pc": "praca",
+    "pca": "praca",
+    "rod": "rodovia",
+    "est": "estrada",
+    "jd": "jardim",
+    "vl": "vila",
+    "pq": "parque",
+}
+
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+_STATES = {
+    "ac", "al", "ap", "am", "ba", "ce", "df", "es", "go", "ma", "mt", "ms", "mg", "pa",
+    "pb", "pr", "pe", "pi", "rj", "rn", "rs", "ro", "rr", "sc", "sp", "se", "to",
+}
+
+
+def normalize(text):
+    """Chave de busca: minúsculas, sem acentos/pontuação, abreviações expandidas."""
+    folded = unicodedata.normalize("NFKD", text or "")
+    folded = "".join(c for c in folded if not unicodedata.combining(c)).lower()
+    words = _NON_WORD.sub(" ", folded).split()
+    return " ".join(_ABBREVIATIONS.get(w, w) for w in words)
+
+
+def build_index(csv_path, out_path=GAZETTEER_PATH):
+    """Compila o CSV `name,lat,lon` em `out_path`. Devolve a quantidade de entradas."""
+    entries = {}
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            try:
+                name = row["name"].strip()
+                lat, lon = float(row["lat"]), float(row["lon"])
+            except (KeyError, TypeError, ValueError, AttributeError):
+                continue
+            key = normalize(name).encode("utf-8")
+            if key and key not in entries:
+                entries[key] = (name.encode("utf-8"), lat, lon)
+
+    keys = sorted(entries)  # ordem de bytes, a mesma usada na busca
+    blob = bytearray()
+    records = bytearray()
+    strings_start = _HEADER.size + _RECORD.size * len(keys)
+
+    def add_string(data):
+        offset = strings_start + len(blob)
+        blob.extend(_LEN.pack(len(data)))
+        blob.extend(data)
+        return offset
+
+    for key in keys:
+        name, lat, lon = entries[key]
+        records.extend(_RECORD.pack(add_string(key), add_string(name), lat, lon))
+
+    tmp_path = f"{out_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(keys)))
+        f.write(records)
+        f.write(blob)
+    os.replace(tmp_path, out_path)
+    return len(keys)
+
+
+class Gazetteer:
+    """Índice compilado aberto via mmap (somente leitura)."""
+
+    def __init__(self, path=GAZETTEER_PATH, localities=GAZETTEER_LOCALITIES):
+        self.path = path
+        self.localities = {normalize(name) for name in localities.split(";")} - {""}
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Arquivo de gazetteer inválido: {path}")
+
+    def __len__(self):
+        return self.count
+
+    def _string(self, offset):
+        (size,) = _LEN.unpack_from(self._mm, offset)
+        start = offset + _LEN.size
+        return self._mm[start:start + size]
+
+    def _record(self, i):
+        return _RECORD.unpack_from(self._mm, _HEADER.size + i * _RECORD.size)
+
+    def _key(self, i):
+        return self._string(self._record(i)[0])
+
+    def _lower_bound(self, key):
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def lookup(self, text):
+        """(lat, lon) do nome exato (após normalização) ou None."""
+        key = normalize(text).encode("utf-8")
+        if not key:
+            return None
+        i = self._lower_bound(key)
+        if i < self.count:
+            key_offset, _, lat, lon = self._record(i)
+            if self._string(key_offset) == key:
+                return lat, lon
+        return None
+
+    def _is_locality(self, segment):
+        """Trecho é um município coberto ("Curitiba", "Curitiba - PR") ou só a UF."""
+        words = normalize(segment).split()
+        if words and words[-1] in _STATES:
+            words = words[:-1]
+        return not words or " ".join(words) in self.localities
+
+    def geocode(self, text):
+        """
+        Tenta o endereço inteiro e depois só o trecho antes da primeira
+        vírgula, se os demais forem municípios cobertos ("Rua X, Curitiba"
+        -> "Rua X"). Com número da casa ou outra cidade devolve None, e a
+        busca vai para a rede.
+        """
+        found = self.lookup(text)
+        if found is None and text and "," in text:
+            street, *rest = text.split(",")
+            if all(self._is_locality(segment) for segment in rest):
+                found = self.lookup(street)
+        return found
+
+    def prefix_search(self, prefix, limit=10):
+        """Até `limit` entradas (nome, lat, lon) cujo nome começa com `prefix`."""
+        key = normalize(prefix).encode("utf-8")
+        if not key:
+            return []
+        results = []
+        i = self._lower_bound(key)
+        while i < self.count and len(results) < limit:
+            key_offset, name_offset, lat, lon = self._record(i)
+            if not self._string(key_offset).startswith(key):
+                break
+            results.append((self._string(name_offset).decode("utf-8"), lat, lon))
+            i += 1
+        return results
+
+    def close(self):
+        self._mm.close()
+
+
+def load_gazetteer(path=GAZETTEER_PATH):
+    """Abre o índice se existir; sem arquivo, o geocodificador usa só a rede."""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        return Gazetteer(path)
+    except (OSError, ValueError) as e:
+        print(f"Gazetteer indisponível ({path}): {e}")
+        return None
+
+
+gazetteer = load_gazetteer()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ferramentas do gazetteer offline.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="compila um CSV name,lat,lon no índice")
+    imp.add_argument("csv_path")
+    imp.add_argument("out_path", nargs="?", default=GAZETTEER_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == "import":
+        count = build_index(args.csv_path, args.out_path)
+        print(f"{count} entradas gravadas em {args.out_path}")
+
+
+if __name__ == "__main__":
+    main()
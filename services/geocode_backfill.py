@@ -0,0 +1,178 @@
+# services/geocode_backfill.py
+"""
+Preenche latitude/longitude de posts salvos só com endereço (ex.: quando a
+geocodificação falhou no cadastro) — sem coordenadas eles não aparecem no
+mapa.
+
+    python -m services.geocode_backfill [--batch 50] [--limit N] [--retry-failed]
+
+- Endereços iguais após normalização (services.gazetteer.normalize) são
+  geocodificados uma única vez.
+- As consultas passam pelo mesmo worker com limite de taxa das telas, com
+  prioridade de lote (pedidos interativos passam na frente).
+- Cada lote é gravado numa transação e só então registrado no checkpoint
+  (JSON); rodar de novo retoma de onde parou. Endereços não encontrados
+  ficam marcados e só são tentados de novo com --retry-failed (que também
+  descarta o resultado negativo do cache, senão a nova tentativa nem
+  chegaria à rede); falhas transitórias (timeout, disjuntor aberto) não
+  entram no checkpoint.
+"""
+import argparse
+import json
+import os
+from collections import OrderedDict
+
+from sqlalchemy import func, or_, select, update
+
+from models import session_scope
+from services.gazetteer import normalize
+from services.geocode_cache import MISS, geocode_cache
+from services import geocoding
+from services.geocoding import geocode_address_async
+from services.geocoding_worker import PRIORITY_BACKGROUND
+from services.posts_read_model import post_table, posts
+
+CHECKPOINT_PATH = os.environ.get("SIARA_BACKFILL_CHECKPOINT", "geocode_backfill.json")
+DEFAULT_BATCH = 50
+
+
+def _cache_key(text):
+    """Chave usada por geocode_address_async no cache de geocodificação."""
+    return text.strip().lower()
+
+
+def load_checkpoint(path):
+    """{endereço normalizado: [lat, lon] ou None (falhou)}."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f).get("done", {})
+
+
+def save_checkpoint(path, done):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"done": done}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def pending_addresses():
+    """
+    Posts com endereço e sem coordenadas, agrupados por endereço normalizado:
+    OrderedDict normalizado -> (texto original, [(kind, id), ...]).
+    """
+    stmt = (
+        select(posts.c.kind, posts.c.id, posts.c.location)
+        .where(or_(posts.c.lat.is_(None), posts.c.lon.is_(None)))
+        .where(func.trim(func.coalesce(posts.c.location, "")) != "")
+        .order_by(posts.c.kind, posts.c.id)
+    )
+    groups = OrderedDict()
+    with session_scope() as s:
+        for kind, item_id, location in s.execute(stmt):
+            key = normalize(location)
+            if not key:
+                continue
+            groups.setdefault(key, (location, []))[1].append((kind, item_id))
+    return groups
+
+
+def _write_batch(results, groups):
+    """Atualiza, numa transação, todos os posts de cada endereço resolvido."""
+    updated = 0
+    with session_scope() as s:
+        for key, coords in results.items():
+            if coords is None:
+                continue
+            lat, lon = coords
+            ids_by_kind = {}
+            for kind, item_id in groups[key][1]:
+                ids_by_kind.setdefault(kind, []).append(item_id)
+            for kind, ids in ids_by_kind.items():
+                t = post_table(kind)
+                result = s.execute(
+                    update(t)
+                    .where(t.c.id.in_(ids))
+                    .where(or_(t.c.latitude.is_(None), t.c.longitude.is_(None)))
+                    .values(latitude=lat, longitude=lon)
+                )
+                updated += result.rowcount
+    return updated
+
+
+def run_backfill(batch_size=DEFAULT_BATCH, limit=None, checkpoint=CHECKPOINT_PATH,
+                 retry_failed=False, dry_run=False, log=print):
+    """Executa o backfill; devolve {"addresses", "resolved", "failed", "rows_updated"}."""
+    done = load_checkpoint(checkpoint)
+    groups = pending_addresses()
+
+    # Endereços já resolvidos no checkpoint mas com linhas ainda sem
+    # coordenadas (ex.: lote interrompido entre o commit e o checkpoint, ou
+    # posts novos com endereço repetido) são regravados sem ir à rede
+    todo = []
+    reuse = {}
+    for key in groups:
+        if key in done and done[key] is not None:
+            reuse[key] = done[key]
+        elif key not in done or retry_failed:
+            todo.append(key)
+    if limit is not None:
+        todo = todo[:limit]
+
+    summary = {"addresses": len(todo), "resolved": 0, "failed": 0, "rows_updated": 0}
+    log(f"{sum(len(g[1]) for g in groups.values())} posts sem coordenadas, "
+        f"{len(groups)} endereços distintos, {len(todo)} a geocodificar.")
+    if dry_run:
+        return summary
+
+    if reuse:
+        summary["rows_updated"] += _write_batch(reuse, groups)
+
+    for start in range(0, len(todo), batch_size):
+        if not geocoding.provider.available():
+            log("Geocodificador indisponível (disjuntor aberto); rode de novo mais tarde.")
+            break
+        batch = todo[start:start + batch_size]
+        for key in batch:
+            if key in done:  # falhou antes: só chega aqui com --retry-failed
+                geocode_cache.forget_negative("forward", _cache_key(groups[key][0]))
+        futures = {
+            key: geocode_address_async(groups[key][0], priority=PRIORITY_BACKGROUND, caller="backfill")
+            for key in batch
+        }
+        results = {}
+        for key, future in futures.items():
+            lat, lon = future.result()
+            results[key] = (lat, lon) if lat is not None and lon is not None else None
+
+        summary["rows_updated"] += _write_batch(results, groups)
+        for key, coords in results.items():
+            # Sem cache negativo, a falha foi transitória (timeout, rede):
+            # fica fora do checkpoint para a próxima execução tentar de novo
+            if coords or geocode_cache.get("forward", _cache_key(groups[key][0])) is not MISS:
+                done[key] = list(coords) if coords else None
+        save_checkpoint(checkpoint, done)
+
+        ok = sum(1 for v in results.values() if v)
+        summary["resolved"] += ok
+        summary["failed"] += len(results) - ok
+        log(f"Lote {start // batch_size + 1}: {ok}/{len(batch)} endereços resolvidos "
+            f"({start + len(batch)}/{len(todo)}).")
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Geocodifica posts sem coordenadas.")
+    parser.add_argument("--batch", type=int, default=DEFAULT_BATCH, help="endereços por transação")
+    parser.add_argument("--limit", type=int, default=None, help="máximo de endereços nesta execução")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH)
+    parser.add_argument("--retry-failed", action="store_true", help="tenta de novo endereços que falharam")
+    parser.add_argument("--dry-run", action="store_true", help="só conta o que seria feito")
+    args = parser.parse_args(argv)
+
+    summary = run_backfill(args.batch, args.limit, args.checkpoint, args.retry_failed, args.dry_run)
+    print(f"Concluído: {summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+# services/geocode_cache.py
+"""
+Cache persistente e limitado para as respostas do geocodificador.
+
+Fica num arquivo SQLite próprio (SIARA_GEOCODE_CACHE_DB, padrão
+"geocode_cache.db"), então sobrevive a reinícios e é compartilhado por todas
+as sessões do processo. Características:
+
+- LRU: cada acerto atualiza `last_access`; acima de `max_entries` as
+  entradas menos usadas recentemente são removidas.
+- TTL separado para resultados positivos e negativos (falhas/endereços não
+  encontrados expiram logo, para serem tentados de novo).
+- Contadores de acertos/faltas em `stats()`.
+- `prefix()` (autocomplete) busca pela chave dobrada — minúsculas, sem
+  acentos e sem pontuação, como o tokenizer `unicode61 remove_diacritics`
+  do FTS —, então "sao" encontra "São".
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+CACHE_DB_PATH = os.environ.get("SIARA_GEOCODE_CACHE_DB", "geocode_cache.db")
+MAX_ENTRIES = int(os.environ.get("SIARA_GEOCODE_CACHE_SIZE", "50000"))
+POSITIVE_TTL = float(os.environ.get("SIARA_GEOCODE_POSITIVE_TTL", str(90 * 24 * 3600)))
+NEGATIVE_TTL = float(os.environ.get("SIARA_GEOCODE_NEGATIVE_TTL", str(3600)))
+
+# Só verifica o limite de tamanho a cada N gravações
+_EVICT_EVERY = 100
+
+_SEPARATORS = re.compile(r"[^\w]+")
+
+# Marcador de "não está no cache" (None é um valor válido em cache negativo)
+MISS = object()
+
+
+def fold(text):
+    """Chave da busca por prefixo: minúsculas, sem acentos, pontuação vira espaço."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(_SEPARATORS.sub(" ", stripped.casefold()).split())
+
+
+class GeocodeCache:
+    def __init__(self, path=CACHE_DB_PATH, max_entries=MAX_ENTRIES,
+                 positive_ttl=POSITIVE_TTL, negative_ttl=NEGATIVE_TTL):
+        self.max_entries = max_entries
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS geocode_cache (
+                   kind TEXT NOT NULL,
+                   key TEXT NOT NULL,
+                   value TEXT,
+                   negative INTEGER NOT NULL,
+                   expires_at REAL NOT NULL,
+                   last_access REAL NOT NULL,
+                   PRIMARY KEY (kind, key)
+               )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_geocode_cache_last_access ON geocode_cache (last_access)"
+        )
+        self._add_folded_column()
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_geocode_cache_folded ON geocode_cache (kind, folded)"
+        )
+        self._puts = 0
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    def _add_folded_column(self):
+        # Arquivos de cache anteriores à busca sem acentos
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(geocode_cache)")}
+        if "folded" in columns:
+            return
+        self._conn.execute("ALTER TABLE geocode_cache ADD COLUMN folded TEXT")
+        rows = self._conn.execute("SELECT rowid, key FROM geocode_cache").fetchall()
+        self._conn.execute("BEGIN")
+        self._conn.executemany(
+            "UPDATE geocode_cache SET folded = ? WHERE rowid = ?",
+            [(fold(key), rowid) for rowid, key in rows],
+        )
+        self._conn.execute("COMMIT")
+
+    def get(self, kind, key):
+        """Valor em cache (pode ser None para resultado negativo) ou MISS."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, negative, expires_at FROM geocode_cache WHERE kind = ? AND key = ?",
+                (kind, key),
+            ).fetchone()
+            if row is None or row[2] < now:
+                if row is not None:
+                    self._conn.execute("DELETE FROM geocode_cache WHERE kind = ? AND key = ?", (kind, key))
+                self.misses += 1
+                return MISS
+            self._conn.execute(
+                "UPDATE geocode_cache SET last_access = ? WHERE kind = ? AND key = ?", (now, kind, key)
+            )
+            if row[1]:
+                self.negative_hits += 1
+                return None
+            self.hits += 1
+            return json.loads(row[0])
+
+    def get_many(self, kind, keys):
+        """
+        Várias chaves numa só consulta: {chave: valor} só das encontradas
+        (None = resultado negativo). Conta como uma única busca nos
+        contadores: acerto se achou algo positivo.
+        """
+        keys = list(keys)
+        if not keys:
+            return {}
+        now = time.time()
+        marks = ", ".join("?" * len(keys))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key, value, negative FROM geocode_cache "
+                f"WHERE kind = ? AND key IN ({marks}) AND expires_at >= ?",
+                (kind, *keys, now),
+            ).fetchall()
+            if rows:
+                self._conn.execute(
+                    f"UPDATE geocode_cache SET last_access = ? "
+                    f"WHERE kind = ? AND key IN ({', '.join('?' * len(rows))})",
+                    (now, kind, *[r[0] for r in rows]),
+                )
+            found = {key: (None if negative else json.loads(value)) for key, value, negative in rows}
+            if any(v is not None for v in found.values()):
+                self.hits += 1
+            elif found:
+                self.negative_hits += 1
+            else:
+                self.misses += 1
+        return found
+
+    def put(self, kind, key, value):
+        """Guarda `value`; None é gravado como resultado negativo (TTL curto)."""
+        now = time.time()
+        negative = value is None
+        ttl = self.negative_ttl if negative else self.positive_ttl
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO geocode_cache "
+                "(kind, key, folded, value, negative, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (kind, key, fold(key), None if negative else json.dumps(value), int(negative), now + ttl, now),
+            )
+            self._puts += 1
+            if self._puts % _EVICT_EVERY == 0:
+                self._evict()
+
+    def forget_negative(self, kind, key):
+        """Apaga o resultado negativo de `key` (se houver), para a próxima busca ir à rede."""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM geocode_cache WHERE kind = ? AND key = ? AND negative = 1", (kind, key)
+            )
+
+    def prefix(self, kind, prefix, limit=10):
+        """
+        Entradas positivas e válidas cuja chave dobrada (ver `fold`) começa
+        com o `prefix` dobrado (range no índice, sem varrer a tabela):
+        [(chave, valor)].
+        """
+        prefix = fold(prefix)
+        if not prefix:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, value FROM geocode_cache "
+                "WHERE kind = ? AND folded >= ? AND folded < ? AND negative = 0 AND expires_at >= ? "
+                "ORDER BY folded LIMIT ?",
+                (kind, prefix, prefix + "\uffff", time.time(), limit),
+            ).fetchall()
+        return [(key, json.loads(value)) for key, value in rows]
+
+    def _evict(self):
+        self._conn.execute("DELETE FROM geocode_cache WHERE expires_at < ?", (time.time(),))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM geocode_cache").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM geocode_cache WHERE rowid IN "
+                "(SELECT rowid FROM geocode_cache ORDER BY last_access LIMIT ?)",
+                (excess,),
+            )
+
+    def stats(self):
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM geocode_cache").fetchone()
+            lookups = self.hits + self.negative_hits + self.misses
+            return {
+                "entries": size,
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.negative_hits) / lookups if lookups else 0.0,
+            }
+
+
+geocode_cache = GeocodeCache()
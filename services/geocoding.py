@@ -1,57 +1,148 @@
+import os
 import time
-from geopy.geocoders import Nominatim
-from geopy.extra.rate_limiter import RateLimiter
+from concurrent.futures import TimeoutError as FutureTimeoutError
 
 # ---- 1. Inicialização e Configuração ----
 
-# Configuração do Geocodificador
-geolocator = Nominatim(user_agent="siara_app_geocoder")
+# Configuração do Geocodificador: provedor plugável (SIARA_GEOCODER) com
+# orçamento de latência e disjuntor; ver services/geocoding_providers.py
+from services.geocoding_providers import GEOCODE_TIMEOUT, ResilientProvider, make_provider
 
-# Aplicação de limites de taxa para evitar banimento pelo serviço do Nominatim
-geocode = RateLimiter(geolocator.geocode, min_delay_seconds=1, return_value_on_exception=None)
-reverse_rate_limited = RateLimiter(geolocator.reverse, min_delay_seconds=1, return_value_on_exception=None)
+# Espera máxima das versões bloqueantes: fila + intervalo de 1 s entre
+# chamadas + a própria chamada; passando disso, respondem "sem resultado"
+BLOCKING_TIMEOUT = float(os.environ.get("SIARA_GEOCODE_BLOCKING_TIMEOUT", str(GEOCODE_TIMEOUT + 2)))
 
-# Pequenos caches em memória (Dicionários)
-_geocode_cache = {}
-_reverse_cache = {}
+provider = make_provider()
 
-# ---- 2. Funções de Geocodificação ----
+def set_provider(new_provider):
+    """Troca o provedor (ex.: StubProvider em testes); devolve o anterior."""
+    global provider
+    previous = provider
+    if not isinstance(new_provider, ResilientProvider):
+        new_provider = ResilientProvider(new_provider)
+    provider = new_provider
+    return previous
 
-def geocode_address(text):
-    if not text:
-        return None, None
-    key = text.strip().lower()
-    if key in _geocode_cache:
-        return _geocode_cache[key]
+# Cache persistente e limitado (LRU + TTL positivo/negativo), compartilhado
+# entre sessões e reinícios; ver services/geocode_cache.py
+from services.geocode_cache import geocode_cache, MISS
+from services.gazetteer import gazetteer
+from services.reverse_grid import nearest_entry, neighbour_cells
+from services import geocoding_metrics
+from services.geocoding_worker import (
+    GeocodingWorker, PRIORITY_INTERACTIVE, add_result_callback, resolved,
+)
+
+# ---- 2. Chamadas de rede (executadas só pela thread do worker) ----
+
+# Só "não encontrado" vira cache negativo; falhas (timeout, rede, disjuntor
+# aberto) devolvem vazio sem gravar nada, para serem tentadas de novo
+
+def _fetch_forward(key, text):
     try:
-        loc = geocode(text, timeout=10)
-        if loc:
-            coords = (loc.latitude, loc.longitude)
-            _geocode_cache[key] = coords
-            return coords
+        coords = provider.forward(text)
     except Exception as e:
         print("Geocode error:", e)
-    _geocode_cache[key] = (None, None)
-    return None, None
+        return None, None
+    geocode_cache.put("forward", key, coords)
+    return coords if coords else (None, None)
 
-def reverse_geocode(lat, lon):
-    if lat is None or lon is None:
-        return None
-    key = f"{lat:.6f},{lon:.6f}"
-    if key in _reverse_cache:
-        return _reverse_cache[key]
+def _fetch_reverse(cell, lat, lon):
+    # Cache por célula da grade (services.reverse_grid), guardando também o
+    # ponto exato para a busca por vizinho mais próximo
     try:
-        loc = reverse_rate_limited(f"{lat}, {lon}", exactly_one=True, timeout=10)
-        if loc and getattr(loc, "address", None):
-            address = loc.address
-            _reverse_cache[key] = address
-            return address
+        address = provider.reverse(lat, lon)
     except Exception as e:
         print("Reverse geocode error:", e)
-    _reverse_cache[key] = None
+        return None
+    if address:
+        geocode_cache.put("reverse_grid", cell, {"address": address, "lat": lat, "lon": lon})
+        return address
+    geocode_cache.put("reverse_grid", cell, None)
     return None
 
-# ---- 3. Funções Auxiliares ----
+# Uma única thread é dona do limite de 1 requisição/s do Nominatim
+geocoding_worker = GeocodingWorker(
+    {"forward": _fetch_forward, "reverse": _fetch_reverse},
+    min_delay=1.0,
+)
+
+# ---- 3. Funções de Geocodificação ----
+
+def geocode_address_async(text, callback=None, priority=PRIORITY_INTERACTIVE, caller=None):
+    """
+    Future com (lat, lon) ou (None, None). Consulta primeiro o gazetteer
+    offline (services.gazetteer); respostas dele e do cache voltam já
+    resolvidas; as demais entram na fila do worker. `callback(resultado)`
+    roda na thread do worker (ou imediatamente, se veio do cache).
+    `caller` identifica a tela/job nas métricas (services.geocoding_metrics).
+    """
+    if not text:
+        future = resolved((None, None))
+    else:
+        # Endereços locais conhecidos: resposta offline, sem rede nem cache
+        local = gazetteer.geocode(text) if gazetteer is not None else None
+        key = text.strip().lower()
+        cached = geocode_cache.get("forward", key) if local is None else MISS
+        if local is not None:
+            future, source = resolved(local), "gazetteer"
+        elif cached is not MISS:
+            future, source = resolved(tuple(cached) if cached else (None, None)), "cache"
+        elif not provider.available():
+            # disjuntor aberto: falha na hora
+            future, source = resolved((None, None)), "unavailable"
+        else:
+            future, source = geocoding_worker.submit("forward", key, key, text, priority=priority), "network"
+        geocoding_metrics.track(future, caller, source)
+    if callback is not None:
+        add_result_callback(future, callback)
+    return future
+
+def reverse_geocode_async(lat, lon, callback=None, priority=PRIORITY_INTERACTIVE, caller=None):
+    """
+    Future com o endereço de (lat, lon) ou None; ver geocode_address_async.
+    Vale o endereço em cache mais próximo na célula ou nas vizinhas, dentro
+    da tolerância; cliques na mesma célula compartilham a chamada de rede.
+    """
+    if lat is None or lon is None:
+        future = resolved(None)
+    else:
+        cells = neighbour_cells(lat, lon)
+        found = geocode_cache.get_many("reverse_grid", cells)
+        nearest = nearest_entry(lat, lon, found.values())
+        if nearest is not None:
+            future, source = resolved(nearest["address"]), "cache"
+        elif cells[0] in found:
+            future, source = resolved(None), "cache"   # célula já consultada, sem endereço
+        elif not provider.available():
+            future, source = resolved(None), "unavailable"
+        else:
+            future, source = geocoding_worker.submit("reverse", cells[0], cells[0], lat, lon,
+                                                     priority=priority), "network"
+        geocoding_metrics.track(future, caller, source)
+    if callback is not None:
+        add_result_callback(future, callback)
+    return future
+
+def geocode_address(text, caller=None, timeout=BLOCKING_TIMEOUT):
+    """
+    Versão bloqueante (para código que já roda fora da thread do evento).
+    Espera no máximo `timeout` segundos; depois disso devolve (None, None) —
+    o pedido continua na fila e o resultado ainda vai para o cache.
+    """
+    try:
+        return geocode_address_async(text, caller=caller).result(timeout=timeout)
+    except FutureTimeoutError:
+        return None, None
+
+def reverse_geocode(lat, lon, caller=None, timeout=BLOCKING_TIMEOUT):
+    """Versão bloqueante; None se passar de `timeout` segundos (ver geocode_address)."""
+    try:
+        return reverse_geocode_async(lat, lon, caller=caller).result(timeout=timeout)
+    except FutureTimeoutError:
+        return None
+
+# ---- 4. Funções Auxiliares ----
 
 def build_static_map_url(lat, lon, zoom=15, width=600, height=300, marker="red-pushpin"):
     if lat is None or lon is None:
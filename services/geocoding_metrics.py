@@ -0,0 +1,68 @@
+# services/geocoding_metrics.py
+"""
+Métricas de geocodificação por chamador (tela ou job).
+
+Cada pedido a services.geocoding informa `caller=` ("found_registration",
+"lost_registration", "backfill", ...) e é contado pela origem da resposta:
+
+- "gazetteer": índice offline;
+- "cache": cache persistente (inclui vizinhos da grade reversa);
+- "network": foi para a fila do worker e para o provedor;
+- "unavailable": disjuntor aberto, resposta vazia na hora.
+
+A latência é medida do pedido até o Future ser resolvido, então inclui a
+espera na fila e o limite de taxa — é o que a tela sente.
+"""
+import threading
+import time
+
+SOURCES = ("gazetteer", "cache", "network", "unavailable")
+
+_lock = threading.Lock()
+_by_caller = {}
+
+
+def _new_entry():
+    return {
+        "requests": 0,
+        **{s: 0 for s in SOURCES},
+        "empty": 0,
+        "total_ms": 0.0,
+        "max_ms": 0.0,
+    }
+
+
+def track(future, caller, source):
+    """Registra o pedido e mede a latência quando `future` terminar."""
+    start = time.perf_counter()
+    caller = caller or "unknown"
+
+    def _done(f):
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        empty = f.cancelled() or f.exception() is not None or f.result() in (None, (None, None))
+        with _lock:
+            entry = _by_caller.setdefault(caller, _new_entry())
+            entry["requests"] += 1
+            entry[source] += 1
+            entry["empty"] += int(empty)
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+
+    future.add_done_callback(_done)
+    return future
+
+
+def snapshot():
+    """{chamador: contadores + hit_rate (respostas locais) e avg_ms}."""
+    with _lock:
+        data = {caller: dict(entry) for caller, entry in _by_caller.items()}
+    for entry in data.values():
+        n = entry["requests"]
+        entry["hit_rate"] = (entry["gazetteer"] + entry["cache"]) / n if n else 0.0
+        entry["avg_ms"] = entry["total_ms"] / n if n else 0.0
+    return data
+
+
+def reset():
+    with _lock:
+        _by_caller.clear()
@@ -0,0 +1,215 @@
+# services/geocoding_providers.py
+"""
+Provedores de geocodificação plugáveis, com orçamento de latência e
+disjuntor (circuit breaker).
+
+Um provedor implementa `forward(text, timeout)` -> (lat, lon) ou None e
+`reverse(lat, lon, timeout)` -> endereço ou None. "Não encontrado" é None;
+falhas (rede, timeout, serviço fora) são exceções — só o primeiro vira
+cache negativo em services.geocoding.
+
+ResilientProvider envolve qualquer provedor:
+- cada chamada recebe no máximo SIARA_GEOCODE_TIMEOUT segundos;
+- após SIARA_GEOCODE_BREAKER_FAILURES falhas seguidas o disjuntor abre e as
+  chamadas falham na hora (CircuitOpenError); depois de
+  SIARA_GEOCODE_BREAKER_RESET segundos uma chamada de teste é liberada
+  (meio-aberto) e, se der certo, o disjuntor fecha;
+- guarda contagem e latência das chamadas em `stats()`.
+
+SIARA_GEOCODER escolhe o provedor: "nominatim" (padrão) ou "stub" (local,
+sem rede, para testes e medições).
+"""
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+
+GEOCODE_TIMEOUT = float(os.environ.get("SIARA_GEOCODE_TIMEOUT", "3"))
+BREAKER_FAILURES = int(os.environ.get("SIARA_GEOCODE_BREAKER_FAILURES", "3"))
+BREAKER_RESET = float(os.environ.get("SIARA_GEOCODE_BREAKER_RESET", "30"))
+
+
+class CircuitOpenError(Exception):
+    """O provedor está indisponível e o disjuntor está aberto."""
+
+
+class GeocodingProvider(ABC):
+    """Interface dos provedores."""
+
+    name = "base"
+
+    @abstractmethod
+    def forward(self, text, timeout):
+        """(lat, lon) do endereço, ou None se não encontrado."""
+
+    @abstractmethod
+    def reverse(self, lat, lon, timeout):
+        """Endereço da coordenada, ou None se não encontrado."""
+
+
+class NominatimProvider(GeocodingProvider):
+    name = "nominatim"
+
+    def __init__(self, user_agent="siara_app_geocoder"):
+        from geopy.geocoders import Nominatim
+        self.geolocator = Nominatim(user_agent=user_agent)
+
+    def forward(self, text, timeout):
+        loc = self.geolocator.geocode(text, timeout=timeout)
+        return (loc.latitude, loc.longitude) if loc else None
+
+    def reverse(self, lat, lon, timeout):
+        loc = self.geolocator.reverse(f"{lat}, {lon}", exactly_one=True, timeout=timeout)
+        return loc.address if loc and getattr(loc, "address", None) else None
+
+
+class StubProvider(GeocodingProvider):
+    """
+    Provedor local para testes: respostas fixas por texto (em minúsculas) ou
+    coordenada arredondada, latência simulada e falha forçada.
+    """
+    name = "stub"
+
+    def __init__(self, forward_results=None, reverse_results=None, latency=0.0, fail=False):
+        self.forward_results = {k.strip().lower(): v for k, v in (forward_results or {}).items()}
+        self.reverse_results = dict(reverse_results or {})
+        self.latency = latency
+        self.fail = fail
+        self.calls = []
+
+    def _call(self, timeout):
+        if self.fail:
+            raise ConnectionError("stub configurado para falhar")
+        if self.latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"stub excedeu {timeout}s")
+        if self.latency:
+            time.sleep(self.latency)
+
+    def forward(self, text, timeout):
+        self.calls.append(("forward", text))
+        self._call(timeout)
+        return self.forward_results.get(text.strip().lower())
+
+    def reverse(self, lat, lon, timeout):
+        self.calls.append(("reverse", lat, lon))
+        self._call(timeout)
+        return self.reverse_results.get((round(lat, 4), round(lon, 4)))
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=BREAKER_FAILURES, reset_after=BREAKER_RESET):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_after:
+            return "half_open"
+        return "open"
+
+    def available(self):
+        """Uma chamada agora seria tentada? (não reserva a chamada de teste)"""
+        with self._lock:
+            state = self._state()
+            return state == "closed" or (state == "half_open" and not self._probe_in_flight)
+
+    def allow(self):
+        """Reserva a chamada: no estado meio-aberto só uma passa por vez."""
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class ResilientProvider:
+    """Provedor com orçamento de latência, disjuntor e métricas."""
+
+    def __init__(self, provider, timeout=GEOCODE_TIMEOUT, breaker=None):
+        self.provider = provider
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "errors": 0, "rejected": 0, "total_ms": 0.0, "max_ms": 0.0}
+
+    def available(self):
+        return self.breaker.available()
+
+    def _call(self, fn, *args):
+        if not self.breaker.allow():
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise CircuitOpenError(f"geocodificador {self.provider.name} indisponível")
+        start = time.perf_counter()
+        try:
+            result = fn(*args, self.timeout)
+        except Exception:
+            self.breaker.record_failure()
+            self._record(start, error=True)
+            raise
+        self.breaker.record_success()
+        self._record(start)
+        return result
+
+    def _record(self, start, error=False):
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["errors"] += int(error)
+            self._stats["total_ms"] += elapsed_ms
+            self._stats["max_ms"] = max(self._stats["max_ms"], elapsed_ms)
+
+    def forward(self, text):
+        return self._call(self.provider.forward, text)
+
+    def reverse(self, lat, lon):
+        return self._call(self.provider.reverse, lat, lon)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["avg_ms"] = stats["total_ms"] / stats["calls"] if stats["calls"] else 0.0
+        stats["breaker"] = self.breaker.state
+        stats["provider"] = self.provider.name
+        return stats
+
+
+PROVIDERS = {
+    "nominatim": NominatimProvider,
+    "stub": StubProvider,
+}
+
+
+def make_provider(name=None):
+    """Provedor configurado em SIARA_GEOCODER, já envolvido pelo ResilientProvider."""
+    name = name or os.environ.get("SIARA_GEOCODER", "nominatim")
+    if name not in PROVIDERS:
+        raise ValueError(f"Geocodificador desconhecido: {name!r} (use {', '.join(PROVIDERS)})")
+    return ResilientProvider(PROVIDERS[name]())
@@ -0,0 +1,114 @@
+# services/geocoding_worker.py
+"""
+Fila de geocodificação em background.
+
+Uma única thread é dona do limite de taxa do Nominatim (1 requisição/s): as
+telas enfileiram pedidos e recebem um Future (ou um callback), em vez de
+dormir dentro do handler de evento como o RateLimiter do geopy fazia.
+
+- Fila de prioridade: pedidos interativos passam na frente de trabalhos em
+  lote (PRIORITY_INTERACTIVE < PRIORITY_BACKGROUND).
+- Pedidos repetidos para a mesma chave enquanto o primeiro está na fila ou
+  em andamento recebem o mesmo Future; se o novo pedido for mais urgente, a
+  chave é reenfileirada com a prioridade maior.
+"""
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+
+class GeocodingWorker:
+    """
+    :param handlers: dicionário tipo -> função(*args) que faz a chamada de
+        rede, ex.: {"forward": fetch_forward, "reverse": fetch_reverse}.
+    :param min_delay: intervalo mínimo, em segundos, entre duas chamadas.
+    """
+
+    def __init__(self, handlers, min_delay=1.0, name="siara-geocoder"):
+        self.handlers = handlers
+        self.min_delay = min_delay
+        self._queue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._inflight = {}         # (tipo, chave) -> [Future, prioridade, args]
+        self._lock = threading.Lock()
+        self._last_call = 0.0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, kind, key, *args, priority=PRIORITY_INTERACTIVE, callback=None):
+        """
+        Enfileira `handlers[kind](*args)` e devolve um Future com o resultado.
+        `key` identifica pedidos equivalentes (para deduplicação).
+        `callback(resultado)`, se informado, é chamado na thread do worker.
+        """
+        ident = (kind, key)
+        with self._lock:
+            entry = self._inflight.get(ident)
+            if entry is None:
+                entry = [Future(), priority, args]
+                self._inflight[ident] = entry
+                self._queue.put((priority, next(self._seq), ident))
+            elif priority < entry[1]:
+                entry[1] = priority
+                self._queue.put((priority, next(self._seq), ident))
+            future = entry[0]
+        if callback is not None:
+            add_result_callback(future, callback)
+        return future
+
+    def pending(self):
+        with self._lock:
+            return len(self._inflight)
+
+    def _run(self):
+        while True:
+            _, _, ident = self._queue.get()
+            with self._lock:
+                entry = self._inflight.get(ident)
+            # Reenfileiramento por prioridade deixa entradas antigas para trás
+            if entry is None or not entry[0].set_running_or_notify_cancel():
+                with self._lock:
+                    if entry is not None and self._inflight.get(ident) is entry:
+                        del self._inflight[ident]
+                continue
+
+            wait = self._last_call + self.min_delay - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self._last_call = time.monotonic()
+            try:
+                result = self.handlers[ident[0]](*entry[2])
+            except Exception as exc:
+                with self._lock:
+                    del self._inflight[ident]
+                entry[0].set_exception(exc)
+                continue
+            with self._lock:
+                del self._inflight[ident]
+            entry[0].set_result(result)
+
+
+def add_result_callback(future, callback):
+    """Chama `callback(resultado)` quando o Future terminar (erros são impressos)."""
+    def _done(f):
+        if f.cancelled():
+            return
+        exc = f.exception()
+        if exc is not None:
+            print(f"Erro na geocodificação em background: {exc}")
+            return
+        callback(f.result())
+
+    future.add_done_callback(_done)
+
+
+def resolved(value):
+    """Future já concluído com `value` (respostas vindas do cache)."""
+    future = Future()
+    future.set_result(value)
+    return future
@@ -0,0 +1,164 @@
+# services/image_gc.py
+"""
+Coleta de fotos órfãs em static/images (mark-and-sweep).
+
+    python -m services.image_gc [--dry-run] [--batch 500] [--grace-hours 24]
+
+- Marcação: as URLs em `image_url` de lost_animals e found_reports (via view
+  `posts`) viram o conjunto de arquivos em uso; as derivadas WebP
+  (variants/<nome>.<tamanho>.webp, ver services.image_pipeline) contam
+  como em uso se a original de mesmo nome conta.
+- Varredura: o diretório é percorrido de forma preguiçosa (os.scandir) em
+  lotes de `batch` arquivos, com uma pausa entre lotes, para rodar com o app
+  no ar sem disputar disco e banco.
+- Carência: arquivos modificados há menos de `grace` não são tocados — um
+  upload é gravado antes do post que o referencia ser salvo, e o store
+  renova o mtime quando reaproveita um blob existente.
+- Antes de apagar, cada lote de candidatos é conferido de novo no banco.
+- --dry-run só relata o que seria apagado e quanto espaço voltaria.
+"""
+import argparse
+import os
+import time
+from pathlib import Path
+
+from sqlalchemy import select, text
+
+from models import engine, session_scope
+from services.image_pipeline import IMAGE_DIR, VARIANT_DIR, local_image_path, variant_source_name
+from services.posts_read_model import posts
+
+DEFAULT_BATCH = 500
+DEFAULT_GRACE = 24 * 3600
+DEFAULT_PAUSE = 0.05
+
+
+def _iter_files(root):
+    """Arquivos sob `root`, sem montar a lista inteira na memória."""
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry
+
+
+def _url_for(path):
+    return "/" + Path(path).relative_to(IMAGE_DIR.parent).as_posix()
+
+
+def mark_referenced():
+    """(caminhos absolutos em uso, nomes dos originais em uso para as derivadas)."""
+    paths, names = set(), set()
+    with session_scope() as s:
+        for (url,) in s.execute(select(posts.c.image_url).where(posts.c.image_url.is_not(None)).distinct()):
+            path = local_image_path(url)
+            if path is not None:
+                paths.add(os.path.realpath(path))
+                names.add(path.name)
+    return paths, names
+
+
+def _still_referenced(urls):
+    """Confirma no banco, imediatamente antes de apagar, que as URLs seguem sem uso."""
+    if not urls:
+        return set()
+    with session_scope() as s:
+        stmt = select(posts.c.image_url).where(posts.c.image_url.in_(list(urls)))
+        return {url for (url,) in s.execute(stmt)}
+
+
+def collect_orphans(dry_run=False, batch_size=DEFAULT_BATCH, grace=DEFAULT_GRACE,
+                    pause=DEFAULT_PAUSE, log=print):
+    """
+    Apaga (ou, em dry_run, só lista) as fotos sem referência.
+    Devolve {"scanned", "orphans", "bytes", "deleted", "skipped_recent", "sample"}.
+    """
+    report = {"scanned": 0, "orphans": 0, "bytes": 0, "deleted": 0, "skipped_recent": 0, "sample": []}
+    if not IMAGE_DIR.exists():
+        return report
+
+    referenced, referenced_names = mark_referenced()
+    variant_root = os.path.realpath(VARIANT_DIR)
+    cutoff = time.time() - grace
+    batch = []
+
+    def sweep(candidates):
+        # Originais: reconfere no banco; derivadas seguem a original
+        originals = {_url_for(p): p for p, _ in candidates if not p.startswith(variant_root + os.sep)}
+        in_use = _still_referenced(originals)
+        in_use_names = {Path(originals[url]).name for url in in_use}
+        removed_urls = []
+        for path, size in candidates:
+            url = _url_for(path)
+            if url in in_use:
+                continue
+            if url not in originals and variant_source_name(os.path.basename(path)) in in_use_names:
+                continue
+            report["orphans"] += 1
+            report["bytes"] += size
+            if len(report["sample"]) < 20:
+                report["sample"].append(url)
+            if dry_run:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            report["deleted"] += 1
+            removed_urls.append(url)
+        if removed_urls:
+            with engine.begin() as conn:
+                conn.execute(
+                    text("DELETE FROM image_blobs WHERE url = :url AND refcount = 0"),
+                    [{"url": u} for u in removed_urls],
+                )
+                conn.execute(
+                    text("DELETE FROM photo_hashes WHERE url = :url"),
+                    [{"url": u} for u in removed_urls],
+                )
+
+    for entry in _iter_files(str(IMAGE_DIR)):
+        report["scanned"] += 1
+        path = os.path.realpath(entry.path)
+        if path in referenced:
+            continue
+        if path.startswith(variant_root + os.sep) and variant_source_name(entry.name) in referenced_names:
+            continue
+        st = entry.stat(follow_symlinks=False)
+        if st.st_mtime > cutoff:
+            report["skipped_recent"] += 1  # inclui temporários de gravações em andamento
+            continue
+        batch.append((path, st.st_size))
+        if len(batch) >= batch_size:
+            sweep(batch)
+            batch = []
+            log(f"{report['scanned']} arquivos verificados, {report['orphans']} órfãos.")
+            time.sleep(pause)
+    if batch:
+        sweep(batch)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Remove fotos sem post que as referencie.")
+    parser.add_argument("--dry-run", action="store_true", help="só relata, não apaga")
+    parser.add_argument("--batch", type=int, default=DEFAULT_BATCH, help="arquivos por lote")
+    parser.add_argument("--grace-hours", type=float, default=DEFAULT_GRACE / 3600,
+                        help="ignora arquivos modificados há menos que isso")
+    parser.add_argument("--pause", type=float, default=DEFAULT_PAUSE, help="segundos entre lotes")
+    args = parser.parse_args(argv)
+
+    report = collect_orphans(args.dry_run, args.batch, args.grace_hours * 3600, args.pause)
+    action = "seriam apagados" if args.dry_run else "apagados"
+    print(f"{report['scanned']} arquivos verificados; {report['orphans']} órfãos "
+          f"({report['bytes'] / (1024 * 1024):.1f} MiB) {action}; "
+          f"{report['skipped_recent']} recentes ignorados.")
+    for url in report["sample"]:
+        print(f"  {url}")
+
+
+if __name__ == "__main__":
+    main()
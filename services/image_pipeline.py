@@ -0,0 +1,145 @@
+# services/image_pipeline.py
+"""
+Derivadas de tamanho fixo das fotos enviadas.
+
+Ao salvar uma foto, `create_variants` gera versões WebP para cada uso:
+
+    card     400x400, recortada ao centro (cards de 200x200 do feed, 2x)
+    preview  600x600, sem recorte (pré-visualização nos formulários)
+    full     1600x1600, sem recorte (visualização ampliada)
+
+Elas ficam em static/images/variants/<nome com extensão>.<tamanho>.webp
+(x.jpg e x.png não disputam a mesma derivada) e `variant_url(image_url,
+tamanho)` devolve a URL da derivada quando ela existe — senão a original,
+então posts antigos continuam funcionando.
+
+Pillow é dependência opcional: sem ela nenhuma derivada é gerada e tudo
+usa a imagem original. Para gerar as derivadas das fotos já salvas
+(inclusive as que só têm derivadas no formato antigo, sem a extensão no
+nome — estas o services.image_gc recolhe depois como órfãs):
+
+    python -m services.image_pipeline rebuild
+"""
+import argparse
+import os
+from pathlib import Path
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow não instalado: pipeline desativado
+    Image = None
+
+STATIC_DIR = Path(os.getcwd()) / "static"
+IMAGE_DIR = STATIC_DIR / "images"
+VARIANT_DIR = IMAGE_DIR / "variants"
+
+# tamanho -> (largura, altura, recortar para preencher?)
+VARIANT_SIZES = {
+    "card": (400, 400, True),
+    "preview": (600, 600, False),
+    "full": (1600, 1600, False),
+}
+
+WEBP_QUALITY = int(os.environ.get("SIARA_WEBP_QUALITY", "80"))
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".webp")
+
+
+def pipeline_available():
+    return Image is not None
+
+
+def _variant_path(original_name, size):
+    return VARIANT_DIR / f"{Path(original_name).name}.{size}.webp"
+
+
+def variant_source_name(variant_name):
+    """Nome do arquivo original de uma derivada ("x.jpg.card.webp" -> "x.jpg")."""
+    return variant_name.rsplit(".", 2)[0]
+
+
+def local_image_path(image_url):
+    """
+    Caminho em static/ de uma URL de imagem local ("/images/x.jpg" ou
+    "static/images/x.jpg"); None para URLs externas ou blobs inline.
+    """
+    if not image_url or "://" in image_url or image_url.startswith("flet-bytes-encoded:"):
+        return None
+    relative = image_url.lstrip("/")
+    if relative.startswith("static/"):
+        relative = relative[len("static/"):]
+    path = STATIC_DIR / relative
+    return path if path.suffix.lower() in IMAGE_EXTENSIONS else None
+
+
+def create_variants(original_path):
+    """
+    Gera as derivadas WebP de `original_path`. Devolve {tamanho: caminho}
+    das que foram criadas (vazio sem Pillow ou se a imagem for ilegível).
+    """
+    if Image is None:
+        return {}
+    original_path = Path(original_path)
+    VARIANT_DIR.mkdir(parents=True, exist_ok=True)
+    created = {}
+    try:
+        with Image.open(original_path) as img:
+            img = ImageOps.exif_transpose(img)  # fotos de celular vêm "deitadas"
+            img = img.convert("RGBA" if img.mode in ("RGBA", "LA", "P") else "RGB")
+            for size, (width, height, crop) in VARIANT_SIZES.items():
+                if crop:
+                    variant = ImageOps.fit(img, (width, height), Image.LANCZOS)
+                else:
+                    variant = img.copy()
+                    variant.thumbnail((width, height), Image.LANCZOS)  # nunca amplia
+                target = _variant_path(original_path.name, size)
+                tmp = target.with_suffix(".tmp")
+                variant.save(tmp, "WEBP", quality=WEBP_QUALITY, method=4)
+                os.replace(tmp, target)
+                created[size] = target
+    except Exception as e:
+        print(f"Erro ao gerar derivadas de {original_path}: {e}")
+    return created
+
+
+def variant_url(image_url, size):
+    """URL da derivada `size` de `image_url`, ou a própria `image_url` se não houver."""
+    if size not in VARIANT_SIZES:
+        raise ValueError(f"Tamanho de imagem desconhecido: {size!r} (use {', '.join(VARIANT_SIZES)})")
+    path = local_image_path(image_url)
+    if path is None:
+        return image_url
+    variant = _variant_path(path.name, size)
+    if not variant.exists():
+        return image_url
+    return "/" + variant.relative_to(STATIC_DIR).as_posix()
+
+
+def rebuild_all(force=False):
+    """Gera derivadas das imagens em static/images que ainda não as têm."""
+    count = 0
+    for path in sorted(IMAGE_DIR.glob("*")):
+        if not path.is_file() or path.suffix.lower() not in IMAGE_EXTENSIONS:
+            continue
+        if not force and all(_variant_path(path.name, s).exists() for s in VARIANT_SIZES):
+            continue
+        if create_variants(path):
+            count += 1
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Derivadas WebP das fotos enviadas.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rebuild = sub.add_parser("rebuild", help="gera derivadas das imagens existentes")
+    rebuild.add_argument("--force", action="store_true", help="regera mesmo as que já existem")
+    args = parser.parse_args(argv)
+
+    if not pipeline_available():
+        parser.exit(1, "Pillow não está instalado; instale-o para gerar derivadas.\n")
+    if args.command == "rebuild":
+        print(f"{rebuild_all(args.force)} imagens processadas.")
+
+
+if __name__ == "__main__":
+    main()
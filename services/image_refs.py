@@ -0,0 +1,87 @@
+# services/image_refs.py
+"""
+Contadores de referência das fotos do store endereçado por conteúdo
+(services/image_store.py).
+
+A tabela `image_blobs` guarda, por URL de blob, o tamanho e quantos posts
+apontam para ele. Os contadores são mantidos por triggers em
+lost_animals/found_reports (como o índice espacial), então exclusões em
+lote e em cascata também contam.
+"""
+
+BLOB_URL_PREFIX = "/images/blobs/"
+
+# Tabelas de posts com coluna image_url
+_POST_TABLES = ("lost_animals", "found_reports")
+
+
+def _ddl_for(table):
+    is_blob = "LIKE '" + BLOB_URL_PREFIX + "%'"
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS {table}_blob_ai AFTER INSERT ON {table}
+            WHEN new.image_url {is_blob}
+            BEGIN
+                INSERT OR IGNORE INTO image_blobs (url, refcount) VALUES (new.image_url, 0);
+                UPDATE image_blobs SET refcount = refcount + 1 WHERE url = new.image_url;
+            END""",
+
+        f"""CREATE TRIGGER IF NOT EXISTS {table}_blob_au AFTER UPDATE OF image_url ON {table}
+            WHEN new.image_url IS NOT old.image_url
+            BEGIN
+                UPDATE image_blobs SET refcount = refcount - 1
+                    WHERE url = old.image_url AND refcount > 0;
+                INSERT OR IGNORE INTO image_blobs (url, refcount)
+                    SELECT new.image_url, 0 WHERE new.image_url {is_blob};
+                UPDATE image_blobs SET refcount = refcount + 1 WHERE url = new.image_url;
+            END""",
+
+        f"""CREATE TRIGGER IF NOT EXISTS {table}_blob_ad AFTER DELETE ON {table}
+            WHEN old.image_url {is_blob}
+            BEGIN
+                UPDATE image_blobs SET refcount = refcount - 1
+                    WHERE url = old.image_url AND refcount > 0;
+            END""",
+    ]
+
+
+def recount_image_refs(conn):
+    """
+    Recalcula todos os contadores a partir dos posts, numa só agregação
+    (GROUP BY sobre os índices de image_url). Usado na criação da tabela e
+    por migrações que escrevem image_url com os triggers ainda inexistentes.
+    """
+    refs = " UNION ALL ".join(f"SELECT image_url FROM {t}" for t in _POST_TABLES)
+    conn.exec_driver_sql("UPDATE image_blobs SET refcount = 0")
+    conn.exec_driver_sql(
+        f"""INSERT INTO image_blobs (url, refcount)
+            SELECT image_url, COUNT(*) FROM ({refs})
+            WHERE image_url LIKE '{BLOB_URL_PREFIX}%'
+            GROUP BY image_url
+            ON CONFLICT(url) DO UPDATE SET refcount = excluded.refcount"""
+    )
+
+
+def ensure_image_refs(engine):
+    """
+    Cria `image_blobs` e os triggers. Os contadores só são calculados a
+    partir dos posts quando a tabela é criada; depois, os triggers os mantêm.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        exists = conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'image_blobs'"
+        ).scalar()
+        conn.exec_driver_sql(
+            """CREATE TABLE IF NOT EXISTS image_blobs (
+                   url TEXT PRIMARY KEY,
+                   size INTEGER,
+                   refcount INTEGER NOT NULL DEFAULT 0,
+                   created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+               )"""
+        )
+        for table in _POST_TABLES:
+            for stmt in _ddl_for(table):
+                conn.exec_driver_sql(stmt)
+        if not exists:
+            recount_image_refs(conn)
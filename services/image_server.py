@@ -0,0 +1,250 @@
+# services/image_server.py
+"""
+Servidor HTTP dedicado às fotos (static/images), no lugar dos assets do Flet.
+
+- Blobs endereçados por conteúdo (/images/blobs/...) nunca mudam: vão com
+  `Cache-Control: immutable` de um ano e ETag = hash, então o navegador nem
+  pergunta de novo.
+- Os demais arquivos (derivadas, uploads antigos) usam ETag de tamanho +
+  mtime e são revalidados: repetir o feed custa só respostas 304.
+- If-None-Match (ou, sem ele, If-Modified-Since) -> 304; Range (um
+  intervalo, com If-Range) -> 206.
+- O corpo sai por socket.sendfile (os.sendfile, sem cópia para o espaço do
+  usuário) a partir de SENDFILE_MIN_BYTES.
+
+Sobe junto com o app (app.py) numa thread; as telas montam o `src` das
+imagens com `image_src(url)`. A porta é fixa (SIARA_IMAGE_PORT, padrão
+8551): a origem das imagens não muda entre reinícios, senão o cache de um
+ano do navegador seria perdido a cada um. Quando o Flet web é acessado de
+outras máquinas, suba com SIARA_IMAGE_HOST=0.0.0.0 e informe o endereço
+visto pelos clientes em SIARA_IMAGE_PUBLIC_URL.
+"""
+import logging
+import mimetypes
+import os
+import re
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+from services.image_pipeline import IMAGE_DIR
+from services.image_refs import BLOB_URL_PREFIX
+
+IMAGE_HOST = os.environ.get("SIARA_IMAGE_HOST", "127.0.0.1")
+IMAGE_PORT = int(os.environ.get("SIARA_IMAGE_PORT", "8551"))
+# URL pública, quando o navegador acessa o servidor por outro endereço
+IMAGE_PUBLIC_URL = os.environ.get("SIARA_IMAGE_PUBLIC_URL")
+
+URL_PREFIX = "/images/"
+SENDFILE_MIN_BYTES = 64 * 1024
+_COPY_CHUNK = 256 * 1024
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "public, no-cache"
+
+mimetypes.add_type("image/webp", ".webp")
+
+logger = logging.getLogger("siara.images")
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+_BLOB_NAME_RE = re.compile(r"^([0-9a-f]{64})\.")
+
+
+def _etag_for(relative, st):
+    match = _BLOB_NAME_RE.match(os.path.basename(relative))
+    if relative.startswith(BLOB_URL_PREFIX[len(URL_PREFIX):]) and match:
+        return f'"{match.group(1)}"', IMMUTABLE_CACHE
+    return f'"{st.st_size:x}-{st.st_mtime_ns:x}"', REVALIDATE_CACHE
+
+
+def _etag_matches(header, etag):
+    if header.strip() == "*":
+        return True
+    # comparação fraca: W/"x" equivale a "x"
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def _not_modified_since(header, mtime):
+    """True se o arquivo não mudou desde a data de If-Modified-Since."""
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False  # data inválida: ignora o cabeçalho
+    if since is None or since.tzinfo is None:
+        return False
+    return int(mtime) <= since.timestamp()  # Last-Modified tem resolução de segundos
+
+
+def parse_range(header, size):
+    """(início, fim inclusivo) de um Range de um só intervalo; None = ignorar; ValueError = 416."""
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None  # vários intervalos ou unidade desconhecida: responde inteiro
+    first, last = match.groups()
+    if first == "" and last == "":
+        return None
+    if first == "":
+        length = int(last)
+        if length == 0:
+            raise ValueError("intervalo vazio")
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("intervalo fora do arquivo")
+    return start, end
+
+
+class ImageRequestHandler(BaseHTTPRequestHandler):
+    server_version = "SiaraImages/1.0"
+    protocol_version = "HTTP/1.1"  # keep-alive entre as imagens do feed
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def log_message(self, fmt, *args):
+        logger.debug("%s - %s", self.address_string(), fmt % args)
+
+    def _resolve(self):
+        path = unquote(urlsplit(self.path).path)
+        if not path.startswith(URL_PREFIX):
+            return None, None
+        relative = path[len(URL_PREFIX):]
+        root = os.path.realpath(IMAGE_DIR)
+        full = os.path.realpath(os.path.join(root, relative))
+        if not full.startswith(root + os.sep):  # impede ../
+            return None, None
+        return relative, full
+
+    def _send_empty(self, status, headers=()):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _serve(self, send_body):
+        relative, full = self._resolve()
+        if full is None or not os.path.isfile(full):
+            self._send_empty(HTTPStatus.NOT_FOUND)
+            return
+
+        with open(full, "rb") as f:
+            st = os.fstat(f.fileno())
+            size = st.st_size
+            etag, cache_control = _etag_for(relative, st)
+            common = [
+                ("ETag", etag),
+                ("Cache-Control", cache_control),
+                ("Last-Modified", formatdate(st.st_mtime, usegmt=True)),
+                ("Accept-Ranges", "bytes"),
+                ("Access-Control-Allow-Origin", "*"),  # Flet web busca imagens via XHR
+            ]
+
+            if_none_match = self.headers.get("If-None-Match")
+            if_modified_since = self.headers.get("If-Modified-Since")
+            if if_none_match:
+                not_modified = _etag_matches(if_none_match, etag)
+            else:
+                not_modified = bool(if_modified_since) and _not_modified_since(if_modified_since, st.st_mtime)
+            if not_modified:
+                self._send_empty(HTTPStatus.NOT_MODIFIED, common)
+                return
+
+            start, end = 0, size - 1
+            status = HTTPStatus.OK
+            range_header = self.headers.get("Range")
+            if_range = self.headers.get("If-Range")
+            if range_header and size and (not if_range or if_range.strip() == etag):
+                try:
+                    requested = parse_range(range_header, size)
+                except ValueError:
+                    self._send_empty(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE,
+                                     common + [("Content-Range", f"bytes */{size}")])
+                    return
+                if requested is not None:
+                    start, end = requested
+                    status = HTTPStatus.PARTIAL_CONTENT
+
+            length = end - start + 1 if size else 0
+            self.send_response(status)
+            for name, value in common:
+                self.send_header(name, value)
+            self.send_header("Content-Type", mimetypes.guess_type(full)[0] or "application/octet-stream")
+            self.send_header("Content-Length", str(length))
+            if status == HTTPStatus.PARTIAL_CONTENT:
+                self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+            self.end_headers()
+            if send_body and length:
+                self._send_body(f, start, length)
+
+    def _send_body(self, f, offset, count):
+        self.wfile.flush()
+        try:
+            if count >= SENDFILE_MIN_BYTES:
+                # socket.sendfile usa os.sendfile quando disponível (zero cópia)
+                self.connection.sendfile(f, offset, count)
+                return
+            f.seek(offset)
+            remaining = count
+            while remaining:
+                chunk = f.read(min(_COPY_CHUNK, remaining))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True  # cliente desistiu (ex.: rolou o feed)
+
+
+_server = None
+_base_url = None
+_lock = threading.Lock()
+
+
+def start_image_server(host=IMAGE_HOST, port=IMAGE_PORT):
+    """
+    Sobe o servidor numa thread daemon (uma vez por processo) e devolve a URL
+    base. Se a porta estiver ocupada (outra instância, outro serviço), só
+    avisa e devolve None: `image_src` continua com as URLs de asset do Flet.
+    """
+    global _server, _base_url
+    with _lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), ImageRequestHandler)
+            except OSError as e:
+                logger.warning("Servidor de imagens não iniciado em %s:%s (%s); "
+                               "usando as URLs de asset do Flet.", host, port, e)
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="siara-images", daemon=True).start()
+            bound_host, bound_port = _server.server_address[:2]
+            if not IMAGE_PUBLIC_URL and bound_host in ("0.0.0.0", "::"):
+                logger.warning("Servidor de imagens em todas as interfaces sem SIARA_IMAGE_PUBLIC_URL; "
+                               "as URLs geradas só funcionam nesta máquina.")
+                bound_host = "localhost"
+            _base_url = (IMAGE_PUBLIC_URL or f"http://{bound_host}:{bound_port}").rstrip("/")
+            logger.info("Servidor de imagens em %s", _base_url)
+        return _base_url
+
+
+def stop_image_server():
+    global _server, _base_url
+    with _lock:
+        if _server is not None:
+            _server.shutdown()
+            _server.server_close()
+            _server = _base_url = None
+
+
+def image_src(url):
+    """`src` para um ft.Image: imagens locais passam pelo servidor, se ele estiver no ar."""
+    if _base_url and url and url.startswith(URL_PREFIX):
+        return _base_url + url
+    return url
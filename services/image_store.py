@@ -0,0 +1,164 @@
+# services/image_store.py
+"""
+Armazenamento de fotos endereçado por conteúdo.
+
+Cada arquivo é gravado com o nome do seu SHA-256, em subpastas pelos dois
+primeiros pares do hash (static/images/blobs/ab/cd/abcd....jpg), e a URL
+gravada no post é "/images/blobs/ab/cd/abcd....jpg". A mesma foto enviada
+duas vezes vira um único arquivo: o hash é calculado lendo a origem em
+blocos e, se o blob já existe, nada é escrito.
+
+A tabela `image_blobs` (services/image_refs.py) conta quantos posts apontam
+para cada blob, e `photo_hashes` (services/photo_index.py) guarda o hash
+perceptual de cada um, para a busca de fotos parecidas.
+"""
+import hashlib
+import os
+import uuid
+
+from sqlalchemy import text
+
+from models import engine
+from services.image_pipeline import IMAGE_DIR, create_variants
+from services.image_refs import BLOB_URL_PREFIX
+from services.photo_index import index_photo
+
+BLOB_DIR = IMAGE_DIR / "blobs"
+CHUNK_SIZE = 1024 * 1024
+
+
+class ImageTooLargeError(ValueError):
+    """O arquivo passou do tamanho máximo durante a leitura."""
+
+
+def capped_chunks(chunks, max_bytes):
+    """Repassa os blocos, levantando ImageTooLargeError ao passar de `max_bytes`."""
+    total = 0
+    for chunk in chunks:
+        total += len(chunk)
+        if max_bytes is not None and total > max_bytes:
+            raise ImageTooLargeError(f"imagem maior que {max_bytes} bytes")
+        yield chunk
+
+
+def read_chunks(f, chunk_size=CHUNK_SIZE):
+    return iter(lambda: f.read(chunk_size), b"")
+
+
+def blob_path(digest, extension):
+    return BLOB_DIR / digest[:2] / digest[2:4] / f"{digest}{extension}"
+
+
+def blob_url(digest, extension):
+    return f"{BLOB_URL_PREFIX}{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+
+def _register(url, size):
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT OR IGNORE INTO image_blobs (url, size, refcount) VALUES (:url, :size, 0)"),
+            {"url": url, "size": size},
+        )
+
+
+def _hash_file(path, max_bytes=None):
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in capped_chunks(read_chunks(f), max_bytes):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def store_file(src_path, extension, max_bytes=None):
+    """
+    Guarda o arquivo `src_path` no store e devolve a URL do blob. Se já
+    existe um blob com o mesmo conteúdo, só devolve a URL dele.
+    Levanta ImageTooLargeError se o arquivo passar de `max_bytes`.
+    """
+    extension = extension.lower()
+    digest, size = _hash_file(src_path, max_bytes)
+    target = blob_path(digest, extension)
+    if target.exists():
+        _touch(target)
+    else:
+        with open(src_path, "rb") as src:
+            # O arquivo pode ter crescido entre o hash e a cópia
+            _write_new_blob(capped_chunks(read_chunks(src), max_bytes), target)
+    url = blob_url(digest, extension)
+    _register(url, size)
+    index_photo(url, target)
+    return url
+
+
+def store_stream(chunks, extension, max_bytes=None):
+    """
+    Versão para dados que só podem ser lidos uma vez (iterável de bytes):
+    grava num temporário calculando o hash e descarta se o blob já existe.
+    Devolve (url, tamanho). Passando de `max_bytes`, o temporário é apagado
+    e ImageTooLargeError é levantada.
+    """
+    extension = extension.lower()
+    BLOB_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = BLOB_DIR / f".incoming-{uuid.uuid4().hex}"
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp, "wb") as out:
+            for chunk in capped_chunks(chunks, max_bytes):
+                digest.update(chunk)
+                size += len(chunk)
+                out.write(chunk)
+        target = blob_path(digest.hexdigest(), extension)
+        if target.exists():
+            tmp.unlink()
+            _touch(target)
+        else:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp, target)
+            create_variants(target)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    url = blob_url(digest.hexdigest(), extension)
+    _register(url, size)
+    index_photo(url, target)
+    return url, size
+
+
+def _touch(target):
+    # Blob reaproveitado: mtime renovado para a carência do coletor de órfãos
+    # (services/image_gc.py) não apagá-lo antes de o post novo ser salvo
+    try:
+        os.utime(target)
+    except OSError:
+        pass
+
+
+def _write_new_blob(chunks, target):
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f".{target.name}.{uuid.uuid4().hex}")
+    try:
+        with open(tmp, "wb") as out:
+            for chunk in chunks:
+                out.write(chunk)
+        os.replace(tmp, target)  # atômico: nunca há blob pela metade com o nome final
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    # Derivadas WebP (card/preview/full), só na primeira vez que o blob aparece
+    create_variants(target)
+
+
+def blob_refcount(url):
+    """Quantos posts apontam para o blob (0 se desconhecido)."""
+    with engine.connect() as conn:
+        count = conn.execute(
+            text("SELECT refcount FROM image_blobs WHERE url = :url"), {"url": url}
+        ).scalar()
+    return count or 0
+
+
+def is_blob_url(url):
+    return bool(url) and url.startswith(BLOB_URL_PREFIX)
@@ -0,0 +1,113 @@
+# services/migrate_inline_images.py
+"""
+Migração única: tira as fotos guardadas inline em `image_url`
+("flet-bytes-encoded:<nome>|<bytes criptografados>", formato antigo da tela
+de animal perdido) e as grava no store de imagens, trocando a coluna pela
+URL curta do arquivo.
+
+    python -m services.migrate_inline_images [--batch 20] [--vacuum]
+
+As linhas são lidas uma a uma (só os ids vêm de uma vez), então nenhum lote
+carrega todos os blobs na memória. Cada foto é gravada no store (arquivo,
+contador em image_blobs e hash perceptual) antes da transação do lote: o
+store escreve no banco por conexões próprias, que ficariam esperando o lock
+de escrita de uma transação aberta. Depois, os UPDATEs do lote vão numa
+transação curta; rodar de novo continua das linhas que ainda estão no
+formato antigo. No final, os contadores de image_blobs são recalculados de
+uma vez a partir dos posts; --vacuum ainda compacta o arquivo do banco,
+devolvendo o espaço ao disco.
+"""
+import argparse
+import os
+from pathlib import Path
+
+from sqlalchemy import select, update
+
+from models import engine, session_scope
+from services.image_refs import recount_image_refs
+from services.image_store import store_stream
+from services.posts_read_model import POST_KINDS, post_table
+
+INLINE_PREFIX = "flet-bytes-encoded:"
+APP_SECRET = os.environ.get("APP_SECRET", "super-secret-key-default")
+DEFAULT_BATCH = 20
+
+
+def decode_inline_image(value, secret=APP_SECRET):
+    """(nome original, bytes) de um valor "flet-bytes-encoded:<nome>|<cifrado>"."""
+    from flet.security import decrypt
+
+    name, encrypted = value[len(INLINE_PREFIX):].split("|", 1)
+    # A tela antiga cifrava os bytes decodificados como latin-1
+    data = decrypt(encrypted, secret).encode("latin-1")
+    if not data:
+        raise ValueError("conteúdo vazio")
+    return name, data
+
+
+def _inline_ids(kind):
+    t = post_table(kind)
+    with session_scope() as s:
+        return list(s.execute(select(t.c.id).where(t.c.image_url.like(f"{INLINE_PREFIX}%"))).scalars())
+
+
+def _inline_value(t, item_id):
+    with session_scope() as s:
+        value = s.execute(select(t.c.image_url).where(t.c.id == item_id)).scalar()
+    if not value or not value.startswith(INLINE_PREFIX):
+        return None  # já migrada por outra execução
+    return value
+
+
+def migrate(batch_size=DEFAULT_BATCH, secret=APP_SECRET, log=print):
+    """Migra todas as imagens inline; devolve {"migrated", "failed"}."""
+    summary = {"migrated": 0, "failed": 0}
+    for kind in POST_KINDS:
+        t = post_table(kind)
+        ids = _inline_ids(kind)
+        if ids:
+            log(f"{kind}: {len(ids)} imagens inline.")
+        for start in range(0, len(ids), batch_size):
+            # 1. Fotos para o store, fora de qualquer transação de escrita
+            new_urls = {}
+            for item_id in ids[start:start + batch_size]:
+                value = _inline_value(t, item_id)
+                if value is None:
+                    continue
+                try:
+                    name, data = decode_inline_image(value, secret)
+                    extension = Path(name).suffix.lower() or ".jpg"
+                    new_urls[item_id], _size = store_stream([data], extension)
+                except Exception as e:
+                    log(f"{kind} #{item_id}: não foi possível extrair a imagem ({e}).")
+                    summary["failed"] += 1
+            # 2. Só os UPDATEs do lote numa transação
+            with session_scope() as s:
+                for item_id, url in new_urls.items():
+                    result = s.execute(
+                        update(t)
+                        .where(t.c.id == item_id, t.c.image_url.like(f"{INLINE_PREFIX}%"))
+                        .values(image_url=url)
+                    )
+                    summary["migrated"] += result.rowcount
+            log(f"{kind}: {min(start + batch_size, len(ids))}/{len(ids)} processadas.")
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move imagens inline do banco para arquivos.")
+    parser.add_argument("--batch", type=int, default=DEFAULT_BATCH, help="linhas por transação")
+    parser.add_argument("--vacuum", action="store_true", help="compacta o banco ao final")
+    args = parser.parse_args(argv)
+
+    summary = migrate(args.batch)
+    with engine.begin() as conn:
+        recount_image_refs(conn)
+    if args.vacuum and summary["migrated"]:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.exec_driver_sql("VACUUM")
+    print(f"Concluído: {summary}")
+
+
+if __name__ == "__main__":
+    main()
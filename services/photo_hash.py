@@ -0,0 +1,132 @@
+# services/photo_hash.py
+"""
+Hash perceptual das fotos, para achar fotos parecidas do mesmo animal.
+
+`dhash` (difference hash) reduz a foto a 9x8 tons de cinza e guarda, em 64
+bits, se cada pixel é mais claro que o vizinho da direita. Fotos parecidas
+(recorte, compressão, brilho ou tamanho diferentes) ficam a poucos bits de
+distância de Hamming.
+
+`BKTree` indexa os hashes por distância de Hamming: a busca "tudo a até d
+bits de h" só visita os ramos que a desigualdade triangular permite, em vez
+de comparar com todas as fotos.
+
+Pillow é dependência opcional (como em services/image_pipeline.py): sem
+ela `dhash` devolve None e nada é indexado.
+"""
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow não instalado: sem hash perceptual
+    Image = None
+
+HASH_BITS = 64
+_HASH_SIZE = 8  # 8x8 comparações -> 64 bits
+_SIGN_BIT = 1 << (HASH_BITS - 1)
+
+
+def pipeline_available():
+    return Image is not None
+
+
+def dhash(path):
+    """Hash de 64 bits (int sem sinal) da imagem em `path`; None sem Pillow ou se ilegível."""
+    if Image is None:
+        return None
+    try:
+        with Image.open(path) as img:
+            # JPEG: decodifica já reduzido (DCT em escala), bem mais rápido
+            img.draft("L", (_HASH_SIZE * 8, _HASH_SIZE * 8))
+            img = ImageOps.exif_transpose(img)
+            small = img.convert("L").resize((_HASH_SIZE + 1, _HASH_SIZE), Image.LANCZOS)
+            pixels = small.tobytes()  # modo L: um byte por pixel
+    except Exception as e:
+        print(f"Erro ao calcular hash de {path}: {e}")
+        return None
+    value = 0
+    for row in range(_HASH_SIZE):
+        offset = row * (_HASH_SIZE + 1)
+        for col in range(_HASH_SIZE):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+def to_db(value):
+    """O INTEGER do SQLite tem sinal: hashes >= 2^63 são gravados como negativos."""
+    return value - (1 << HASH_BITS) if value & _SIGN_BIT else value
+
+
+def from_db(value):
+    return value & ((1 << HASH_BITS) - 1)
+
+
+class BKTree:
+    """Árvore BK sobre distância de Hamming; cada nó guarda os itens com aquele hash."""
+
+    def __init__(self):
+        self._root = None  # [hash, itens, {distância: filho}]
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, key, item):
+        self._size += 1
+        if self._root is None:
+            self._root = [key, [item], {}]
+            return
+        node = self._root
+        while True:
+            d = hamming(key, node[0])
+            if d == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [key, [item], {}]
+                return
+            node = child
+
+    def remove(self, key, item):
+        """Tira `item` do nó de `key` (o nó fica, só como caminho). True se estava lá."""
+        node = self._root
+        while node is not None:
+            d = hamming(key, node[0])
+            if d == 0:
+                if item in node[1]:
+                    node[1].remove(item)
+                    self._size -= 1
+                    return True
+                return False
+            node = node[2].get(d)
+        return False
+
+    def search(self, key, max_distance):
+        """[(distância, item)] dos itens a até `max_distance` bits de `key`, mais próximos primeiro."""
+        found = []
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            d = hamming(key, node[0])
+            if d <= max_distance:
+                found.extend((d, item) for item in node[1])
+            # Só filhos com |d - distância da aresta| <= max_distance podem ter resultados
+            for edge, child in node[2].items():
+                if d - max_distance <= edge <= d + max_distance:
+                    stack.append(child)
+        found.sort(key=lambda pair: pair[0])
+        return found
+
+
+def ensure_photo_hashes(engine):
+    """Cria a tabela `photo_hashes` (URL da imagem -> dHash)."""
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            """CREATE TABLE IF NOT EXISTS photo_hashes (
+                   url TEXT PRIMARY KEY,
+                   dhash INTEGER NOT NULL
+               )"""
+        )
@@ -0,0 +1,307 @@
+# services/photo_index.py
+"""
+Índice de fotos parecidas entre posts (ex.: "que animais perdidos se
+parecem com a foto deste relato de encontrado?").
+
+- Cada foto salva no store ganha um dHash (services/photo_hash.py) na
+  tabela `photo_hashes`, por URL.
+- Por kind, uma BKTree em memória com os hashes das fotos dos posts é
+  montada na primeira consulta e depois mantida de forma incremental:
+  posts novos entram pelo id (só os acima do maior já indexado), e posts
+  editados ou excluídos pela Session são reindexados após o commit. Cada
+  árvore só depende da sua tabela: criar um relato de encontrado não mexe
+  no índice de perdidos.
+- Os resultados de uma busca são conferidos no banco antes de sair
+  (exclusões feitas fora do ORM somem na hora); a árvore inteira é
+  remontada a cada SIARA_PHOTO_INDEX_TTL segundos, para pegar escritas de
+  outros processos.
+- Uma consulta visita só os ramos da árvore a até `max_distance` bits.
+
+Para calcular os hashes das fotos já salvas:
+
+    python -m services.photo_index reindex [--force] [--batch 200]
+    python -m services.photo_index similar /images/blobs/ab/cd/....jpg
+"""
+import argparse
+import os
+import threading
+import time
+from typing import NamedTuple, Optional
+
+from sqlalchemy import column, event, select, table, text
+from sqlalchemy.orm import Session as _OrmSession
+
+from models import engine, session_scope
+from services.image_pipeline import local_image_path
+from services.photo_hash import BKTree, dhash, from_db, pipeline_available, to_db
+from services.posts_read_model import POST_KINDS, post_columns, post_table, posts
+
+# Distância máxima (em bits, de 64) para considerar duas fotos parecidas
+MATCH_DISTANCE = int(os.environ.get("SIARA_PHOTO_MATCH_DISTANCE", "10"))
+# Remontagem completa periódica (escritas de outros processos, ex. CLIs)
+INDEX_TTL = float(os.environ.get("SIARA_PHOTO_INDEX_TTL", "600"))
+DEFAULT_BATCH = 200
+
+HASH_TABLE = "photo_hashes"
+photo_hashes = table(HASH_TABLE, column("url"), column("dhash"))
+
+_ITEM_FIELDS = ("id", "name", "species", "image_url")
+_CHANGES_KEY = "siara_photo_changes"
+
+
+class PhotoMatch(NamedTuple):
+    kind: str
+    id: int
+    name: Optional[str]
+    species: Optional[str]
+    image_url: str
+    distance: int
+
+
+# ---- Hashes por URL ----
+
+def stored_hash(url):
+    with engine.connect() as conn:
+        value = conn.execute(
+            text("SELECT dhash FROM photo_hashes WHERE url = :url"), {"url": url}
+        ).scalar()
+    return None if value is None else from_db(value)
+
+
+def _save_hashes(pairs):
+    """Grava [(url, hash)]."""
+    if not pairs:
+        return
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT OR REPLACE INTO photo_hashes (url, dhash) VALUES (:url, :dhash)"),
+            [{"url": url, "dhash": to_db(value)} for url, value in pairs],
+        )
+
+
+def index_photo(url, path=None):
+    """
+    Calcula e grava o hash da foto `url` (lida de `path` ou do arquivo local
+    da URL), se ainda não existir. Devolve o hash, ou None se não der.
+    """
+    value = stored_hash(url)
+    if value is not None:
+        return value
+    path = path or local_image_path(url)
+    if path is None or not os.path.isfile(path):
+        return None
+    value = dhash(path)
+    if value is not None:
+        _save_hashes([(url, value)])
+    return value
+
+
+# ---- Índice em memória ----
+
+class PhotoIndex:
+    """BKTree das fotos dos posts de um kind, atualizada de forma incremental."""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self._tree = None
+        self._entries = {}       # id do post -> (hash, item na árvore)
+        self._max_id = 0
+        self._changed = set()    # ids editados/excluídos desde a última consulta
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+
+    def _rows(self, *where):
+        t = post_table(self.kind)
+        stmt = (
+            select(*post_columns(self.kind, _ITEM_FIELDS), photo_hashes.c.dhash)
+            .select_from(t.join(photo_hashes, photo_hashes.c.url == t.c.image_url))
+            .where(*where)
+        )
+        with session_scope() as s:
+            return s.execute(stmt).all()
+
+    def _add(self, row):
+        item_id, name, species, image_url, value = row
+        key, item = from_db(value), (item_id, name, species, image_url)
+        self._tree.add(key, item)
+        self._entries[item_id] = (key, item)
+        self._max_id = max(self._max_id, item_id)
+
+    def _discard(self, item_id):
+        entry = self._entries.pop(item_id, None)
+        if entry is not None:
+            self._tree.remove(*entry)
+
+    def _rebuild(self):
+        self._tree, self._entries, self._max_id = BKTree(), {}, 0
+        self._changed.clear()
+        for row in self._rows():
+            self._add(row)
+        self._built_at = time.monotonic()
+
+    def _refresh(self):
+        t = post_table(self.kind)
+        # Posts novos (inclusive os inseridos fora do ORM): só ids acima do maior indexado
+        for row in self._rows(t.c.id > self._max_id):
+            self._add(row)
+        # Editados/excluídos via Session: saem e voltam com a foto atual
+        changed, self._changed = self._changed, set()
+        if changed:
+            for item_id in changed:
+                self._discard(item_id)
+            for row in self._rows(t.c.id.in_(changed)):
+                self._add(row)
+
+    def _update(self):
+        if self._tree is None or time.monotonic() - self._built_at > INDEX_TTL:
+            self._rebuild()
+        else:
+            self._refresh()
+
+    def mark_changed(self, ids):
+        with self._lock:
+            self._changed.update(ids)
+
+    def reset(self):
+        with self._lock:
+            self._tree = None
+
+    def _confirm(self, found):
+        """Só os resultados cujo post ainda existe com a mesma foto."""
+        if not found:
+            return found
+        t = post_table(self.kind)
+        with session_scope() as s:
+            current = dict(s.execute(
+                select(t.c.id, t.c.image_url).where(t.c.id.in_({item[0] for _, item in found}))
+            ).all())
+        stale = {item[0] for _, item in found if current.get(item[0]) != item[3]}
+        if stale:
+            self.mark_changed(stale)  # excluídos fora da Session (ex.: delete_post)
+        return [(d, item) for d, item in found if item[0] not in stale]
+
+    def search(self, value, max_distance=MATCH_DISTANCE, limit=None):
+        with self._lock:
+            self._update()
+            found = self._tree.search(value, max_distance)
+        found = self._confirm(found)
+        matches = [
+            PhotoMatch(self.kind, item_id, name, species, image_url, distance)
+            for distance, (item_id, name, species, image_url) in found
+        ]
+        return matches[:limit] if limit is not None else matches
+
+
+photo_indexes = {kind: PhotoIndex(kind) for kind in POST_KINDS}
+_KIND_BY_TABLE = {post_table(kind).name: kind for kind in POST_KINDS}
+
+
+# ---- Posts alterados pela Session: reindexados após o commit ----
+
+@event.listens_for(_OrmSession, "after_flush")
+def _collect_changed_posts(session, flush_context):
+    changes = session.info.setdefault(_CHANGES_KEY, set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table_ = getattr(type(obj), "__table__", None)
+        kind = _KIND_BY_TABLE.get(table_.name) if table_ is not None else None
+        if kind is not None and obj.id is not None:
+            changes.add((kind, obj.id))
+
+
+@event.listens_for(_OrmSession, "after_commit")
+def _apply_changed_posts(session):
+    by_kind = {}
+    for kind, item_id in session.info.pop(_CHANGES_KEY, ()):
+        by_kind.setdefault(kind, set()).add(item_id)
+    for kind, ids in by_kind.items():
+        photo_indexes[kind].mark_changed(ids)
+
+
+@event.listens_for(_OrmSession, "after_rollback")
+def _drop_changed_posts(session):
+    session.info.pop(_CHANGES_KEY, None)
+
+
+def similar_posts(image_url, kind="lost", max_distance=MATCH_DISTANCE, limit=10, exclude_id=None):
+    """
+    Posts do `kind` cuja foto se parece com `image_url`, mais parecidos
+    primeiro (lista de PhotoMatch; vazia se a foto não puder ser lida).
+    `exclude_id` tira o próprio post quando a busca é no mesmo kind.
+    """
+    if not image_url:
+        return []
+    value = index_photo(image_url)
+    if value is None:
+        return []
+    return [
+        m for m in photo_indexes[kind].search(value, max_distance) if m.id != exclude_id
+    ][:limit]
+
+
+def similar_lost_animals(image_url, max_distance=MATCH_DISTANCE, limit=10):
+    """Animais perdidos com foto parecida com a de um relato de encontrado."""
+    return similar_posts(image_url, "lost", max_distance, limit)
+
+
+# ---- Reindexação em lote ----
+
+def reindex(force=False, batch_size=DEFAULT_BATCH, log=print):
+    """
+    Calcula os hashes das fotos dos posts que ainda não têm (todas, com
+    `force`). Devolve {"hashed", "skipped", "failed"}.
+    """
+    summary = {"hashed": 0, "skipped": 0, "failed": 0}
+    with session_scope() as s:
+        urls = list(s.execute(
+            select(posts.c.image_url).where(posts.c.image_url.is_not(None)).distinct()
+        ).scalars())
+        known = set() if force else set(s.execute(select(photo_hashes.c.url)).scalars())
+
+    pending = []
+    for url in urls:
+        if url in known:
+            summary["skipped"] += 1
+            continue
+        path = local_image_path(url)
+        value = dhash(path) if path is not None and os.path.isfile(path) else None
+        if value is None:
+            summary["failed"] += 1
+            continue
+        pending.append((url, value))
+        if len(pending) >= batch_size:
+            _save_hashes(pending)
+            summary["hashed"] += len(pending)
+            pending = []
+            log(f"{summary['hashed']} fotos indexadas.")
+    _save_hashes(pending)
+    summary["hashed"] += len(pending)
+    if summary["hashed"]:
+        # hashes novos de posts antigos: os ids não mudaram, então remonta
+        for index in photo_indexes.values():
+            index.reset()
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Índice de fotos parecidas (hash perceptual).")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rebuild = sub.add_parser("reindex", help="calcula os hashes das fotos dos posts")
+    rebuild.add_argument("--force", action="store_true", help="recalcula mesmo os que já existem")
+    rebuild.add_argument("--batch", type=int, default=DEFAULT_BATCH, help="hashes por transação")
+    similar = sub.add_parser("similar", help="lista posts com foto parecida com a URL dada")
+    similar.add_argument("image_url")
+    similar.add_argument("--kind", choices=POST_KINDS, default="lost")
+    similar.add_argument("--distance", type=int, default=MATCH_DISTANCE, help="bits de diferença aceitos")
+    args = parser.parse_args(argv)
+
+    if not pipeline_available():
+        parser.exit(1, "Pillow não está instalado; instale-o para calcular os hashes.\n")
+    if args.command == "reindex":
+        print(f"Concluído: {reindex(args.force, args.batch)}")
+    elif args.command == "similar":
+        for m in similar_posts(args.image_url, args.kind, args.distance):
+            print(f"{m.kind} #{m.id} ({m.name or m.species or '-'}): {m.distance} bits  {m.image_url}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# services/post_repository.py
+"""
+Consultas de leitura sobre posts (animais perdidos e relatos de encontrados).
+
+As views usam estas funções em vez de montar queries próprias, para que os
+índices do banco (R*Tree, FTS5) sejam aproveitados num único lugar. Todas
+devolvem registros somente-leitura de services.projections.
+"""
+from sqlalchemy import select, table, column, union_all
+
+from models import session_scope
+from services.feed_query import FeedFilter, load_feed
+from services.posts_read_model import POST_KINDS, POST_TABLES, posts, post_columns, post_table
+from services.projections import MapPoint, PostDetail, PostSummary, columns_for, fetch
+from services.query_cache import cached_query
+from services.spatial_index import SPATIAL_TABLES
+
+_rtrees = {
+    kind: table(rtree, column("id"), column("min_lat"), column("max_lat"),
+                column("min_lon"), column("max_lon"))
+    for kind, (_, rtree) in SPATIAL_TABLES.items()
+}
+
+
+def _fetch(record_type, stmt):
+    with session_scope() as s:
+        return fetch(s, record_type, stmt)
+
+
+@cached_query(*POST_TABLES)
+def posts_in_bbox(min_lat, min_lon, max_lat, max_lon, kinds=POST_KINDS, limit=None):
+    """
+    Retorna os posts cujas coordenadas caem dentro do retângulo informado.
+
+    A busca passa pelo índice R*Tree; o filtro exato sobre latitude/longitude
+    compensa o arredondamento para float32 feito pela R*Tree.
+
+    :param kinds: subconjunto de ("lost", "found").
+    :param limit: máximo de linhas por kind (None = sem limite).
+    :return: lista de MapPoint.
+    """
+    branches = []
+    for kind in POST_KINDS:
+        if kind not in kinds:
+            continue
+        t, r = post_table(kind), _rtrees[kind]
+        stmt = (
+            select(*post_columns(kind, MapPoint._fields))
+            .select_from(r.join(t, t.c.id == r.c.id))
+            .where(
+                r.c.min_lat <= max_lat, r.c.max_lat >= min_lat,
+                r.c.min_lon <= max_lon, r.c.max_lon >= min_lon,
+                t.c.latitude.between(min_lat, max_lat),
+                t.c.longitude.between(min_lon, max_lon),
+            )
+        )
+        if limit is not None:
+            stmt = select(stmt.limit(limit).subquery())
+        branches.append(stmt)
+    if not branches:
+        return []
+    return _fetch(MapPoint, branches[0] if len(branches) == 1 else union_all(*branches))
+
+
+@cached_query(*POST_TABLES)
+def user_posts(user_id):
+    """PostSummary (perdidos e encontrados) de um usuário, mais recentes primeiro, via view `posts`."""
+    stmt = (
+        select(*columns_for(PostSummary, posts))
+        .where(posts.c.owner_id == user_id)
+        .order_by(posts.c.created_at.desc(), posts.c.kind.desc(), posts.c.id.desc())
+    )
+    return _fetch(PostSummary, stmt)
+
+
+def get_post(kind, item_id, owner_id=None):
+    """PostDetail de um post pelo kind/id (opcionalmente restrito ao dono), ou None."""
+    stmt = select(*columns_for(PostDetail, posts)).where(posts.c.kind == kind, posts.c.id == item_id)
+    if owner_id is not None:
+        stmt = stmt.where(posts.c.owner_id == owner_id)
+    rows = _fetch(PostDetail, stmt)
+    return rows[0] if rows else None
+
+
+def search_posts(term, kinds=POST_KINDS, limit=200):
+    """
+    Busca textual em nome, descrição e local dos posts, ordenada por relevância.
+
+    Usa o índice FTS5 (insensível a acentos, prefixo por palavra). Se o SQLite
+    não tiver FTS5, cai num LIKE simples sobre descrição e local.
+
+    :return: lista de PostSummary (com `score` preenchido quando há FTS5).
+    """
+    if not (term or "").strip():
+        return []
+    return load_feed(FeedFilter(search_term=term, kinds=kinds), limit=limit)
+
+
+def delete_post(kind, item_id, owner_id):
+    """
+    Exclui um post do dono informado.
+
+    :return: True se alguma linha foi excluída.
+    """
+    t = post_table(kind)
+    owner_col = t.c.owner_id if kind == "lost" else t.c.finder_id
+    with session_scope() as s:
+        result = s.execute(t.delete().where(t.c.id == item_id, owner_col == owner_id))
+        return result.rowcount > 0
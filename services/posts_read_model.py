@@ -0,0 +1,80 @@
+# services/posts_read_model.py
+"""
+Modelo de leitura unificado para posts perdidos e encontrados.
+
+`post_projection(kind)` define, num único lugar, como uma linha de
+`lost_animals` ou `found_reports` vira um "post" com o discriminador `kind`.
+A mesma projeção gera a view SQL `posts` (UNION ALL das duas tabelas) e é
+reutilizada pelas consultas que precisam de filtros por ramo (feed paginado,
+índice espacial), então home, mapa e "Meus Posts" enxergam as mesmas colunas:
+
+    kind, id, owner_id, name, species, location, description,
+    lat, lon, image_url, contact, found_date, created_at
+"""
+from sqlalchemy import select, literal, null, table, column, union_all, String, Integer, Float, DateTime
+
+from models import LostAnimal, FoundReport
+
+POST_KINDS = ("lost", "found")
+
+POSTS_VIEW = "posts"
+
+# Tabelas de que qualquer leitura de posts depende (invalidação de cache);
+# "users" entra porque excluir um usuário remove os posts dele em cascata
+POST_TABLES = ("lost_animals", "found_reports", "users")
+
+# Representação Core da view, para montar consultas sobre ela
+posts = table(
+    POSTS_VIEW,
+    column("kind", String), column("id", Integer), column("owner_id", Integer),
+    column("name", String), column("species", String), column("location", String),
+    column("description", String), column("lat", Float), column("lon", Float),
+    column("image_url", String), column("contact", String), column("found_date", String),
+    column("created_at", DateTime),
+)
+
+POST_COLUMNS = tuple(c.name for c in posts.columns)
+
+
+def post_table(kind):
+    """Tabela de origem de um kind."""
+    return LostAnimal.__table__ if kind == "lost" else FoundReport.__table__
+
+
+def post_projection(kind):
+    """Colunas (rotuladas com os nomes de POST_COLUMNS) de um kind."""
+    t = post_table(kind)
+    if kind == "lost":
+        return [
+            literal(kind).label("kind"), t.c.id, t.c.owner_id.label("owner_id"),
+            t.c.name, t.c.species, t.c.lost_location.label("location"),
+            t.c.desc_animal.label("description"),
+            t.c.latitude.label("lat"), t.c.longitude.label("lon"), t.c.image_url,
+            t.c.contact, null().label("found_date"), t.c.created_at,
+        ]
+    return [
+        literal(kind).label("kind"), t.c.id, t.c.finder_id.label("owner_id"),
+        null().label("name"), t.c.species, t.c.found_location.label("location"),
+        t.c.found_description.label("description"),
+        t.c.latitude.label("lat"), t.c.longitude.label("lon"), t.c.image_url,
+        null().label("contact"), t.c.found_date, t.c.created_at,
+    ]
+
+
+def post_columns(kind, names):
+    """Subconjunto da projeção de um kind, na ordem de `names`."""
+    by_name = {c.name: c for c in post_projection(kind)}
+    return [by_name[n] for n in names]
+
+
+def posts_union():
+    """SELECT ... UNION ALL SELECT ... que define a view `posts`."""
+    return union_all(*(select(*post_projection(k)) for k in POST_KINDS))
+
+
+def ensure_posts_view(engine):
+    """(Re)cria a view `posts` a partir da projeção atual."""
+    ddl = posts_union().compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True})
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"DROP VIEW IF EXISTS {POSTS_VIEW}")
+        conn.exec_driver_sql(f"CREATE VIEW {POSTS_VIEW} AS {ddl}")
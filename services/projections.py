@@ -0,0 +1,92 @@
+# services/projections.py
+"""
+Registros somente-leitura para as telas de listagem.
+
+São NamedTuples (sem __dict__ por instância, campos por posição) preenchidos
+direto das linhas de SELECTs só de colunas, sem passar pelo ORM: nada de
+identity map, instrumentação de atributos ou DetachedInstanceError depois
+que a sessão fecha. Os nomes dos campos seguem a projeção da view `posts`
+(posts_read_model.POST_COLUMNS).
+"""
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from sqlalchemy import null
+
+
+class PostSummary(NamedTuple):
+    """Um card do feed ou de "Meus Posts"."""
+    kind: str
+    id: int
+    name: Optional[str]
+    species: Optional[str]
+    location: Optional[str]
+    description: Optional[str]
+    lat: Optional[float]
+    lon: Optional[float]
+    image_url: Optional[str]
+    created_at: Optional[datetime]
+    score: Optional[float] = None
+
+    @property
+    def is_lost(self):
+        return self.kind == "lost"
+
+
+class MapPoint(NamedTuple):
+    """Um marcador do mapa."""
+    kind: str
+    id: int
+    name: Optional[str]
+    species: Optional[str]
+    description: Optional[str]
+    lat: float
+    lon: float
+
+
+class PostDetail(NamedTuple):
+    """Todos os campos de um post, para o formulário de edição."""
+    kind: str
+    id: int
+    owner_id: Optional[int]
+    name: Optional[str]
+    species: Optional[str]
+    location: Optional[str]
+    description: Optional[str]
+    lat: Optional[float]
+    lon: Optional[float]
+    image_url: Optional[str]
+    contact: Optional[str]
+    found_date: Optional[str]
+    created_at: Optional[datetime]
+
+    def as_form_data(self):
+        """Dicionário com os nomes de coluna que os formulários de registro esperam."""
+        data = {
+            "id": self.id,
+            "species": self.species,
+            "latitude": self.lat,
+            "longitude": self.lon,
+            "image_url": self.image_url,
+        }
+        if self.kind == "lost":
+            data.update(name=self.name, lost_location=self.location,
+                        desc_animal=self.description, contact=self.contact)
+        else:
+            data.update(found_location=self.location, found_description=self.description,
+                        found_date=str(self.found_date) if self.found_date else "")
+        return data
+
+
+def columns_for(record_type, source):
+    """
+    Colunas de `source` (tabela/subquery/view) na ordem dos campos do registro;
+    campos que `source` não tem (ex.: `score` fora da busca) vêm como NULL.
+    """
+    return [source.c[f] if f in source.c else null().label(f) for f in record_type._fields]
+
+
+def fetch(session, record_type, stmt):
+    """Executa `stmt` e monta um `record_type` por linha (posições = _fields)."""
+    make = record_type._make
+    return [make(row) for row in session.execute(stmt)]
@@ -0,0 +1,178 @@
+# services/query_cache.py
+"""
+Cache em processo para resultados de consultas (feed, mapa, "Meus Posts").
+
+- LRU com tamanho máximo (SIARA_QUERY_CACHE_SIZE) e TTL (SIARA_QUERY_CACHE_TTL).
+- Chave = função + argumentos (os filtros precisam ser hashable).
+- Cada entrada declara as tabelas de que depende; os eventos `after_flush`
+  / `do_orm_execute` / `after_commit` de toda Session anotam as tabelas
+  escritas e, no commit, invalidam só as entradas que dependem delas.
+- Cada tabela tem um contador de versão: um resultado lido enquanto outra
+  thread fazia commit numa tabela dependente não é guardado.
+- Dentro de uma unidade de trabalho que já escreveu (ou tem mudanças
+  pendentes) numa tabela dependente, a consulta vai direto ao banco: o
+  cache ainda não sabe da escrita, que só é publicada no commit.
+
+Os resultados em cache são compartilhados entre chamadas: trate-os como
+somente-leitura (as projeções já são NamedTuples).
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session as _OrmSession
+
+from models import Session
+
+CACHE_SIZE = int(os.environ.get("SIARA_QUERY_CACHE_SIZE", "256"))
+CACHE_TTL = float(os.environ.get("SIARA_QUERY_CACHE_TTL", "300"))
+
+_DIRTY_KEY = "siara_dirty_tables"
+
+
+class QueryCache:
+    """LRU + TTL com invalidação por tabela."""
+
+    def __init__(self, max_entries=CACHE_SIZE, ttl=CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()   # key -> (expira_em, tabelas, valor)
+        self._versions = {}             # tabela -> contador de escritas
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def versions(self, tables):
+        with self._lock:
+            return tuple(self._versions.get(t, 0) for t in tables)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[2]
+
+    def put(self, key, tables, value, versions_before):
+        with self._lock:
+            if tuple(self._versions.get(t, 0) for t in tables) != versions_before:
+                return  # houve commit numa tabela dependente durante a leitura
+            self._entries[key] = (time.monotonic() + self.ttl, frozenset(tables), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_tables(self, tables):
+        tables = set(tables)
+        if not tables:
+            return
+        with self._lock:
+            for t in tables:
+                self._versions[t] = self._versions.get(t, 0) + 1
+            stale = [k for k, (_, deps, _) in self._entries.items() if deps & tables]
+            for k in stale:
+                del self._entries[k]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+query_cache = QueryCache()
+
+
+def cached_query(*tables):
+    """
+    Decorador: guarda o resultado da função no `query_cache`, dependente das
+    tabelas informadas. Os argumentos da função precisam ser hashable.
+    """
+    tables = tuple(tables)
+    dependencies = frozenset(tables)
+
+    def decorator(fn):
+        name = f"{fn.__module__}.{fn.__qualname__}"
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _uncommitted_tables() & dependencies:
+                return fn(*args, **kwargs)  # leitura da própria transação: sem cache
+            key = (name, args, tuple(sorted(kwargs.items())))
+            try:
+                hash(key)
+            except TypeError:
+                return fn(*args, **kwargs)  # argumento não-hashable: sem cache
+            found, value = query_cache.get(key)
+            if found:
+                return value
+            versions = query_cache.versions(tables)
+            value = fn(*args, **kwargs)
+            query_cache.put(key, tables, value, versions)
+            return value
+
+        wrapper.uncached = fn
+        return wrapper
+
+    return decorator
+
+
+# ---- Invalidação pelos eventos de Session ----
+
+def _mark_dirty(session, table_names):
+    session.info.setdefault(_DIRTY_KEY, set()).update(table_names)
+
+
+def _pending_tables(session):
+    names = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(type(obj), "__table__", None)
+        if table is not None:
+            names.add(table.name)
+    return names
+
+
+def _uncommitted_tables():
+    """Tabelas escritas pela Session do contexto atual e ainda sem commit."""
+    if not Session.registry.has():
+        return set()
+    session = Session()
+    # Mudanças ainda não enviadas (o autoflush só aconteceria na consulta)
+    return set(session.info.get(_DIRTY_KEY, ())) | _pending_tables(session)
+
+
+@event.listens_for(_OrmSession, "after_flush")
+def _collect_flushed_tables(session, flush_context):
+    _mark_dirty(session, _pending_tables(session))
+
+
+@event.listens_for(_OrmSession, "do_orm_execute")
+def _collect_bulk_dml(orm_execute_state):
+    # UPDATE/DELETE/INSERT em lote (query.delete(), session.execute(t.delete()))
+    # não passam pelo flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None:
+            _mark_dirty(orm_execute_state.session, {table.name})
+
+
+@event.listens_for(_OrmSession, "after_commit")
+def _invalidate_on_commit(session):
+    query_cache.invalidate_tables(session.info.pop(_DIRTY_KEY, ()))
+
+
+@event.listens_for(_OrmSession, "after_rollback")
+def _invalidate_on_rollback(session):
+    # Uma leitura feita depois da escrita, na mesma transação, pode ter
+    # guardado dados que o rollback desfez
+    query_cache.invalidate_tables(session.info.pop(_DIRTY_KEY, ()))
@@ -0,0 +1,71 @@
+# services/reverse_grid.py
+"""
+Grade de células (~15 m) para o cache de geocodificação reversa.
+
+Coordenadas são "encaixadas" numa célula de lado SIARA_REVERSE_GRID_M
+metros; o cache guarda, por célula, o endereço e o ponto exato consultado.
+Na busca, a própria célula e as 8 vizinhas são lidas de uma vez e vale o
+ponto mais próximo dentro de SIARA_REVERSE_TOLERANCE_M metros — dois
+cliques a poucos metros um do outro não vão mais à rede.
+"""
+import os
+from math import atan2, cos, floor, radians, sin, sqrt
+
+GRID_CELL_M = float(os.environ.get("SIARA_REVERSE_GRID_M", "15"))
+TOLERANCE_M = float(os.environ.get("SIARA_REVERSE_TOLERANCE_M", "25"))
+
+_M_PER_DEG_LAT = 111320.0
+
+
+def distance_m(lat1, lon1, lat2, lon2):
+    """Distância em metros (haversine)."""
+    R = 6371000
+    dlat = radians(lat2 - lat1)
+    dlon = radians(lon2 - lon1)
+    a = (sin(dlat / 2) ** 2 +
+         cos(radians(lat1)) * cos(radians(lat2)) *
+         sin(dlon / 2) ** 2)
+    return R * 2 * atan2(sqrt(a), sqrt(1 - a))
+
+
+def _lon_step(row, cell_m):
+    # Largura em graus de longitude na latitude central da linha `row`
+    lat_step = cell_m / _M_PER_DEG_LAT
+    center = (row + 0.5) * lat_step
+    return cell_m / (_M_PER_DEG_LAT * max(cos(radians(center)), 0.01))
+
+
+def grid_cell(lat, lon, cell_m=GRID_CELL_M):
+    """Chave "linha:coluna" da célula que contém (lat, lon)."""
+    row = floor(lat / (cell_m / _M_PER_DEG_LAT))
+    col = floor(lon / _lon_step(row, cell_m))
+    return f"{row}:{col}"
+
+
+def neighbour_cells(lat, lon, cell_m=GRID_CELL_M):
+    """A célula de (lat, lon) seguida das 8 vizinhas."""
+    row = floor(lat / (cell_m / _M_PER_DEG_LAT))
+    cells = [grid_cell(lat, lon, cell_m)]
+    for drow in (-1, 0, 1):
+        r = row + drow
+        col = floor(lon / _lon_step(r, cell_m))
+        for dcol in (-1, 0, 1):
+            key = f"{r}:{col + dcol}"
+            if key != cells[0]:
+                cells.append(key)
+    return cells
+
+
+def nearest_entry(lat, lon, entries, tolerance_m=TOLERANCE_M):
+    """
+    Dentre os valores em cache {"address", "lat", "lon"} (None = célula sem
+    endereço), devolve o mais próximo dentro da tolerância ou None.
+    """
+    best, best_dist = None, tolerance_m
+    for entry in entries:
+        if not entry:
+            continue
+        dist = distance_m(lat, lon, entry["lat"], entry["lon"])
+        if dist <= best_dist:
+            best, best_dist = entry, dist
+    return best
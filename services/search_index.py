@@ -0,0 +1,87 @@
+# services/search_index.py
+"""
+Índice de texto completo (SQLite FTS5) para a busca do feed global.
+
+Uma única tabela FTS5 cobre animais perdidos e relatos de encontrados.
+O rowid codifica o tipo do post (id*2 para perdidos, id*2+1 para
+encontrados), o que permite que os triggers removam a entrada antiga
+direto pelo rowid. O tokenizer `unicode61 remove_diacritics 2` torna a busca
+insensível a acentos ("cão" casa com "cao").
+"""
+import re
+
+from sqlalchemy.exc import OperationalError
+
+FTS_TABLE = "posts_fts"
+
+# Preenchido por ensure_search_index: False se o SQLite não tiver FTS5
+FTS_AVAILABLE = False
+
+# kind -> (tabela, deslocamento do rowid, colunas name/description/location)
+_SOURCES = {
+    "lost": ("lost_animals", 0, ("name", "desc_animal", "lost_location")),
+    "found": ("found_reports", 1, ("NULL", "found_description", "found_location")),
+}
+
+
+def _col(prefix, col):
+    return col if col == "NULL" else f"{prefix}.{col}"
+
+
+def _ddl():
+    stmts = [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+                kind UNINDEXED, post_id UNINDEXED, name, description, location,
+                tokenize = 'unicode61 remove_diacritics 2'
+            )""",
+    ]
+    for kind, (table, offset, cols) in _SOURCES.items():
+        new_vals = ", ".join(_col("new", c) for c in cols)
+        insert_new = (
+            f"INSERT INTO {FTS_TABLE}(rowid, kind, post_id, name, description, location) "
+            f"VALUES (new.id * 2 + {offset}, '{kind}', new.id, {new_vals});"
+        )
+        delete_old = f"DELETE FROM {FTS_TABLE} WHERE rowid = old.id * 2 + {offset};"
+        watched = ", ".join(["id"] + [c for c in cols if c != "NULL"])
+        stmts += [
+            f"""CREATE TRIGGER IF NOT EXISTS {table}_fts_ai AFTER INSERT ON {table}
+                BEGIN {insert_new} END""",
+            f"""CREATE TRIGGER IF NOT EXISTS {table}_fts_au AFTER UPDATE OF {watched} ON {table}
+                BEGIN {delete_old} {insert_new} END""",
+            f"""CREATE TRIGGER IF NOT EXISTS {table}_fts_ad AFTER DELETE ON {table}
+                BEGIN {delete_old} END""",
+            # Backfill das linhas que já existiam antes do índice
+            f"""INSERT INTO {FTS_TABLE}(rowid, kind, post_id, name, description, location)
+                SELECT p.id * 2 + {offset}, '{kind}', p.id, {", ".join(_col("p", c) for c in cols)}
+                FROM {table} p
+                WHERE p.id * 2 + {offset} NOT IN (SELECT rowid FROM {FTS_TABLE})""",
+        ]
+    return stmts
+
+
+def ensure_search_index(engine):
+    """Cria (se necessário) a tabela FTS5 e os triggers de sincronização."""
+    global FTS_AVAILABLE
+    if engine.dialect.name != "sqlite":
+        return
+    try:
+        with engine.begin() as conn:
+            for stmt in _ddl():
+                conn.exec_driver_sql(stmt)
+        FTS_AVAILABLE = True
+    except OperationalError as e:
+        # SQLite compilado sem FTS5: a busca cai no LIKE (ver post_repository)
+        print(f"FTS5 indisponível, busca sem índice: {e}")
+        FTS_AVAILABLE = False
+
+
+def build_match_query(term):
+    """
+    Converte o texto digitado pelo usuário numa expressão MATCH segura:
+    cada palavra vira um prefixo entre aspas ("cao"*), todas obrigatórias.
+    Retorna None se não sobrar nenhuma palavra.
+    """
+    words = re.findall(r"\w+", term or "")
+    if not words:
+        return None
+    return " ".join(f'"{w}"*' for w in words)
@@ -0,0 +1,59 @@
+# services/spatial_index.py
+"""
+Índice espacial (SQLite R*Tree) sobre latitude/longitude dos posts.
+
+Cada tabela de posts ganha uma tabela virtual R*Tree irmã, mantida em
+sincronia por triggers no próprio banco (insert/update/delete), de modo que
+qualquer caminho de escrita — ORM, SQL puro ou migrações — atualiza o índice.
+"""
+
+# kind -> (tabela de posts, tabela R*Tree)
+SPATIAL_TABLES = {
+    "lost": ("lost_animals", "lost_animals_rtree"),
+    "found": ("found_reports", "found_reports_rtree"),
+}
+
+
+def _ddl_for(table, rtree):
+    has_coords = "new.latitude IS NOT NULL AND new.longitude IS NOT NULL"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {rtree} "
+        f"USING rtree(id, min_lat, max_lat, min_lon, max_lon)",
+
+        f"""CREATE TRIGGER IF NOT EXISTS {rtree}_ai AFTER INSERT ON {table}
+            WHEN {has_coords}
+            BEGIN
+                INSERT OR REPLACE INTO {rtree} VALUES
+                    (new.id, new.latitude, new.latitude, new.longitude, new.longitude);
+            END""",
+
+        f"""CREATE TRIGGER IF NOT EXISTS {rtree}_au
+            AFTER UPDATE OF id, latitude, longitude ON {table}
+            BEGIN
+                DELETE FROM {rtree} WHERE id = old.id;
+                INSERT INTO {rtree}
+                    SELECT new.id, new.latitude, new.latitude, new.longitude, new.longitude
+                    WHERE {has_coords};
+            END""",
+
+        f"""CREATE TRIGGER IF NOT EXISTS {rtree}_ad AFTER DELETE ON {table}
+            BEGIN
+                DELETE FROM {rtree} WHERE id = old.id;
+            END""",
+
+        # Backfill das linhas que já existiam antes do índice
+        f"""INSERT INTO {rtree}
+            SELECT id, latitude, latitude, longitude, longitude FROM {table}
+            WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+              AND id NOT IN (SELECT id FROM {rtree})""",
+    ]
+
+
+def ensure_spatial_index(engine):
+    """Cria (se necessário) as tabelas R*Tree, os triggers e faz o backfill."""
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        for table, rtree in SPATIAL_TABLES.values():
+            for stmt in _ddl_for(table, rtree):
+                conn.exec_driver_sql(stmt)
@@ -0,0 +1,16 @@
+# services/user_repository.py
+"""Consultas sobre usuários usadas pelas telas de login/registro."""
+from models import User, session_scope
+
+
+def authenticate(username, password):
+    """
+    Confere usuário e senha.
+
+    :return: {"id", "username"} do usuário autenticado, ou None.
+    """
+    with session_scope() as s:
+        user = s.query(User).filter_by(username=username).first()
+        if user and user.check_password(password):
+            return {"id": user.id, "username": user.username}
+    return None
@@ -0,0 +1,48 @@
+# tests/conftest.py
+"""
+Ambiente isolado para os testes: diretório de trabalho temporário (static/,
+caches e índices ficam lá) e banco SQLite em arquivo. O perfil "dev" é
+usado de propósito — pool de várias conexões e WAL, como no app, para que
+problemas de lock entre conexões apareçam nos testes.
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKDIR = tempfile.mkdtemp(prefix="siara-tests-")
+
+os.environ["SIARA_DB_PROFILE"] = "dev"
+os.environ["SIARA_DB_URL"] = f"sqlite:///{os.path.join(WORKDIR, 'siara-test.db')}"
+os.environ["SIARA_GEOCODE_CACHE_DB"] = os.path.join(WORKDIR, "geocode_cache.db")
+os.environ["SIARA_GAZETTEER"] = os.path.join(WORKDIR, "gazetteer.idx")
+os.environ.setdefault("SIARA_GEOCODER", "stub")
+os.chdir(WORKDIR)
+sys.path.insert(0, ROOT)
+
+import pytest  # noqa: E402
+
+import models  # noqa: E402
+from services.query_cache import query_cache  # noqa: E402
+
+_TABLES = ("lost_animals", "found_reports", "users", "image_blobs", "photo_hashes")
+
+
+@pytest.fixture
+def db():
+    """Banco vazio no início do teste (e cache de consultas limpo)."""
+    with models.engine.begin() as conn:
+        for table in _TABLES:
+            conn.exec_driver_sql(f"DELETE FROM {table}")
+    query_cache.clear()
+    yield models.engine
+    query_cache.clear()
+
+
+@pytest.fixture
+def user(db):
+    with models.session_scope() as s:
+        u = models.User(username="tester", _password_hash="x")
+        s.add(u)
+        s.flush()
+        return u.id
@@ -0,0 +1,63 @@
+# tests/test_autocomplete.py
+import pytest
+
+from services import autocomplete
+from services.gazetteer import Gazetteer, build_index
+from services.geocode_cache import GeocodeCache, fold
+
+
+@pytest.fixture
+def sources(tmp_path, monkeypatch):
+    cache = GeocodeCache(str(tmp_path / "cache.db"))
+    monkeypatch.setattr(autocomplete, "geocode_cache", cache)
+    monkeypatch.setattr(autocomplete, "gazetteer", None)
+    monkeypatch.setattr(autocomplete, "_prefix_cache", autocomplete._PrefixCache())
+    return cache
+
+
+def _labels(suggestions):
+    return [s.label for s in suggestions]
+
+
+def test_fold_matches_fts_style_folding():
+    assert fold("  São  JOÃO, 10 ") == "sao joao 10"
+    assert fold("Av. Brasília") == "av brasilia"
+
+
+def test_accents_are_ignored_in_cached_addresses(sources):
+    sources.put("forward", "são paulo, sp", [-23.55, -46.63])
+    sources.put("forward", "santos", [-23.96, -46.33])
+    for typed in ("sao p", "São P", "SAO PAULO"):
+        assert _labels(autocomplete.suggest_addresses(typed)) == ["são paulo, sp"]
+
+
+def test_truncated_results_are_not_reused_for_longer_prefixes(sources):
+    # "rua alfa" e "rua alfa." viram a mesma sugestão: com limite 2, a
+    # consulta de "rua" chega ao LIMIT e devolve uma sugestão só
+    for key in ("rua alfa", "rua alfa.", "rua beta"):
+        sources.put("forward", key, [0.0, 0.0])
+    assert _labels(autocomplete.suggest_addresses("rua", limit=2)) == ["rua alfa"]
+    assert _labels(autocomplete.suggest_addresses("rua b", limit=2)) == ["rua beta"]
+
+
+def test_complete_prefix_is_filtered_without_querying(sources, monkeypatch):
+    sources.put("forward", "rua alfa", [0.0, 0.0])
+    sources.put("forward", "rua beta", [0.0, 0.0])
+    assert len(autocomplete.suggest_addresses("rua", limit=5)) == 2
+
+    monkeypatch.setattr(sources, "prefix", lambda *a, **k: pytest.fail("deveria usar o cache"))
+    assert _labels(autocomplete.suggest_addresses("rua be", limit=5)) == ["rua beta"]
+
+
+def test_gazetteer_results_come_first_and_are_deduplicated(sources, tmp_path, monkeypatch):
+    csv_path = tmp_path / "g.csv"
+    csv_path.write_text("name,lat,lon\nRua Alfa,1,2\nRua Gama,3,4\n", encoding="utf-8")
+    build_index(str(csv_path), str(tmp_path / "g.idx"))
+    monkeypatch.setattr(autocomplete, "gazetteer", Gazetteer(str(tmp_path / "g.idx")))
+    sources.put("forward", "rua alfa", [9.0, 9.0])
+    sources.put("forward", "rua beta", [5.0, 6.0])
+
+    assert autocomplete.suggest_addresses("ru") == []  # menos de 3 caracteres
+    suggestions = autocomplete.suggest_addresses("r. ")  # abreviação expandida
+    assert _labels(suggestions) == ["Rua Alfa", "Rua Gama", "rua beta"]
+    assert suggestions[0].lat == 1.0
@@ -0,0 +1,27 @@
+# tests/test_db_engine.py
+import logging
+
+from sqlalchemy import text
+
+from services import db_engine
+
+SECRET = "$2b$12$segredo-do-hash-de-senha-que-nao-pode-ir-para-o-log"
+
+
+def test_sql_log_hides_text_and_blob_parameters(monkeypatch, caplog):
+    monkeypatch.setitem(db_engine.DB_PROFILES, "test",
+                        dict(db_engine.DB_PROFILES["test"], sql_sample_rate=1.0))
+    engine = db_engine.make_engine("test", url="sqlite://")
+    with caplog.at_level(logging.INFO, logger="siara.sql"), engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (id INTEGER, name TEXT, data BLOB)"))
+        conn.execute(text("INSERT INTO t VALUES (:id, :name, :data)"),
+                     {"id": 7, "name": SECRET, "data": b"\xff" * 5000})
+        conn.execute(text("INSERT INTO t VALUES (:id, :name, :data)"),
+                     [{"id": i, "name": SECRET, "data": None} for i in range(3)])
+    engine.dispose()
+
+    logged = caplog.text
+    assert "INSERT INTO t" in logged
+    assert SECRET not in logged and "\\xff" not in logged
+    assert f"<str len={len(SECRET)}>" in logged and "<bytes len=5000>" in logged
+    assert "3 linhas" in logged
@@ -0,0 +1,75 @@
+# tests/test_exif.py
+import random
+import struct
+
+import pytest
+
+from services.exif import EMPTY_METADATA, parse_exif, read_photo_metadata
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def _jpeg_with_exif(path, date="2024:05:01 10:30:00", gps=True):
+    exif = Image.Exif()
+    exif[0x0132] = date
+    if gps:
+        ifd = exif.get_ifd(0x8825)
+        ifd[1], ifd[2] = "S", (23.0, 33.0, 0.0)
+        ifd[3], ifd[4] = "W", (46.0, 37.0, 48.0)
+    Image.new("RGB", (8, 8), "red").save(path, "JPEG", exif=exif)
+    return path
+
+
+def _tiff(entries, extra=b""):
+    """Bloco TIFF little-endian com um IFD0 de entradas (tag, tipo, n, campo de 4 bytes)."""
+    ifd = struct.pack("<H", len(entries))
+    for tag, typ, n, field in entries:
+        ifd += struct.pack("<HHI", tag, typ, n) + field
+    return b"II*\x00" + struct.pack("<I", 8) + ifd + b"\x00\x00\x00\x00" + extra
+
+
+def test_reads_gps_and_date_from_pillow_jpeg(tmp_path):
+    meta = read_photo_metadata(_jpeg_with_exif(tmp_path / "a.jpg"))
+    assert meta.has_location
+    assert meta.latitude == pytest.approx(-23.55)
+    assert meta.longitude == pytest.approx(-(46 + 37 / 60 + 48 / 3600), abs=1e-6)
+    assert meta.taken_at.isoformat() == "2024-05-01T10:30:00"
+
+
+def test_photo_without_gps_keeps_the_date(tmp_path):
+    meta = read_photo_metadata(_jpeg_with_exif(tmp_path / "a.jpg", gps=False))
+    assert not meta.has_location and meta.taken_at is not None
+
+
+def test_other_formats_and_missing_files_are_empty(tmp_path):
+    png = tmp_path / "a.png"
+    Image.new("RGB", (8, 8)).save(png)
+    assert read_photo_metadata(png) == EMPTY_METADATA
+    assert read_photo_metadata(tmp_path / "nao-existe.jpg") == EMPTY_METADATA
+
+
+def test_truncated_file_is_empty(tmp_path):
+    data = _jpeg_with_exif(tmp_path / "a.jpg").read_bytes()
+    for size in (1, 3, 6, 20, 40, 80):
+        cut = tmp_path / f"cut{size}.jpg"
+        cut.write_bytes(data[:size])
+        assert read_photo_metadata(cut) == EMPTY_METADATA
+
+
+def test_rational_ifd_pointer_is_ignored():
+    # Ponteiro do IFD de GPS gravado como RATIONAL: o valor decodificado é float
+    rational_at = 8 + 2 + 12 + 4
+    tiff = _tiff([(0x8825, 5, 1, struct.pack("<I", rational_at))], extra=struct.pack("<II", 26, 1))
+    assert parse_exif(tiff) == EMPTY_METADATA
+
+
+def test_corrupted_bytes_never_raise(tmp_path):
+    data = bytearray(_jpeg_with_exif(tmp_path / "a.jpg").read_bytes())
+    rng = random.Random(24)
+    path = tmp_path / "fuzz.jpg"
+    for _ in range(300):
+        fuzzed = bytearray(data)
+        for _ in range(rng.randint(1, 8)):
+            fuzzed[rng.randrange(2, 200)] = rng.randrange(256)
+        path.write_bytes(bytes(fuzzed))
+        read_photo_metadata(path)  # não pode levantar exceção
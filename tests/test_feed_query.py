@@ -0,0 +1,60 @@
+# tests/test_feed_query.py
+from datetime import datetime, timedelta
+
+from models import FoundReport, LostAnimal, session_scope
+from services.feed_query import FeedFilter, load_feed, load_feed_page
+
+T0 = datetime(2024, 1, 1, 12, 0, 0)
+
+
+def _seed(owner_id):
+    """12 posts alternando perdido/encontrado, com created_at repetidos."""
+    with session_scope() as s:
+        for i in range(12):
+            created = T0 + timedelta(minutes=i // 3)  # grupos de 3 com o mesmo instante
+            if i % 2:
+                s.add(FoundReport(species="gato", found_location=f"rua {i}",
+                                  found_description=f"encontrado {i}",
+                                  finder_id=owner_id, created_at=created))
+            else:
+                s.add(LostAnimal(name=f"Pet {i}", species="cão", lost_location=f"rua {i}",
+                                 desc_animal=f"perdido {i}", owner_id=owner_id, created_at=created))
+
+
+def _all_pages(filters, page_size):
+    rows, after = [], None
+    while True:
+        page, after = load_feed_page(filters, page_size, after)
+        rows.extend(page)
+        if after is None:
+            return rows
+
+
+def test_keyset_pages_cover_feed_without_gaps_or_duplicates(user):
+    _seed(user)
+    filters = FeedFilter()
+    full = load_feed(filters)
+    assert len(full) == 12
+    keys = [(p.created_at, p.kind, p.id) for p in full]
+    assert keys == sorted(keys, reverse=True)
+
+    for page_size in (1, 4, 5, 12):
+        paged = _all_pages(filters, page_size)
+        assert [(p.kind, p.id) for p in paged] == [(p.kind, p.id) for p in full]
+
+
+def test_kind_and_species_filters_are_pushed_into_branches(user):
+    _seed(user)
+    lost = load_feed(FeedFilter.from_form(post_type="Perdido"))
+    assert {p.kind for p in lost} == {"lost"} and len(lost) == 6
+    cats = load_feed(FeedFilter.from_form(species="Gato"))
+    assert {p.species for p in cats} == {"gato"}
+    assert load_feed(FeedFilter.from_form(species="Qualquer")) == load_feed(FeedFilter())
+
+
+def test_search_pages_follow_relevance_order(user):
+    _seed(user)
+    filters = FeedFilter(search_term="rua")
+    full = load_feed(filters)
+    assert len(full) == 12
+    assert [(p.kind, p.id) for p in _all_pages(filters, 5)] == [(p.kind, p.id) for p in full]
@@ -0,0 +1,78 @@
+# tests/test_gazetteer.py
+import pytest
+
+from services.gazetteer import Gazetteer, build_index, load_gazetteer, normalize
+
+ROWS = [
+    ("Rua XV de Novembro", -25.4296, -49.2713),
+    ("Praça Tiradentes", -25.4284, -49.2733),
+    ("Avenida Sete de Setembro", -25.4405, -49.2766),
+    ("Rua Treze de Maio", -25.4270, -49.2680),
+    ("Jardim Botânico", -25.4420, -49.2390),
+]
+
+
+@pytest.fixture
+def gaz(tmp_path):
+    csv_path = tmp_path / "enderecos.csv"
+    lines = ["name,lat,lon"] + [f"{name},{lat},{lon}" for name, lat, lon in ROWS]
+    lines += ["R. XV de Novembro,0,0", "Sem coordenadas,,", "Texto,abc,1"]  # repetida e inválidas
+    csv_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    out = tmp_path / "gazetteer.idx"
+    assert build_index(str(csv_path), str(out)) == len(ROWS)
+    g = Gazetteer(str(out), localities="Curitiba;São José dos Pinhais")
+    yield g
+    g.close()
+
+
+def test_normalize_folds_accents_punctuation_and_abbreviations():
+    assert normalize("  Pç. Tiradentes ") == "praca tiradentes"
+    assert normalize("Pca. Tiradentes") == "praca tiradentes"
+    assert normalize("Av. Sete de Setembro, 100") == "avenida sete de setembro 100"
+    assert normalize("Jd. Botânico") == "jardim botanico"
+    assert normalize(None) == ""
+
+
+def test_lookup_matches_normalized_names(gaz):
+    assert gaz.lookup("rua xv de novembro") == (-25.4296, -49.2713)
+    assert gaz.lookup("R. XV DE NOVEMBRO") == (-25.4296, -49.2713)  # primeira ocorrência vale
+    assert gaz.lookup("Praca Tiradentes") == (-25.4284, -49.2733)
+    assert gaz.lookup("Rua XV") is None
+    assert gaz.lookup("") is None
+
+
+def test_geocode_falls_back_only_for_covered_localities(gaz):
+    assert gaz.geocode("Av. Sete de Setembro, Curitiba") == (-25.4405, -49.2766)
+    assert gaz.geocode("Av. Sete de Setembro, Curitiba - PR, PR") == (-25.4405, -49.2766)
+    assert gaz.geocode("Rua Inexistente, Curitiba") is None
+
+
+def test_other_city_or_house_number_goes_to_the_network(gaz):
+    # Mesma rua em outra cidade: não pode sair com a coordenada local
+    assert gaz.geocode("Rua XV de Novembro, 120, Porto Alegre - RS") is None
+    assert gaz.geocode("Rua XV de Novembro, Porto Alegre") is None
+    # Com número da casa o centro da rua não serve; a rede acha a casa
+    assert gaz.geocode("Av. Sete de Setembro, 1200, Curitiba") is None
+
+
+def test_without_configured_localities_there_is_no_fallback(gaz):
+    plain = Gazetteer(gaz.path)
+    try:
+        assert plain.geocode("Av. Sete de Setembro, Curitiba") is None
+        assert plain.geocode("Av. Sete de Setembro") == (-25.4405, -49.2766)
+    finally:
+        plain.close()
+
+
+def test_prefix_search_is_ordered_and_limited(gaz):
+    assert [name for name, _, _ in gaz.prefix_search("rua")] == ["Rua Treze de Maio", "Rua XV de Novembro"]
+    assert len(gaz.prefix_search("r", limit=1)) == 1
+    assert gaz.prefix_search("jd bot") == [("Jardim Botânico", -25.4420, -49.2390)]
+    assert gaz.prefix_search("zzz") == []
+
+
+def test_missing_or_invalid_index_is_ignored(tmp_path):
+    assert load_gazetteer(str(tmp_path / "nao-existe.idx")) is None
+    bad = tmp_path / "bad.idx"
+    bad.write_bytes(b"NOTAGAZ!" + b"\x00" * 8)
+    assert load_gazetteer(str(bad)) is None
@@ -0,0 +1,55 @@
+# tests/test_geocode_backfill.py
+import pytest
+
+import models
+from services import geocode_backfill, geocoding
+from services.geocode_cache import GeocodeCache
+from services.geocoding_providers import StubProvider
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = GeocodeCache(str(tmp_path / "cache.db"))
+    monkeypatch.setattr(geocoding, "geocode_cache", cache)
+    monkeypatch.setattr(geocode_backfill, "geocode_cache", cache)
+    monkeypatch.setattr(geocoding, "gazetteer", None)
+    return cache
+
+
+@pytest.fixture
+def stub():
+    provider = StubProvider({"Rua das Flores, 10": (-23.5, -46.6)})
+    previous = geocoding.set_provider(provider)
+    yield provider
+    geocoding.set_provider(previous)
+
+
+def _lost_without_coords(location):
+    with models.session_scope() as s:
+        animal = models.LostAnimal(name="Rex", lost_location=location)
+        s.add(animal)
+        s.flush()
+        return animal.id
+
+
+def _coords(item_id):
+    with models.session_scope() as s:
+        animal = s.get(models.LostAnimal, item_id)
+        return animal.latitude, animal.longitude
+
+
+def test_retry_failed_skips_the_negative_cache(db, cache, stub, tmp_path):
+    item_id = _lost_without_coords("Rua das Flores, 10")
+    checkpoint = str(tmp_path / "backfill.json")
+    # Execução anterior: endereço não encontrado, com resultado negativo ainda válido
+    geocode_backfill.save_checkpoint(checkpoint, {"rua das flores 10": None})
+    cache.put("forward", "rua das flores, 10", None)
+
+    summary = geocode_backfill.run_backfill(checkpoint=checkpoint, log=lambda *_: None)
+    assert summary["addresses"] == 0 and stub.calls == []
+
+    summary = geocode_backfill.run_backfill(checkpoint=checkpoint, retry_failed=True, log=lambda *_: None)
+    assert stub.calls == [("forward", "Rua das Flores, 10")]
+    assert summary["resolved"] == 1 and summary["rows_updated"] == 1
+    assert _coords(item_id) == (-23.5, -46.6)
+    assert geocode_backfill.load_checkpoint(checkpoint) == {"rua das flores 10": [-23.5, -46.6]}
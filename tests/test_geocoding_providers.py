@@ -0,0 +1,79 @@
+# tests/test_geocoding_providers.py
+import time
+
+import pytest
+
+from services import geocoding
+from services.geocoding_providers import (
+    CircuitBreaker, CircuitOpenError, GeocodingProvider, ResilientProvider, StubProvider,
+)
+
+
+def test_provider_interface_is_abstract():
+    with pytest.raises(TypeError):
+        GeocodingProvider()
+
+    class OnlyForward(GeocodingProvider):
+        def forward(self, text, timeout):
+            return None
+
+    with pytest.raises(TypeError):
+        OnlyForward()
+
+
+def test_breaker_opens_then_lets_one_probe_through():
+    breaker = CircuitBreaker(failure_threshold=2, reset_after=0.05)
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow() and not breaker.available()
+
+    time.sleep(0.06)
+    assert breaker.state == "half_open" and breaker.available()
+    assert breaker.allow()          # a chamada de teste
+    assert not breaker.allow()      # só uma por vez
+    breaker.record_failure()        # teste falhou: abre de novo
+    assert breaker.state == "open"
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+def test_resilient_provider_rejects_while_open_and_records_stats():
+    stub = StubProvider({"Rua A": (1.0, 2.0)}, fail=True)
+    resilient = ResilientProvider(stub, timeout=0.5, breaker=CircuitBreaker(2, reset_after=60))
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            resilient.forward("rua a")
+    with pytest.raises(CircuitOpenError):
+        resilient.forward("rua a")
+    assert len(stub.calls) == 2  # a terceira nem chegou ao provedor
+
+    stats = resilient.stats()
+    assert (stats["calls"], stats["errors"], stats["rejected"]) == (2, 2, 1)
+    assert stats["breaker"] == "open" and stats["provider"] == "stub"
+
+
+def test_stub_latency_over_budget_times_out():
+    resilient = ResilientProvider(StubProvider(latency=1.0), timeout=0.05)
+    with pytest.raises(TimeoutError):
+        resilient.reverse(1.0, 2.0)
+
+
+def test_blocking_geocode_respects_wait_budget():
+    previous = geocoding.set_provider(StubProvider({"rua lenta": (1.0, 2.0)}, latency=1.0))
+    try:
+        start = time.monotonic()
+        assert geocoding.geocode_address("Rua Lenta sem cache", timeout=0.1) == (None, None)
+        assert geocoding.reverse_geocode(-10.123, -40.456, timeout=0.1) is None
+        assert time.monotonic() - start < 0.5
+    finally:
+        # Os pedidos abandonados seguem na fila do worker: só troca o
+        # provedor de volta depois que eles rodarem neste stub
+        deadline = time.monotonic() + 10
+        while geocoding.geocoding_worker.pending() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        geocoding.set_provider(previous)
@@ -0,0 +1,92 @@
+# tests/test_geocoding_worker.py
+import threading
+import time
+
+import pytest
+
+from services.geocoding_worker import (
+    PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, GeocodingWorker, add_result_callback, resolved,
+)
+
+
+class Recorder:
+    """Handler que registra as chamadas; a primeira pode ficar presa num Event."""
+
+    def __init__(self, hold_first=False):
+        self.calls = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        if not hold_first:
+            self.release.set()
+
+    def __call__(self, value):
+        self.calls.append((value, time.monotonic()))
+        self.started.set()
+        self.release.wait(5)
+        if value == "erro":
+            raise ValueError("falhou")
+        return value.upper()
+
+    @property
+    def order(self):
+        return [value for value, _ in self.calls]
+
+
+def _busy_worker(min_delay=0.0):
+    """Worker ocupado com um pedido inicial, para os seguintes ficarem na fila."""
+    handler = Recorder(hold_first=True)
+    worker = GeocodingWorker({"forward": handler}, min_delay=min_delay, name="siara-geocoder-test")
+    first = worker.submit("forward", "primeiro", "primeiro")
+    assert handler.started.wait(5)
+    return worker, handler, first
+
+
+def test_equal_requests_share_one_call():
+    worker, handler, first = _busy_worker()
+    a = worker.submit("forward", "rua x", "rua x")
+    b = worker.submit("forward", "rua x", "rua x")
+    assert a is b and worker.pending() == 2
+    handler.release.set()
+    assert a.result(5) == "RUA X" and first.result(5) == "PRIMEIRO"
+    assert handler.order == ["primeiro", "rua x"]
+
+
+def test_interactive_requests_jump_the_background_queue():
+    worker, handler, _ = _busy_worker()
+    lote = [worker.submit("forward", f"lote {i}", f"lote {i}", priority=PRIORITY_BACKGROUND) for i in range(3)]
+    tela = worker.submit("forward", "tela", "tela", priority=PRIORITY_INTERACTIVE)
+    # Pedido de lote repetido pela tela sobe de prioridade
+    promovido = worker.submit("forward", "lote 2", "lote 2", priority=PRIORITY_INTERACTIVE)
+    assert promovido is lote[2]
+    handler.release.set()
+    for f in lote + [tela]:
+        f.result(5)
+    assert handler.order == ["primeiro", "tela", "lote 2", "lote 0", "lote 1"]
+    assert worker.pending() == 0
+
+
+def test_callbacks_errors_and_resolved_futures():
+    worker, handler, _ = _busy_worker()
+    got = []
+    ok = worker.submit("forward", "rua y", "rua y", callback=got.append)
+    bad = worker.submit("forward", "erro", "erro", callback=got.append)
+    handler.release.set()
+    assert ok.result(5) == "RUA Y"
+    with pytest.raises(ValueError):
+        bad.result(5)
+    # Depois de um erro o worker segue atendendo
+    assert worker.submit("forward", "rua z", "rua z").result(5) == "RUA Z"
+    assert got == ["RUA Y"]  # callback só com resultado
+
+    add_result_callback(resolved("cache"), got.append)
+    assert got == ["RUA Y", "cache"]
+
+
+def test_calls_are_spaced_by_min_delay():
+    handler = Recorder()
+    worker = GeocodingWorker({"forward": handler}, min_delay=0.2, name="siara-geocoder-test")
+    futures = [worker.submit("forward", k, k) for k in ("a", "b", "c")]
+    for f in futures:
+        f.result(5)
+    times = [t for _, t in handler.calls]
+    assert all(later - earlier >= 0.19 for earlier, later in zip(times, times[1:]))
@@ -0,0 +1,68 @@
+# tests/test_image_pipeline.py
+import os
+
+import pytest
+
+import models
+from services import image_gc, image_pipeline
+
+Image = pytest.importorskip("PIL.Image")
+
+
+@pytest.fixture
+def static(tmp_path, monkeypatch):
+    static_dir = tmp_path / "static"
+    image_dir = static_dir / "images"
+    variant_dir = image_dir / "variants"
+    image_dir.mkdir(parents=True)
+    monkeypatch.setattr(image_pipeline, "STATIC_DIR", static_dir)
+    monkeypatch.setattr(image_pipeline, "IMAGE_DIR", image_dir)
+    monkeypatch.setattr(image_pipeline, "VARIANT_DIR", variant_dir)
+    monkeypatch.setattr(image_gc, "IMAGE_DIR", image_dir)
+    monkeypatch.setattr(image_gc, "VARIANT_DIR", variant_dir)
+    return image_dir
+
+
+def _save(path, color, size=(64, 48)):
+    Image.new("RGB", size, color).save(path)
+    return path
+
+
+def test_same_stem_with_different_extensions_keeps_separate_variants(static):
+    jpg = _save(static / "x.jpg", "red")
+    png = _save(static / "x.png", "blue", size=(48, 64))
+    image_pipeline.create_variants(jpg)
+    image_pipeline.create_variants(png)
+
+    for size in image_pipeline.VARIANT_SIZES:
+        jpg_url = image_pipeline.variant_url("/images/x.jpg", size)
+        png_url = image_pipeline.variant_url("/images/x.png", size)
+        assert jpg_url == f"/images/variants/x.jpg.{size}.webp"
+        assert png_url == f"/images/variants/x.png.{size}.webp"
+
+    with Image.open(static / "variants" / "x.jpg.preview.webp") as a, \
+            Image.open(static / "variants" / "x.png.preview.webp") as b:
+        assert a.size == (64, 48) and b.size == (48, 64)
+
+
+def test_missing_variant_falls_back_to_original(static):
+    _save(static / "y.jpg", "green")
+    assert image_pipeline.variant_url("/images/y.jpg", "card") == "/images/y.jpg"
+    assert image_pipeline.rebuild_all() == 1
+    assert image_pipeline.variant_url("/images/y.jpg", "card") == "/images/variants/y.jpg.card.webp"
+
+
+def test_gc_keeps_only_the_variants_of_the_referenced_original(db, static):
+    for name, color in (("x.jpg", "red"), ("x.png", "blue")):
+        image_pipeline.create_variants(_save(static / name, color))
+    with models.session_scope() as s:
+        s.add(models.LostAnimal(name="Rex", image_url="/images/x.jpg"))
+
+    old = 1_000_000_000
+    for path in static.rglob("*.*"):
+        os.utime(path, (old, old))
+    image_gc.collect_orphans(grace=0, pause=0, log=lambda *_: None)
+
+    remaining = sorted(p.relative_to(static).as_posix() for p in static.rglob("*.*"))
+    assert remaining == ["variants/x.jpg.card.webp", "variants/x.jpg.full.webp",
+                         "variants/x.jpg.preview.webp", "x.jpg"]
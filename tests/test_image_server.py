@@ -0,0 +1,112 @@
+# tests/test_image_server.py
+import http.client
+import os
+import socket
+import time
+from email.utils import formatdate
+from urllib.parse import urlsplit
+
+import pytest
+
+from services import image_server
+from services.image_pipeline import IMAGE_DIR
+from services.image_server import parse_range
+
+
+def test_parse_range():
+    assert parse_range("bytes=0-9", 100) == (0, 9)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=50-500", 100) == (50, 99)
+    assert parse_range("bytes=-500", 100) == (0, 99)
+    assert parse_range("bytes=0-1,5-6", 100) is None  # vários intervalos: resposta inteira
+    assert parse_range("items=0-1", 100) is None
+    for unsatisfiable in ("bytes=100-", "bytes=9-3", "bytes=-0"):
+        with pytest.raises(ValueError):
+            parse_range(unsatisfiable, 100)
+
+
+@pytest.fixture(scope="module")
+def server():
+    base = image_server.start_image_server("127.0.0.1", 0)
+    yield urlsplit(base).netloc
+    image_server.stop_image_server()
+
+
+@pytest.fixture
+def photo():
+    IMAGE_DIR.mkdir(parents=True, exist_ok=True)
+    path = IMAGE_DIR / "server-test.jpg"
+    path.write_bytes(bytes(range(256)) * 400)  # > SENDFILE_MIN_BYTES
+    mtime = time.time() - 3600
+    os.utime(path, (mtime, mtime))
+    yield path
+    path.unlink()
+
+
+def _get(netloc, path, headers=None, method="GET"):
+    conn = http.client.HTTPConnection(netloc, timeout=5)
+    conn.request(method, path, headers=headers or {})
+    resp = conn.getresponse()
+    body = resp.read()
+    conn.close()
+    return resp, body
+
+
+def test_full_body_and_conditional_requests(server, photo):
+    resp, body = _get(server, "/images/server-test.jpg")
+    assert resp.status == 200 and body == photo.read_bytes()
+    assert resp.getheader("Cache-Control") == image_server.REVALIDATE_CACHE
+    etag, last_modified = resp.getheader("ETag"), resp.getheader("Last-Modified")
+
+    assert _get(server, "/images/server-test.jpg", {"If-None-Match": etag})[0].status == 304
+    assert _get(server, "/images/server-test.jpg", {"If-None-Match": '"outro"'})[0].status == 200
+    assert _get(server, "/images/server-test.jpg", {"If-Modified-Since": last_modified})[0].status == 304
+    older = formatdate(photo.stat().st_mtime - 60, usegmt=True)
+    assert _get(server, "/images/server-test.jpg", {"If-Modified-Since": older})[0].status == 200
+
+
+def test_ranges(server, photo):
+    data = photo.read_bytes()
+    resp, body = _get(server, "/images/server-test.jpg", {"Range": "bytes=10-19"})
+    assert resp.status == 206 and body == data[10:20]
+    assert resp.getheader("Content-Range") == f"bytes 10-19/{len(data)}"
+
+    resp, body = _get(server, "/images/server-test.jpg", {"Range": "bytes=1000-"})
+    assert resp.status == 206 and body == data[1000:]  # pelo sendfile, com deslocamento
+
+    resp, _ = _get(server, "/images/server-test.jpg", {"Range": f"bytes={len(data)}-"})
+    assert resp.status == 416
+
+    resp, body = _get(server, "/images/server-test.jpg", {"Range": "bytes=0-0", "If-Range": '"velho"'})
+    assert resp.status == 200 and body == data
+
+
+def test_head_missing_and_traversal(server, photo):
+    resp, body = _get(server, "/images/server-test.jpg", method="HEAD")
+    assert resp.status == 200 and body == b""
+    assert int(resp.getheader("Content-Length")) == photo.stat().st_size
+    assert _get(server, "/images/nada.jpg")[0].status == 404
+    assert _get(server, "/images/../siara-test.db")[0].status == 404
+    assert _get(server, "/images/%2e%2e/siara-test.db")[0].status == 404
+
+
+def test_image_src_uses_server_only_for_local_images(server):
+    assert image_server.image_src("/images/x.jpg") == f"http://{server}/images/x.jpg"
+    assert image_server.image_src("https://example.com/x.jpg") == "https://example.com/x.jpg"
+
+
+def test_default_port_is_fixed():
+    assert image_server.IMAGE_PORT != 0
+
+
+def test_busy_port_falls_back_to_flet_assets(monkeypatch):
+    monkeypatch.setattr(image_server, "_server", None)
+    monkeypatch.setattr(image_server, "_base_url", None)
+    with socket.socket() as busy:
+        busy.bind(("127.0.0.1", 0))
+        busy.listen()
+        port = busy.getsockname()[1]
+        assert image_server.start_image_server("127.0.0.1", port) is None
+    assert image_server._server is None
+    assert image_server.image_src("/images/x.jpg") == "/images/x.jpg"
@@ -0,0 +1,68 @@
+# tests/test_image_store.py
+import pytest
+
+from models import FoundReport, LostAnimal, session_scope
+from services.image_refs import recount_image_refs
+from services.image_store import (
+    BLOB_DIR, ImageTooLargeError, blob_path, blob_refcount, store_file, store_stream,
+)
+from services.post_repository import delete_post
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def _jpeg(tmp_path, name, color):
+    path = tmp_path / name
+    Image.new("RGB", (16, 16), color).save(path, "JPEG")
+    return path
+
+
+def test_same_content_is_stored_once(db, tmp_path):
+    a = _jpeg(tmp_path, "a.jpg", "red")
+    copy = tmp_path / "copy.jpg"
+    copy.write_bytes(a.read_bytes())
+    url = store_file(a, ".JPG")
+    assert store_file(copy, ".jpg") == url
+    stream_url, size = store_stream(iter([a.read_bytes()[:10], a.read_bytes()[10:]]), ".jpg")
+    assert stream_url == url and size == a.stat().st_size
+    digest = url.rsplit("/", 1)[1].split(".")[0]
+    assert blob_path(digest, ".jpg").read_bytes() == a.read_bytes()
+    assert blob_refcount(url) == 0  # ainda sem posts
+
+
+def test_size_cap_leaves_no_blob_behind(db, tmp_path):
+    big = _jpeg(tmp_path, "big.jpg", "blue")
+    with pytest.raises(ImageTooLargeError):
+        store_file(big, ".jpg", max_bytes=10)
+    with pytest.raises(ImageTooLargeError):
+        store_stream(iter([b"x" * 8, b"x" * 8]), ".jpg", max_bytes=10)
+    assert not list(BLOB_DIR.rglob(".incoming-*"))
+
+
+def test_triggers_track_references(user, tmp_path):
+    url = store_file(_jpeg(tmp_path, "a.jpg", "green"), ".jpg")
+    other = store_file(_jpeg(tmp_path, "b.jpg", "white"), ".jpg")
+    with session_scope() as s:
+        lost = LostAnimal(name="Rex", owner_id=user, image_url=url)
+        s.add_all([lost, FoundReport(species="cão", finder_id=user, image_url=url)])
+        s.flush()
+        lost_id = lost.id
+    assert blob_refcount(url) == 2
+
+    with session_scope() as s:
+        s.get(LostAnimal, lost_id).image_url = other
+    assert (blob_refcount(url), blob_refcount(other)) == (1, 1)
+
+    assert delete_post("lost", lost_id, user)
+    assert (blob_refcount(url), blob_refcount(other)) == (1, 0)
+
+
+def test_recount_rebuilds_counters_from_posts(user, tmp_path, db):
+    url = store_file(_jpeg(tmp_path, "a.jpg", "black"), ".jpg")
+    with session_scope() as s:
+        s.add_all([LostAnimal(name="A", owner_id=user, image_url=url),
+                   LostAnimal(name="B", owner_id=user, image_url=url)])
+    with db.begin() as conn:
+        conn.exec_driver_sql("UPDATE image_blobs SET refcount = 7")
+        recount_image_refs(conn)
+    assert blob_refcount(url) == 2
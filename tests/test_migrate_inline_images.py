@@ -0,0 +1,60 @@
+# tests/test_migrate_inline_images.py
+import io
+
+import pytest
+from sqlalchemy import select
+
+from models import FoundReport, LostAnimal, session_scope
+from services import migrate_inline_images
+from services.image_store import blob_refcount, is_blob_url
+from services.posts_read_model import posts
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def _png(color):
+    buf = io.BytesIO()
+    Image.new("RGB", (8, 8), color).save(buf, "PNG")
+    return buf.getvalue()
+
+
+@pytest.fixture
+def fake_decrypt(monkeypatch):
+    # flet.security não é necessário aqui: o "cifrado" é o próprio conteúdo em hex
+    def decode(value, secret=None):
+        name, payload = value[len(migrate_inline_images.INLINE_PREFIX):].split("|", 1)
+        data = bytes.fromhex(payload)
+        if not data:
+            raise ValueError("conteúdo vazio")
+        return name, data
+
+    monkeypatch.setattr(migrate_inline_images, "decode_inline_image", decode)
+
+
+def _inline(name, data):
+    return f"{migrate_inline_images.INLINE_PREFIX}{name}|{data.hex()}"
+
+
+def test_migrates_every_row_in_one_batch(user, fake_decrypt):
+    shared = _png("red")
+    with session_scope() as s:
+        s.add_all([
+            LostAnimal(name="A", owner_id=user, image_url=_inline("a.png", shared)),
+            LostAnimal(name="B", owner_id=user, image_url=_inline("b.png", _png("blue"))),
+            FoundReport(species="gato", finder_id=user, image_url=_inline("c.png", shared)),
+            LostAnimal(name="D", owner_id=user, image_url=_inline("d.png", b"")),
+        ])
+
+    summary = migrate_inline_images.migrate(batch_size=10, log=lambda *_: None)
+    assert summary == {"migrated": 3, "failed": 1}
+
+    with session_scope() as s:
+        urls = list(s.execute(select(posts.c.image_url)).scalars())
+    migrated = [u for u in urls if is_blob_url(u)]
+    assert len(migrated) == 3
+    # a mesma foto em dois posts vira um blob com dois donos
+    shared_url = next(u for u in migrated if migrated.count(u) == 2)
+    assert blob_refcount(shared_url) == 2
+
+    # rodar de novo não encontra mais nada para migrar
+    assert migrate_inline_images.migrate(log=lambda *_: None) == {"migrated": 0, "failed": 1}
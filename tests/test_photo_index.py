@@ -0,0 +1,107 @@
+# tests/test_photo_index.py
+import random
+
+import pytest
+
+from models import FoundReport, LostAnimal, session_scope
+from services import photo_index
+from services.photo_hash import BKTree, from_db, hamming, to_db
+from services.post_repository import delete_post
+
+Image = pytest.importorskip("PIL.Image")
+
+
+@pytest.fixture(autouse=True)
+def fresh_indexes(db):
+    for index in photo_index.photo_indexes.values():
+        index.reset()
+    yield
+
+
+def test_bktree_search_matches_linear_scan():
+    rng = random.Random(7)
+    keys = [rng.getrandbits(64) for _ in range(2000)]
+    tree = BKTree()
+    for i, key in enumerate(keys):
+        tree.add(key, i)
+    for query in keys[:40]:
+        query ^= 1 << rng.randrange(64)
+        expected = sorted(i for i, key in enumerate(keys) if hamming(key, query) <= 12)
+        assert sorted(i for _, i in tree.search(query, 12)) == expected
+
+
+def test_bktree_remove_keeps_other_items_reachable():
+    tree = BKTree()
+    for i, key in enumerate((0b0000, 0b0001, 0b0011, 0b0111, 0b0011)):
+        tree.add(key, i)
+    assert tree.remove(0b0011, 2)
+    assert not tree.remove(0b0011, 2)
+    assert len(tree) == 4
+    assert sorted(i for _, i in tree.search(0b0011, 1)) == [1, 3, 4]
+
+
+def test_signed_storage_round_trip():
+    for value in (0, 1, (1 << 63) - 1, 1 << 63, (1 << 64) - 1):
+        assert -(1 << 63) <= to_db(value) < (1 << 63)
+        assert from_db(to_db(value)) == value
+
+
+def _photo(tmp_path, name, seed, size=(240, 180), brightness=0):
+    rng = random.Random(seed)
+    small = Image.new("L", (24, 18))
+    small.putdata([min(255, rng.randrange(256) + brightness) for _ in range(24 * 18)])
+    path = tmp_path / name
+    small.resize(size, Image.BILINEAR).convert("RGB").save(path, quality=85)
+    return path
+
+
+def _lost(user, name, url):
+    with session_scope() as s:
+        animal = LostAnimal(name=name, species="cão", owner_id=user, image_url=url)
+        s.add(animal)
+        s.flush()
+        return animal.id
+
+
+def _stored(path, url):
+    assert photo_index.index_photo(url, path) is not None
+    return url
+
+
+def test_similar_photo_found_and_unrelated_ignored(user, tmp_path):
+    rex = _lost(user, "Rex", _stored(_photo(tmp_path, "rex.jpg", 1), "/images/rex.jpg"))
+    _lost(user, "Mia", _stored(_photo(tmp_path, "mia.jpg", 2), "/images/mia.jpg"))
+    found = _stored(_photo(tmp_path, "f.jpg", 1, size=(400, 300), brightness=10), "/images/f.jpg")
+
+    matches = photo_index.similar_lost_animals(found)
+    assert [(m.id, m.name) for m in matches] == [(rex, "Rex")]
+    assert matches[0].distance <= photo_index.MATCH_DISTANCE
+
+
+def test_index_is_updated_incrementally(user, tmp_path, monkeypatch):
+    url = _stored(_photo(tmp_path, "rex.jpg", 1), "/images/rex.jpg")
+    other = _stored(_photo(tmp_path, "mia.jpg", 2), "/images/mia.jpg")
+    first = _lost(user, "Rex", url)
+    assert [m.id for m in photo_index.similar_lost_animals(url)] == [first]
+
+    rebuilds = []
+    lost_index = photo_index.photo_indexes["lost"]
+    original = lost_index._rebuild
+    monkeypatch.setattr(lost_index, "_rebuild", lambda: rebuilds.append(1) or original())
+
+    # relato de encontrado não afeta o índice de perdidos
+    with session_scope() as s:
+        s.add(FoundReport(species="cão", finder_id=user, image_url=url))
+    second = _lost(user, "Rex 2", url)
+    assert {m.id for m in photo_index.similar_lost_animals(url)} == {first, second}
+
+    # edição pela Session: sai com a foto antiga, entra com a nova
+    with session_scope() as s:
+        s.get(LostAnimal, second).image_url = other
+    assert [m.id for m in photo_index.similar_lost_animals(url)] == [first]
+    assert [m.id for m in photo_index.similar_lost_animals(other)] == [second]
+
+    # exclusão fora do ORM (DELETE do Core)
+    assert delete_post("lost", first, user)
+    assert photo_index.similar_lost_animals(url) == []
+    assert rebuilds == []
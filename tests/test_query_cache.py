@@ -0,0 +1,63 @@
+# tests/test_query_cache.py
+from models import LostAnimal, page_scope_key, session_scope, unit_of_work
+from services.post_repository import delete_post, user_posts
+from services.query_cache import QueryCache
+
+
+def _add_lost(owner_id, name="Rex"):
+    with session_scope() as s:
+        animal = LostAnimal(name=name, species="cão", owner_id=owner_id)
+        s.add(animal)
+        s.flush()
+        return animal.id
+
+
+def test_cached_until_commit_on_dependent_table(user):
+    _add_lost(user)
+    first = user_posts(user)
+    assert user_posts(user) is first  # segunda leitura vem do cache
+
+    _add_lost(user, "Mia")
+    assert [p.name for p in user_posts(user)] == ["Mia", "Rex"]
+
+
+def test_read_inside_unit_of_work_sees_own_delete(user):
+    item_id = _add_lost(user)
+    assert len(user_posts(user)) == 1  # lista em cache
+
+    with unit_of_work(page_scope_key(object())):
+        assert delete_post("lost", item_id, user)
+        # mesma transação, antes do commit: não pode vir do cache
+        assert user_posts(user) == []
+
+    assert user_posts(user) == []
+
+
+def test_read_before_rollback_is_not_stored(user):
+    _add_lost(user)
+    user_posts(user)
+    try:
+        with unit_of_work():
+            _add_lost(user, "Mia")
+            assert len(user_posts(user)) == 2  # enxerga a própria inserção
+            raise RuntimeError("falha")
+    except RuntimeError:
+        pass
+    assert [p.name for p in user_posts(user)] == ["Rex"]
+
+
+def test_put_skipped_when_table_changed_during_read():
+    cache = QueryCache(max_entries=2, ttl=60)
+    before = cache.versions(("t",))
+    cache.invalidate_tables({"t"})
+    cache.put("k", ("t",), 1, before)
+    assert cache.get("k") == (False, None)
+
+
+def test_lru_and_invalidation_by_table():
+    cache = QueryCache(max_entries=2, ttl=60)
+    for key, table in (("a", "x"), ("b", "y"), ("c", "y")):
+        cache.put(key, (table,), key, cache.versions((table,)))
+    assert cache.get("a") == (False, None)  # saiu pelo LRU
+    cache.invalidate_tables({"y"})
+    assert cache.get("b") == (False, None) and cache.get("c") == (False, None)
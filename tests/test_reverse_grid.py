@@ -0,0 +1,45 @@
+# tests/test_reverse_grid.py
+import pytest
+
+from services import geocoding
+from services.geocode_cache import GeocodeCache
+from services.geocoding_providers import StubProvider
+from services.reverse_grid import distance_m, grid_cell, nearest_entry, neighbour_cells
+
+LAT, LON = -25.4296, -49.2713
+_M_PER_DEG = 111320.0
+
+
+def test_neighbour_cells_are_the_cell_and_its_eight_neighbours():
+    cells = neighbour_cells(LAT, LON)
+    assert cells[0] == grid_cell(LAT, LON)
+    assert len(cells) == len(set(cells)) == 9
+    # Um ponto a 10 m em qualquer direção cai numa dessas células
+    for dlat, dlon in ((10, 0), (-10, 0), (0, 10), (0, -10), (7, 7), (-7, -7)):
+        lat = LAT + dlat / _M_PER_DEG
+        lon = LON + dlon / (_M_PER_DEG * 0.9)
+        assert grid_cell(lat, lon) in cells
+
+
+def test_nearest_entry_respects_tolerance():
+    near = {"address": "perto", "lat": LAT + 5 / _M_PER_DEG, "lon": LON}
+    nearer = {"address": "mais perto", "lat": LAT + 2 / _M_PER_DEG, "lon": LON}
+    far = {"address": "longe", "lat": LAT + 40 / _M_PER_DEG, "lon": LON}
+    assert distance_m(LAT, LON, near["lat"], near["lon"]) == pytest.approx(5, abs=0.1)
+    assert nearest_entry(LAT, LON, [near, None, nearer, far]) is nearer
+    assert nearest_entry(LAT, LON, [far, None]) is None
+    assert nearest_entry(LAT, LON, [near], tolerance_m=1) is None
+
+
+def test_nearby_click_is_answered_from_the_grid_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(geocoding, "geocode_cache", GeocodeCache(str(tmp_path / "cache.db")))
+    stub = StubProvider(reverse_results={(round(LAT, 4), round(LON, 4)): "Rua XV de Novembro"})
+    previous = geocoding.set_provider(stub)
+    try:
+        assert geocoding.reverse_geocode(LAT, LON, timeout=5) == "Rua XV de Novembro"
+        # 8 m ao norte: outra coordenada, mesma vizinhança, sem ir à rede
+        assert geocoding.reverse_geocode(LAT + 8 / _M_PER_DEG, LON, timeout=5) == "Rua XV de Novembro"
+    finally:
+        geocoding.set_provider(previous)
+    # (só as reversas: o worker é compartilhado com os outros testes)
+    assert [c for c in stub.calls if c[0] == "reverse"] == [("reverse", LAT, LON)]
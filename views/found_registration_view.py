@@ -2,10 +2,13 @@
 
 import flet as ft
 from models import FoundReport, session_scope
-from services.geocoding import geocode_address, reverse_geocode, build_static_map_url
-import os
-import shutil
-import time
+from services.geocoding import (
+    geocode_address, geocode_address_async, reverse_geocode_async, build_static_map_url,
+)
+from services.db_executor import run_in_background
+from services.autocomplete import AddressAutocomplete
+from services.file_storage import ImageTooLargeError, photo_metadata, save_image_locally
+from services.photo_index import similar_lost_animals
 from datetime import datetime
 
 
@@ -88,6 +91,8 @@ def show_found_registration(page, state, go_to_home_func, show_snack_func, go_to
             file_path_chosen = e.files[0].path
             file_name_chosen = e.files[0].name
             upload_status_text.value = f"Arquivo selecionado: {file_name_chosen}"
+            if file_path_chosen:
+                run_in_background(photo_metadata, file_path_chosen, file_name_chosen, on_done=apply_photo_metadata)
         else:
             file_path_chosen = None
             file_name_chosen = None
@@ -95,6 +100,29 @@ def show_found_registration(page, state, go_to_home_func, show_snack_func, go_to
 
         page.update()
 
+    # GPS e data do EXIF da foto preenchem o que ainda estiver vazio; com
+    # coordenadas, o persist() não precisa geocodificar o endereço
+    def apply_photo_metadata(meta):
+        changed = False
+        if meta.has_location and not (lat_field.value and lon_field.value):
+            lat_field.value = f"{meta.latitude:.6f}"
+            lon_field.value = f"{meta.longitude:.6f}"
+            changed = True
+            if not location.value:
+                def fill_address(address):
+                    if address and not location.value:
+                        location.value = address
+                        page.update()
+
+                reverse_geocode_async(meta.latitude, meta.longitude,
+                                      callback=fill_address, caller="found_registration")
+        if meta.taken_at and not date.value:
+            date.value = meta.taken_at.strftime("%d/%m/%Y")
+            changed = True
+        if changed:
+            upload_status_text.value = f"Arquivo selecionado: {file_name_chosen} (local/data da foto)"
+            update_preview_from_fields()
+
     file_picker = ft.FilePicker(on_result=file_picker_result)
     page.overlay.append(file_picker)
 
@@ -124,14 +152,69 @@ def show_found_registration(page, state, go_to_home_func, show_snack_func, go_to
         lat_field.value = f"{lat:.6f}"
         lon_field.value = f"{lon:.6f}"
 
-        # preencher o endereço automaticamente se vazio
+        # preencher o endereço automaticamente se vazio (resposta chega
+        # depois, pela fila de geocodificação)
         if not location.value:
-            address = reverse_geocode(lat, lon)
-            if address:
-                location.value = address
+            def fill_address(address):
+                if address and not location.value:
+                    location.value = address
+                    page.update()
+
+            reverse_geocode_async(lat, lon, callback=fill_address, caller="found_registration")
+
+        update_preview_from_fields()
+
+    # Ao sair do campo de local sem coordenadas, já pede a geocodificação
+    def on_location_blur(e):
+        if not location.value or (lat_field.value and lon_field.value):
+            return
+        typed = location.value
+
+        def fill_coords(coords):
+            lat, lon = coords
+            # Ignora a resposta se o endereço mudou ou o mapa já foi usado
+            if lat is None or location.value != typed or lat_field.value:
+                return
+            lat_field.value = f"{lat:.6f}"
+            lon_field.value = f"{lon:.6f}"
+            update_preview_from_fields()
+
+        geocode_address_async(typed, callback=fill_coords, caller="found_registration")
+
+    location.on_blur = on_location_blur
+
+    # ---------- AUTOCOMPLETE DO ENDEREÇO ----------
+    # Sugestões locais (gazetteer + endereços já resolvidos), sem rede
+    address_suggestions = ft.Column(spacing=0, visible=False)
 
+    def pick_suggestion(suggestion):
+        autocomplete.cancel()
+        location.value = suggestion.label
+        lat_field.value = f"{suggestion.lat:.6f}"
+        lon_field.value = f"{suggestion.lon:.6f}"
+        address_suggestions.controls.clear()
+        address_suggestions.visible = False
         update_preview_from_fields()
 
+    def show_suggestions(suggestions):
+        address_suggestions.controls = [
+            ft.ListTile(
+                title=ft.Text(sug.label, size=12),
+                dense=True,
+                on_click=lambda e, sug=sug: pick_suggestion(sug),
+            )
+            for sug in suggestions
+        ]
+        address_suggestions.visible = bool(suggestions)
+        page.update()
+
+    autocomplete = AddressAutocomplete(show_suggestions)
+
+    def on_location_change(e):
+        autocomplete.update(location.value or "")
+
+    location.on_change = on_location_change
+
     # ---------- 5. SALVAR ----------
     def do_register_found(e):
         nonlocal current_image_url, file_path_chosen, file_name_chosen
@@ -156,79 +239,124 @@ def show_found_registration(page, state, go_to_home_func, show_snack_func, go_to
         lat = float(lat_field.value) if lat_field.value else None
         lon = float(lon_field.value) if lon_field.value else None
 
-        if lat is None or lon is None:
-            coords = geocode_address(location.value)
-            if coords:
-                lat, lon = coords
-            else:
-                show_snack_func("Não foi possível obter coordenadas. Use o mapa.", is_error=True)
-
-        # Upload da imagem
-        image_url_to_save = current_image_url
-        if file_path_chosen:
-            try:
-                filename_to_save = f"{cur['id']}_{int(time.time())}_{file_name_chosen}"
-                target_path = os.path.join(os.getcwd(), "static/images", filename_to_save)
-                shutil.copyfile(file_path_chosen, target_path)
-                image_url_to_save = f"/images/{filename_to_save}"
-            except:
-                show_snack_func("Erro ao salvar imagem.", is_error=True)
-
-        # Persistência
-        try:
+        # Valores lidos na thread do evento; geocodificação, cópia da imagem e
+        # gravação no banco rodam no pool de background (services.db_executor)
+        form = {
+            "species": species.value,
+            "location": location.value,
+            "description": desc.value,
+            "found_date": found_date_parsed,
+            "lat": lat,
+            "lon": lon,
+        }
+        image_source = (file_path_chosen, file_name_chosen)
+
+        def persist():
+            lat, lon = form["lat"], form["lon"]
+            warnings = []
+            if lat is None or lon is None:
+                lat, lon = geocode_address(form["location"], caller="found_registration")
+                if lat is None or lon is None:
+                    warnings.append("Não foi possível obter coordenadas. Use o mapa.")
+
+            # Upload da imagem
+            image_url_to_save = current_image_url
+            path_chosen, name_chosen = image_source
+            if path_chosen:
+                # Store endereçado por conteúdo: a mesma foto não é gravada duas vezes
+                try:
+                    saved_url = save_image_locally(path_chosen, name_chosen)
+                    if saved_url:
+                        image_url_to_save = saved_url
+                    else:
+                        warnings.append("Erro ao salvar imagem.")
+                except ImageTooLargeError:
+                    warnings.append("A imagem é muito grande e não foi salva.")
+
+            # Persistência
             with session_scope() as s:
                 if is_edit_mode:
                     post = s.query(FoundReport).filter_by(id=edit_id, finder_id=cur["id"]).first()
                     if post:
-                        post.species = species.value
-                        post.found_location = location.value
-                        post.found_description = desc.value
-                        post.found_date = found_date_parsed
+                        post.species = form["species"]
+                        post.found_location = form["location"]
+                        post.found_description = form["description"]
+                        post.found_date = form["found_date"]
                         post.latitude = lat
                         post.longitude = lon
                         post.image_url = image_url_to_save
-                        s.commit()
-
-                        state["edit_found_id"] = None
-                        state["post_data_for_edit"] = None
-
-                        show_snack_func("Relato atualizado.")
-                        go_to_home_func()
-                        return
+                        return "updated", warnings, []
 
                 # CREATE
                 new_report = FoundReport(
-                    species=species.value,
-                    found_description=desc.value,
-                    found_location=location.value,
-                    found_date=found_date_parsed,
+                    species=form["species"],
+                    found_description=form["description"],
+                    found_location=form["location"],
+                    found_date=form["found_date"],
                     latitude=lat,
                     longitude=lon,
                     image_url=image_url_to_save,
                     finder_id=cur["id"],
                 )
-
                 s.add(new_report)
-                s.commit()
 
+            # Animais perdidos com foto parecida (hash perceptual, BK-tree)
+            matches = similar_lost_animals(image_url_to_save) if image_url_to_save else []
+            return "created", warnings, matches
+
+        def on_done(result):
+            outcome, warnings, matches = result
+            set_saving(False)
+            for w in warnings:
+                show_snack_func(w, is_error=True)
+
+            if outcome == "updated":
+                state["edit_found_id"] = None
+                state["post_data_for_edit"] = None
+
+                show_snack_func("Relato atualizado.")
+                go_to_home_func()
+                return
+
+            if matches:
+                names = ", ".join(m.name or m.species or f"#{m.id}" for m in matches[:3])
+                show_snack_func(f"Relato registrado! Foto parecida com animais perdidos: {names}.")
+            else:
                 show_snack_func("Relato registrado!")
 
-                species.value = location.value = date.value = desc.value = ""
-                lat_field.value = lon_field.value = ""
-                upload_status_text.value = "Nenhuma imagem selecionada."
-                preview_image.src = ""
-                page.update()
+            species.value = location.value = date.value = desc.value = ""
+            lat_field.value = lon_field.value = ""
+            upload_status_text.value = "Nenhuma imagem selecionada."
+            preview_image.src = ""
+            page.update()
 
-        except Exception as ex:
+        def on_error(ex):
+            set_saving(False)
             msg.value = f"Erro ao salvar: {ex}"
             page.update()
 
+        set_saving(True)
+        run_in_background(persist, on_done=on_done, on_error=on_error)
+
+    def set_saving(flag):
+        save_button.disabled = flag
+        saving_progress.visible = flag
+        page.update()
+
+    save_button = ft.ElevatedButton(
+        button_text,
+        on_click=do_register_found,
+        style=ft.ButtonStyle(bgcolor=ft.Colors.GREEN_600),
+    )
+    saving_progress = ft.ProgressRing(width=16, height=16, stroke_width=2, visible=False)
+
     # ---------- 6. LAYOUT ----------
     page.add(
         ft.Text(title_text, size=18, weight=ft.FontWeight.BOLD),
 
         species,
         location,
+        address_suggestions,
         date,
         desc,
 
@@ -264,11 +392,8 @@ def show_found_registration(page, state, go_to_home_func, show_snack_func, go_to
         msg,
 
         ft.Row([
-            ft.ElevatedButton(
-                button_text,
-                on_click=do_register_found,
-                style=ft.ButtonStyle(bgcolor=ft.Colors.GREEN_600),
-            ),
+            saving_progress,
+            save_button,
             ft.OutlinedButton("Voltar", on_click=go_to_home_func)
         ], alignment=ft.MainAxisAlignment.END),
     )
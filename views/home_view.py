@@ -1,9 +1,12 @@
 import flet as ft
-from models import LostAnimal, FoundReport, session_scope
-from sqlalchemy import or_
+from services.db_executor import run_in_background
+from services.feed_query import FeedFilter, FEED_PAGE_SIZE, load_feed_page
 # Importa a função de card (AGORA ATUALIZADA - que requer 'page')
 from views.my_posts_view import build_post_card 
 
+# Distância (px) do fim da lista em que a próxima página começa a carregar
+SCROLL_LOAD_THRESHOLD = 600
+
 # A assinatura AGORA tem 8 argumentos
 def show_home(page, state, go_to_login_func, go_to_lost_reg_func, go_to_found_reg_func, go_to_my_posts_func, go_to_map_func, do_logout_func):
     page.controls.clear()
@@ -15,7 +18,7 @@ def show_home(page, state, go_to_login_func, go_to_lost_reg_func, go_to_found_re
         return
 
     # Lista de controles para exibir os posts
-    posts_list = ft.ListView(expand=1, spacing=10, padding=20)
+    posts_list = ft.ListView(expand=1, spacing=10, padding=20, scroll_interval=100)
     
     # --- CONTROLES DE FILTRO ---
     search_field = ft.TextField(label="Buscar por Descrição ou Local", width=300)
@@ -40,91 +43,90 @@ def show_home(page, state, go_to_login_func, go_to_lost_reg_func, go_to_found_re
         value="Qualquer"
     )
 
-    # --- FUNÇÃO PARA CARREGAR E EXIBIR OS POSTS (LÓGICA DE FILTRO) ---
-    def load_and_display_posts(search_term="", species_filter="", type_filter=""):
-        posts_list.controls.clear()
-        
-        # Converte para minúsculas para busca insensível a maiúsculas/minúsculas
-        search_term = search_term.lower()
-        species_filter = species_filter.lower()
-        type_filter = type_filter.lower()
-        
-        try:
-            with session_scope() as s:
-                # 4.1. Carregar todos os posts
-                lost_animals = s.query(LostAnimal).all()
-                found_reports = s.query(FoundReport).all()
-                
-                all_posts = []
-
-                # Lógica de Filtro
-                def passes_filter(post, is_lost):
-                    # Filtro por tipo (Perdido/Encontrado)
-                    current_type = "perdido" if is_lost else "encontrado"
-                    if type_filter != "qualquer" and type_filter != current_type: 
-                        return False
-                    
-                    # Filtro por espécie
-                    post_species = post.species.lower() if post.species else ""
-                    if species_filter != "qualquer" and species_filter not in post_species:
-                        return False
-
-                    # Filtro de busca (Descrição/Localização)
-                    if search_term:
-                        desc = post.desc_animal.lower() if is_lost and post.desc_animal else post.found_description.lower() if not is_lost and post.found_description else ""
-                        loc = post.lost_location.lower() if is_lost and post.lost_location else post.found_location.lower() if not is_lost and post.found_location else ""
-                        
-                        if search_term not in desc and search_term not in loc:
-                            return False
-                    
-                    return True # Passou em todos os filtros
-
-                
-                # Aplica filtros e prepara cards
-                for a in lost_animals:
-                    if passes_filter(a, is_lost=True):
-                        # CHAMADA CORRIGIDA: Passando 'page'
-                        card = build_post_card(
-                            page, # <--- CORREÇÃO AQUI: O primeiro argumento é 'page'
-                            title=a.name or "Animal perdido",
-                            location_text=a.lost_location,
-                            description=a.desc_animal,
-                            lat=a.latitude,
-                            lon=a.longitude,
-                            is_lost=True,
-                            item_id=a.id,
-                            on_edit_click=None, # Feed global não tem edição/exclusão
-                            on_delete_click=None,
-                            image_url=a.image_url 
-                        )
-                        posts_list.controls.append(card)
-
-                for r in found_reports:
-                    if passes_filter(r, is_lost=False):
-                        # CHAMADA CORRIGIDA: Passando 'page'
-                        card = build_post_card(
-                            page, # <--- CORREÇÃO AQUI: O primeiro argumento é 'page'
-                            title=r.species or "Animal encontrado",
-                            location_text=r.found_location,
-                            description=r.found_description,
-                            lat=r.latitude,
-                            lon=r.longitude,
-                            is_lost=False,
-                            item_id=r.id,
-                            on_edit_click=None,
-                            on_delete_click=None,
-                            image_url=r.image_url 
-                        )
-                        posts_list.controls.append(card)
-
-                if not posts_list.controls:
-                    posts_list.controls.append(ft.Text("Nenhum registro encontrado com os filtros aplicados."))
-            
-        except Exception as e:
+    # --- PAGINAÇÃO DO FEED (cursor / scroll infinito) ---
+    # Só a página atual vira card; as seguintes são carregadas quando o
+    # ListView chega perto do fim. As consultas rodam no pool de banco
+    # (services.db_executor); `generation` descarta respostas de uma busca
+    # antiga que cheguem depois de o usuário trocar os filtros.
+    feed = {"filters": None, "cursor": None, "done": True, "loading": False, "generation": 0}
+    loading_bar = ft.ProgressBar(visible=False)
+
+    def build_card(p):
+        is_lost = p.kind == "lost"
+        return build_post_card(
+            page,
+            title=(p.name or "Animal perdido") if is_lost else (p.species or "Animal encontrado"),
+            location_text=p.location,
+            description=p.description,
+            lat=p.lat,
+            lon=p.lon,
+            is_lost=is_lost,
+            item_id=p.id,
+            on_edit_click=None, # Feed global não tem edição/exclusão
+            on_delete_click=None,
+            image_url=p.image_url
+        )
+
+    def set_loading(flag):
+        feed["loading"] = flag
+        loading_bar.visible = flag
+
+    def show_page(result):
+        rows, feed["cursor"] = result
+        feed["done"] = feed["cursor"] is None
+        posts_list.controls.extend(build_card(p) for p in rows)
+        if not posts_list.controls:
+            posts_list.controls.append(ft.Text("Nenhum registro encontrado com os filtros aplicados."))
+        set_loading(False)
+        page.update()
+
+    def load_next_page():
+        if feed["done"] or feed["loading"]:
+            return
+        set_loading(True)
+        page.update()
+        generation = feed["generation"]
+
+        def on_done(result):
+            if generation != feed["generation"]:
+                return
+            show_page(result)
+
+        def on_error(e):
+            if generation != feed["generation"]:
+                return
+            feed["done"] = True
             posts_list.controls.append(ft.Text(f"Erro ao carregar posts: {e}", color=ft.Colors.RED))
             print(f"Erro ao carregar posts no home_view: {e}")
-            
-        page.update()
+            set_loading(False)
+            page.update()
+
+        run_in_background(load_feed_page, feed["filters"], FEED_PAGE_SIZE, feed["cursor"],
+                          on_done=on_done, on_error=on_error)
+
+    def on_feed_scroll(e: ft.OnScrollEvent):
+        if feed["done"] or e.max_scroll_extent is None:
+            return
+        if e.pixels >= e.max_scroll_extent - SCROLL_LOAD_THRESHOLD:
+            load_next_page()
+
+    posts_list.on_scroll = on_feed_scroll
+
+    # --- FUNÇÃO PARA CARREGAR E EXIBIR OS POSTS (LÓGICA DE FILTRO) ---
+    def load_and_display_posts(search_term="", species_filter="", type_filter="", first_page=None):
+        posts_list.controls.clear()
+
+        # 4.1. Uma única consulta SQL com todos os filtros (tipo, espécie, busca),
+        # limitada à primeira página; nova geração invalida páginas em voo
+        feed["generation"] += 1
+        feed["filters"] = FeedFilter.from_form(search_term, species_filter, type_filter)
+        feed["cursor"] = None
+        feed["done"] = False
+        set_loading(False)
+        if first_page is not None and first_page[0] == feed["filters"]:
+            show_page(first_page[1])
+        else:
+            load_next_page()
 
     def apply_filters(e):
         load_and_display_posts(search_field.value, species_dropdown.value, type_dropdown.value)
@@ -181,8 +183,11 @@ def show_home(page, state, go_to_login_func, go_to_lost_reg_func, go_to_found_re
         ft.Divider(height=10),
         search_controls,
         ft.Divider(height=10),
+        loading_bar,
         posts_list # O ListView para exibir os posts
     )
     
-    # Carrega os posts iniciais (sem filtro)
-    load_and_display_posts(search_field.value, species_dropdown.value, type_dropdown.value)
\ No newline at end of file
+    # Carrega os posts iniciais (sem filtro); logo após o login a primeira
+    # página já veio na mesma unidade de trabalho (views/login_view.py)
+    load_and_display_posts(search_field.value, species_dropdown.value, type_dropdown.value,
+                           first_page=state.pop("home_first_page", None))
\ No newline at end of file
@@ -1,5 +1,24 @@
 import flet as ft
-from models import User, session_scope 
+from models import page_scope_key, unit_of_work
+from services.db_executor import run_in_background
+from services.feed_query import FeedFilter, FEED_PAGE_SIZE, load_feed_page
+from services.user_repository import authenticate
+
+
+def login_and_load_home(page, username, password):
+    """
+    Login e primeira página do feed da home numa única unidade de trabalho
+    (mesma sessão e transação). Roda no pool de banco: a chave da unidade
+    inclui a thread, por isso é calculada aqui.
+
+    :return: (usuário ou None, (filtro, página) para a home ou None)
+    """
+    with unit_of_work(page_scope_key(page)):
+        user = authenticate(username, password)
+        if not user:
+            return None, None
+        filters = FeedFilter.from_form()
+        return user, (filters, load_feed_page(filters, FEED_PAGE_SIZE))
 
 # A assinatura tem 5 argumentos
 def show_login(page, state, go_to_home_func, go_to_register_func, show_snack_func):
@@ -18,27 +37,41 @@ def show_login(page, state, go_to_home_func, go_to_register_func, show_snack_fun
                 page.update() 
                 return
                 
-            try:
-                with session_scope() as s:
-                    user = s.query(User).filter_by(username=uname).first()
-                    
-                    if user and user.check_password(pwd):
-                        # Caminho de SUCESSO
-                        state["current_user"] = {"id": user.id, "username": user.username}
-                        show_snack_func(f"Bem-vindo, {user.username}!")
-                        go_to_home_func() # Navega para a Home
-                    else:
-                        # Caminho de FALHA na autenticação
-                        msg.value = "Usuário ou senha inválidos"
-                        page.update()
-                        
-            except Exception as e:
+            # Consulta (e bcrypt) e carga da home fora da thread do evento; a UI mostra o progresso
+            login_button.disabled = True
+            progress.visible = True
+            msg.value = ""
+            page.update()
+
+            def on_done(result):
+                user, first_page = result
+                login_button.disabled = False
+                progress.visible = False
+                if user:
+                    # Caminho de SUCESSO
+                    state["current_user"] = user
+                    state["home_first_page"] = first_page  # a home usa sem consultar de novo
+                    show_snack_func(f"Bem-vindo, {user['username']}!")
+                    go_to_home_func() # Navega para a Home
+                else:
+                    # Caminho de FALHA na autenticação
+                    msg.value = "Usuário ou senha inválidos"
+                    page.update()
+
+            def on_error(e):
                 print(f"Erro de Login: {e}") 
+                login_button.disabled = False
+                progress.visible = False
                 msg.value = "Ocorreu um erro interno ao tentar logar. Verifique o console."
                 page.update()
 
+            run_in_background(login_and_load_home, page, uname, pwd, on_done=on_done, on_error=on_error)
+
+    login_button = ft.ElevatedButton("Log-in", on_click=do_login)
+    progress = ft.ProgressRing(width=16, height=16, stroke_width=2, visible=False)
+
     page.add(ft.Text("Login", size=20), username, password,
-             ft.Row([ft.ElevatedButton("Log-in", on_click=do_login),
+             ft.Row([login_button, progress,
                      # CORREÇÃO: Envolver go_to_register_func em um lambda para ignorar o evento 'e'
                      ft.TextButton("Não tenho uma conta", on_click=lambda e: go_to_register_func())]), msg)
     page.update()
\ No newline at end of file
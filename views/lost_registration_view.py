@@ -1,46 +1,17 @@
 import flet as ft
 from flet_map import Map
-from flet.security import encrypt, decrypt
+from flet.security import decrypt
 import os
-from database.session import Session
-from database.models import LostAnimal, User
-from views.components.map_component import create_map
-from geopy.geocoders import Nominatim
+from models import LostAnimal, session_scope
+from services.autocomplete import AddressAutocomplete
+from services.db_executor import run_in_background
+from services.geocoding import geocode_address_async, reverse_geocode_async
+from services.file_storage import MAX_IMAGE_BYTES, ImageTooLargeError, save_image_locally
 import re
 
 # Constantes e Variáveis Globais
 APP_SECRET = os.environ.get("APP_SECRET", "super-secret-key-default")
 
-# --- Funções Auxiliares ---
-
-# Função para geocodificar o endereço
-def geocode_address(address, show_snack_func):
-    geolocator = Nominatim(user_agent="LostPetApp")
-    try:
-        location = geolocator.geocode(address)
-        if location:
-            return location.latitude, location.longitude, location.address
-        else:
-            show_snack_func("Localização não encontrada. Tente um endereço mais específico.")
-            return None, None, None
-    except Exception as e:
-        show_snack_func(f"Erro ao geocodificar: {e}")
-        return None, None, None
-
-# Função para reverter a geocodificação (coordenadas para endereço)
-def reverse_geocode(lat, lon, show_snack_func):
-    geolocator = Nominatim(user_agent="LostPetApp")
-    try:
-        location = geolocator.reverse((lat, lon))
-        if location:
-            return location.address
-        else:
-            return f"Lat: {lat}, Lon: {lon}"
-    except Exception as e:
-        show_snack_func(f"Erro ao obter endereço: {e}")
-        return f"Lat: {lat}, Lon: {lon}"
-
-
 # --- Componente Principal da View ---
 
 def show_lost_registration(page, router, show_snack_func, editing_animal=None):
@@ -53,7 +24,7 @@ def show_lost_registration(page, router, show_snack_func, editing_animal=None):
         "current_lon": editing_animal.longitude if editing_animal else -49.278849,
         "initial_zoom": 13 if editing_animal else 13,
         "uploaded_file_name": None,
-        "image_bytes": None,
+        "uploaded_file_path": None,
         "image_url": editing_animal.image_url if editing_animal else None,
     }
 
@@ -97,19 +68,14 @@ def show_lost_registration(page, router, show_snack_func, editing_animal=None):
     def upload_image_and_update_preview(e: ft.FilePickerResultEvent):
         if e.files:
             file = e.files[0]
-            if file.size > 2 * 1024 * 1024: # Limite de 2MB
-                show_snack_func("A imagem é muito grande. Tamanho máximo: 2MB.")
+            if file.size > MAX_IMAGE_BYTES: # Aviso imediato; o limite vale de novo ao salvar
+                show_snack_func(f"A imagem é muito grande. Tamanho máximo: {MAX_IMAGE_BYTES // (1024 * 1024)}MB.")
                 return
 
-            with open(file.path, "rb") as f:
-                state["image_bytes"] = f.read()
-            
-            # O Flet precisa de um path local para exibir a imagem, mesmo que
-            # seja temporário. Como não podemos salvar arquivos no servidor
-            # de forma persistente, vamos usar um hack: salvar os bytes e
-            # usar o FilePickerResultEvent.path como src temporário.
-            # No Flet Web, o path é um link temporário já carregado pelo navegador.
-            
+            # Só o caminho é guardado; os bytes vão do arquivo direto para o
+            # store de imagens, em blocos, ao salvar o post
+            state["uploaded_file_path"] = file.path
+
             preview_image.src = file.path
             state["uploaded_file_name"] = file.name
             upload_status.value = f"Pronto para enviar: {file.name}"
@@ -146,10 +112,6 @@ def show_lost_registration(page, router, show_snack_func, editing_animal=None):
         lat_field.value = f"{new_lat:.6f}"
         lon_field.value = f"{new_lon:.6f}"
 
-        # Geocodifica e atualiza o campo de endereço
-        new_address = reverse_geocode(new_lat, new_lon, show_snack_func)
-        location.value = new_address
-
         # Atualiza o marcador
         state["current_map"].controls.clear()
         state["current_map"].controls.append(
@@ -161,24 +123,37 @@ def show_lost_registration(page, router, show_snack_func, editing_animal=None):
         )
         page.update()
 
+        # O endereço chega depois, pelo cliente de geocodificação compartilhado
+        # (cache, limite de taxa e métricas); ignora se o usuário já clicou
+        # em outro ponto
+        def fill_address(address):
+            if (state["current_lat"], state["current_lon"]) != (new_lat, new_lon):
+                return
+            location.value = address or f"Lat: {new_lat}, Lon: {new_lon}"
+            page.update()
+
+        reverse_geocode_async(new_lat, new_lon, callback=fill_address, caller="lost_registration")
+
     def geocode_and_update_map(address):
         if not address:
             return
-            
-        lat, lon, full_address = geocode_address(address, show_snack_func)
-        
-        if lat is not None and lon is not None:
+
+        def apply_coords(coords):
+            lat, lon = coords
+            if location.value != address:
+                return  # o endereço mudou enquanto a resposta vinha
+            if lat is None or lon is None:
+                show_snack_func("Localização não encontrada. Tente um endereço mais específico.")
+                return
+
             # Atualiza o estado
             state["current_lat"] = lat
             state["current_lon"] = lon
-            
+
             # Atualiza os campos Lat/Lon
             lat_field.value = f"{lat:.6f}"
             lon_field.value = f"{lon:.6f}"
-            
-            # Atualiza o campo de endereço (com o endereço completo do geocoder)
-            location.value = full_address
-            
+
             # Atualiza o mapa
             state["current_map"].center = ft.LatLng(lat, lon)
             state["current_map"].controls.clear()
@@ -190,9 +165,51 @@ def show_lost_registration(page, router, show_snack_func, editing_animal=None):
                 )
             )
             page.update()
-        else:
-            location.value = address # Mantém o valor original se a geocodificação falhar
-            page.update()
+
+        geocode_address_async(address, callback=apply_coords, caller="lost_registration")
+
+    # --- Autocomplete do Endereço ---
+    # Sugestões locais (gazetteer + endereços já resolvidos), sem rede
+
+    address_suggestions = ft.Column(spacing=0, visible=False)
+
+    def pick_suggestion(suggestion):
+        autocomplete.cancel()
+        address_suggestions.controls.clear()
+        address_suggestions.visible = False
+
+        state["current_lat"] = suggestion.lat
+        state["current_lon"] = suggestion.lon
+        location.value = suggestion.label
+        lat_field.value = f"{suggestion.lat:.6f}"
+        lon_field.value = f"{suggestion.lon:.6f}"
+
+        if state["current_map"]:
+            state["current_map"].center = ft.LatLng(suggestion.lat, suggestion.lon)
+            state["current_map"].controls.clear()
+            state["current_map"].controls.append(
+                ft.MapMarker(
+                    latitude=suggestion.lat,
+                    longitude=suggestion.lon,
+                    content=ft.Icon(ft.icons.LOCATION_ON, color=ft.colors.RED_600, size=40),
+                )
+            )
+        page.update()
+
+    def show_suggestions(suggestions):
+        address_suggestions.controls = [
+            ft.ListTile(
+                title=ft.Text(sug.label, size=12),
+                dense=True,
+                on_click=lambda e, sug=sug: pick_suggestion(sug),
+            )
+            for sug in suggestions
+        ]
+        address_suggestions.visible = bool(suggestions)
+        page.update()
+
+    autocomplete = AddressAutocomplete(show_suggestions)
+    location.on_change = lambda e: autocomplete.update(location.value or "")
 
     # --- Funções de Submissão ---
 
@@ -222,87 +239,131 @@ def show_lost_registration(page, router, show_snack_func, editing_animal=None):
         cur_user_data = decrypt(token, APP_SECRET).split("|")
         cur = {"id": int(cur_user_data[0]), "username": cur_user_data[1]}
         
-        image_url = state["image_url"]
-
-        # Se houver uma nova imagem em bytes, faz o upload (em um ambiente real)
-        # Por enquanto, se houver bytes, criptografamos e usamos como URL temporário
-        if state["image_bytes"]:
-            # Em um ambiente real, você faria upload para S3/Firebase Storage aqui.
-            # Por simplicidade e restrições do ambiente, vamos apenas criptografar os bytes
-            # e usá-los como um URL "falso" para persistência no banco de dados.
-            # Isso é uma simulação, pois não podemos salvar arquivos no servidor.
-            try:
-                encrypted_bytes = encrypt(state["image_bytes"].decode('latin-1'), APP_SECRET)
-                image_url = f"flet-bytes-encoded:{state['uploaded_file_name']}|{encrypted_bytes}"
-            except Exception as ex:
-                show_snack_func(f"Erro ao processar imagem: {ex}", color=ft.colors.RED_500)
-                return
-
-        with Session() as s:
-            if state["is_editing"]:
-                # --- Modo Edição ---
-                animal_to_update = s.query(LostAnimal).filter_by(id=state["editing_animal_id"], owner_id=cur["id"]).first()
-                if animal_to_update:
-                    animal_to_update.name = name.value
-                    animal_to_update.species = species.value
-                    animal_to_update.lost_location = location.value
-                    animal_to_update.desc_animal = desc.value
-                    animal_to_update.contact = contact.value
-                    animal_to_update.latitude = state["current_lat"]
-                    animal_to_update.longitude = state["current_lon"]
+        # Valores lidos na thread do evento; store da imagem (hash, cópia,
+        # derivadas WebP, dHash) e gravação no banco rodam no pool de
+        # background (services.db_executor), como em found_registration_view
+        form = {
+            "name": name.value,
+            "species": species.value,
+            "location": location.value,
+            "description": desc.value,
+            "contact": contact.value,
+            "lat": state["current_lat"],
+            "lon": state["current_lon"],
+        }
+        image_source = (state["uploaded_file_path"], state["uploaded_file_name"])
+        current_image_url = state["image_url"]
+        is_editing, editing_id = state["is_editing"], state["editing_animal_id"]
+
+        def persist():
+            image_url = current_image_url
+
+            # Nova imagem: gravada em arquivo pelo services/file_storage (leitura
+            # em blocos com limite de tamanho); no banco fica só a URL curta
+            path_chosen, name_chosen = image_source
+            if path_chosen:
+                try:
+                    image_url = save_image_locally(path_chosen, name_chosen)
+                except ImageTooLargeError:
+                    return "too_large"
+                if not image_url:
+                    return "bad_image"
+
+            with session_scope() as s:
+                if is_editing:
+                    # --- Modo Edição ---
+                    animal_to_update = s.query(LostAnimal).filter_by(id=editing_id, owner_id=cur["id"]).first()
+                    if not animal_to_update:
+                        return "not_found"
+                    animal_to_update.name = form["name"]
+                    animal_to_update.species = form["species"]
+                    animal_to_update.lost_location = form["location"]
+                    animal_to_update.desc_animal = form["description"]
+                    animal_to_update.contact = form["contact"]
+                    animal_to_update.latitude = form["lat"]
+                    animal_to_update.longitude = form["lon"]
                     animal_to_update.image_url = image_url # Atualiza a URL (mesmo que seja a antiga ou a nova)
-                    
-                    s.commit()
-                    show_snack_func("Animal perdido atualizado!")
-                    router.go("/profile") # Volta para o perfil
-                else:
-                    show_snack_func("Erro: Animal não encontrado ou você não é o dono.", color=ft.colors.RED_500)
+                    return "updated"
 
-            else:
                 # --- Modo Novo Registro ---
-                new_post = LostAnimal(
-                    name=name.value,
-                    species=species.value,
-                    lost_location=location.value,
-                    desc_animal=desc.value,
-                    contact=contact.value,
-                    latitude=state["current_lat"],
-                    longitude=state["current_lon"],
+                s.add(LostAnimal(
+                    name=form["name"],
+                    species=form["species"],
+                    lost_location=form["location"],
+                    desc_animal=form["description"],
+                    contact=form["contact"],
+                    latitude=form["lat"],
+                    longitude=form["lon"],
                     image_url=image_url,
                     owner_id=cur["id"]
-                )
-
-                s.add(new_post)
-                s.commit()
-
+                ))
+            return "created"
+
+        def on_done(outcome):
+            set_saving(False)
+            if outcome == "too_large":
+                show_snack_func("A imagem é muito grande.", color=ft.colors.RED_500)
+            elif outcome == "bad_image":
+                show_snack_func("Erro ao salvar a imagem. Use JPG, PNG ou GIF.", color=ft.colors.RED_500)
+            elif outcome == "not_found":
+                show_snack_func("Erro: Animal não encontrado ou você não é o dono.", color=ft.colors.RED_500)
+            elif outcome == "updated":
+                show_snack_func("Animal perdido atualizado!")
+                router.go("/profile") # Volta para o perfil
+            else:
                 show_snack_func("Animal perdido registrado!")
+                reset_form()
+
+        def on_error(ex):
+            set_saving(False)
+            print(f"Erro ao salvar animal perdido: {ex}")
+            show_snack_func(f"Erro ao salvar: {ex}", color=ft.colors.RED_500)
+
+        set_saving(True)
+        run_in_background(persist, on_done=on_done, on_error=on_error)
+
+    def reset_form():
+        # resetar campos após sucesso
+        name.value = ""
+        species.value = ""
+        location.value = ""
+        desc.value = ""
+        contact.value = ""
+        lat_field.value = str(state["current_lat"]) # Mantém o último lat/lon, mas limpa a UI
+        lon_field.value = str(state["current_lon"])
+        preview_image.src = "https://placehold.co/150x150/EEEEEE/888888?text=Sem+Imagem"
+        upload_status.value = "Nenhuma imagem selecionada."
+
+        # Reseta o estado da imagem
+        state["uploaded_file_path"] = None
+        state["uploaded_file_name"] = None
+        state["image_url"] = None
+
+        # Recria o componente da imagem para forçar a atualização da URL
+        image_preview.content = ft.Image(
+            src="https://placehold.co/150x150/EEEEEE/888888?text=Sem+Imagem",
+            width=150,
+            height=150,
+            fit=ft.ImageFit.COVER,
+            border_radius=ft.border_radius.all(10)
+        )
 
-                # resetar campos após sucesso
-                name.value = ""
-                species.value = ""
-                location.value = ""
-                desc.value = ""
-                contact.value = ""
-                lat_field.value = str(state["current_lat"]) # Mantém o último lat/lon, mas limpa a UI
-                lon_field.value = str(state["current_lon"])
-                preview_image.src = "https://placehold.co/150x150/EEEEEE/888888?text=Sem+Imagem"
-                upload_status.value = "Nenhuma imagem selecionada."
-                
-                # Reseta o estado da imagem
-                state["image_bytes"] = None
-                state["uploaded_file_name"] = None
-                state["image_url"] = None
-                
-                # Recria o componente da imagem para forçar a atualização da URL
-                image_preview.content = ft.Image(
-                    src="https://placehold.co/150x150/EEEEEE/888888?text=Sem+Imagem",
-                    width=150,
-                    height=150,
-                    fit=ft.ImageFit.COVER,
-                    border_radius=ft.border_radius.all(10)
-                )
+        page.update()
 
-                page.update()
+    def set_saving(flag):
+        save_button.disabled = flag
+        saving_progress.visible = flag
+        page.update()
+
+    save_button = ft.ElevatedButton(
+        text="Salvar" if state["is_editing"] else "Registrar Perda",
+        icon=ft.icons.SAVE if state["is_editing"] else ft.icons.PETS,
+        on_click=save_post,
+        bgcolor=ft.colors.PRIMARY,
+        color=ft.colors.WHITE,
+        style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=10))
+    )
+    saving_progress = ft.ProgressRing(width=16, height=16, stroke_width=2, visible=False)
 
     # Layout da View
     page_content = ft.Container(
@@ -379,6 +440,7 @@ def show_lost_registration(page, router, show_snack_func, editing_animal=None):
                         )
                     ]
                 ),
+                address_suggestions,
 
                 # Campos Lat/Lon (Ocultos ou Apenas Leitura)
                 ft.Row(
@@ -416,14 +478,8 @@ def show_lost_registration(page, router, show_snack_func, editing_animal=None):
                 # Botões de Ação
                 ft.Row(
                     [
-                        ft.ElevatedButton(
-                            text="Salvar" if state["is_editing"] else "Registrar Perda",
-                            icon=ft.icons.SAVE if state["is_editing"] else ft.icons.PETS,
-                            on_click=save_post,
-                            bgcolor=ft.colors.PRIMARY,
-                            color=ft.colors.WHITE,
-                            style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=10))
-                        ),
+                        save_button,
+                        saving_progress,
                         ft.TextButton(
                             text="Cancelar",
                             on_click=lambda e: router.go("/profile") if state["is_editing"] else router.go("/"),
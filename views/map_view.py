@@ -1,7 +1,15 @@
 import flet as ft
 import flet_map as fmap
 from math import radians, sin, cos, sqrt, atan2
-from models import session_scope
+from services.post_repository import posts_in_bbox
+from services.projections import MapPoint
+
+DEFAULT_CENTER = (-25.4284, -49.2733)
+DEFAULT_ZOOM = 13
+# fração extra do viewport carregada ao redor da área visível
+VIEWPORT_MARGIN = 0.5
+# teto de marcadores por tipo (perdido/encontrado) em zoom muito aberto
+MAX_MARKERS_PER_KIND = 2000
 
 
 # distância em metros entre duas coordenadas
@@ -16,6 +24,27 @@ def distance_m(lat1, lon1, lat2, lon2):
     return R * c
 
 
+# bbox aproximado (min_lat, min_lon, max_lat, max_lon) visível no mapa
+# Web Mercator: 256px por tile, 2**zoom tiles na largura do mundo
+def viewport_bbox(lat, lon, zoom, width_px, height_px, margin=VIEWPORT_MARGIN):
+    deg_per_px = 360.0 / (256 * 2 ** zoom)
+    half_lon = width_px / 2 * deg_per_px * (1 + margin)
+    half_lat = height_px / 2 * deg_per_px * cos(radians(lat)) * (1 + margin)
+    return (
+        max(lat - half_lat, -90.0),
+        max(lon - half_lon, -180.0),
+        min(lat + half_lat, 90.0),
+        min(lon + half_lon, 180.0),
+    )
+
+
+def bbox_contains(outer, inner):
+    if outer is None:
+        return False
+    return (outer[0] <= inner[0] and outer[1] <= inner[1]
+            and outer[2] >= inner[2] and outer[3] >= inner[3])
+
+
 def show_map(page: ft.Page, state: dict, route_logics: dict):
     """
     page: flet page
@@ -29,33 +58,7 @@ def show_map(page: ft.Page, state: dict, route_logics: dict):
     state["picked_coords"] = state.get("picked_coords", None)
 
     # ---------------------------------------------------------
-    # 1) ler e serializar tudo o que precisamos do banco (dentro da sessão)
-    #    para evitar DetachedInstanceError
-    # ---------------------------------------------------------
-    lost_rows = []
-    found_rows = []
-    with session_scope() as s:
-        # só puxar os campos primários que usaremos
-        for r in s.query(__import__("models").LostAnimal).all():
-            lost_rows.append({
-                "id": r.id,
-                "name": getattr(r, "name", None),
-                "species": getattr(r, "species", None),
-                "desc": getattr(r, "desc_animal", None),
-                "lat": float(r.latitude) if r.latitude is not None else None,
-                "lon": float(r.longitude) if r.longitude is not None else None,
-            })
-        for r in s.query(__import__("models").FoundReport).all():
-            found_rows.append({
-                "id": r.id,
-                "species": getattr(r, "species", None),
-                "desc": getattr(r, "found_description", None),
-                "lat": float(r.latitude) if r.latitude is not None else None,
-                "lon": float(r.longitude) if r.longitude is not None else None,
-            })
-
-    # ---------------------------------------------------------
-    # 2) construir marcadores (sempre novos — evita duplicação)
+    # 1) construir marcadores (sempre novos — evita duplicação)
     #    cada Marker tem `content` que é um controle Flet com on_click
     # ---------------------------------------------------------
     markers = []
@@ -73,77 +76,61 @@ def show_map(page: ft.Page, state: dict, route_logics: dict):
     # lista de objetos para usar na detecção por distância (clicar em marcador)
     marker_info_list = []
 
-    for item in lost_rows:
-        if item["lat"] is None or item["lon"] is None:
-            continue
-        info = {
-            "type": "lost",
-            "id": item["id"],
-            "name": item["name"],
-            "species": item["species"],
-            "desc": item["desc"],
-            "lat": item["lat"],
-            "lon": item["lon"],
-        }
-        # cria container e associa on_click
-        container = make_icon_container(ft.Icons.PETS, ft.Colors.RED, size=26)
-
-        # handler local (closure) para abrir popup com as informações
-        def make_click_handler(info):
-            def _on_click(e: ft.ControlEvent):
-                open_info_popup(info)
-            return _on_click
-
-        container.on_click = make_click_handler(info)
-
-        # cria Marker do flet_map
-        markers.append(
-            fmap.Marker(
-                content=container,
-                coordinates=fmap.MapLatitudeLongitude(info["lat"], info["lon"])
+    # handler local (closure) para abrir popup com as informações
+    def make_click_handler(info):
+        def _on_click(e: ft.ControlEvent):
+            open_info_popup(info)
+        return _on_click
+
+    def build_markers(rows):
+        markers.clear()
+        marker_info_list.clear()
+        for info in rows:
+            if info.lat is None or info.lon is None:
+                continue
+            if info.kind == "lost":
+                container = make_icon_container(ft.Icons.PETS, ft.Colors.RED, size=26)
+            else:
+                container = make_icon_container(ft.Icons.LOCATION_ON, ft.Colors.GREEN, size=26)
+            container.on_click = make_click_handler(info)
+
+            # cria Marker do flet_map
+            markers.append(
+                fmap.Marker(
+                    content=container,
+                    coordinates=fmap.MapLatitudeLongitude(info.lat, info.lon)
+                )
             )
-        )
+            marker_info_list.append(info)
 
-        marker_info_list.append(info)
-
-    for item in found_rows:
-        if item["lat"] is None or item["lon"] is None:
-            continue
-        info = {
-            "type": "found",
-            "id": item["id"],
-            "name": None,
-            "species": item["species"],
-            "desc": item["desc"],
-            "lat": item["lat"],
-            "lon": item["lon"],
-        }
-        container = make_icon_container(ft.Icons.LOCATION_ON, ft.Colors.GREEN, size=26)
-        def make_click_handler(info):
-            def _on_click(e: ft.ControlEvent):
-                open_info_popup(info)
-            return _on_click
-        container.on_click = make_click_handler(info)
-
-        markers.append(
-            fmap.Marker(
-                content=container,
-                coordinates=fmap.MapLatitudeLongitude(info["lat"], info["lon"])
-            )
-        )
-        marker_info_list.append(info)
+    # ---------------------------------------------------------
+    # 2) ler do banco apenas os posts na área visível (+ margem)
+    #    via índice espacial — o resultado já vem como MapPoint (sem ORM)
+    # ---------------------------------------------------------
+    loaded = {"bbox": None}
+
+    def viewport_size():
+        return (page.width or 1000), (page.height or 700)
+
+    def load_viewport(lat, lon, zoom):
+        width, height = viewport_size()
+        bbox = viewport_bbox(lat, lon, zoom, width, height)
+        build_markers(posts_in_bbox(*bbox, limit=MAX_MARKERS_PER_KIND))
+        loaded["bbox"] = bbox
+
+    load_viewport(DEFAULT_CENTER[0], DEFAULT_CENTER[1], DEFAULT_ZOOM)
 
     # ---------------------------------------------------------
     # 3) função que abre um AlertDialog com os detalhes do item
     # ---------------------------------------------------------
-    def open_info_popup(info: dict):
+    def open_info_popup(info: MapPoint):
         # monta colunas com os campos que temos
         rows = []
-        rows.append(ft.Text(f"Tipo: {'Perdido' if info['type']=='lost' else 'Encontrado'}"))
-        if info.get("name"):
-            rows.append(ft.Text(f"Nome: {info['name']}"))
-        rows.append(ft.Text(f"Espécie: {info.get('species', '—')}"))
-        rows.append(ft.Text(f"Descrição: {info.get('desc', '—')}"))
+        rows.append(ft.Text(f"Tipo: {'Perdido' if info.kind=='lost' else 'Encontrado'}"))
+        if info.name:
+            rows.append(ft.Text(f"Nome: {info.name}"))
+        rows.append(ft.Text(f"Espécie: {info.species or '—'}"))
+        rows.append(ft.Text(f"Descrição: {info.description or '—'}"))
 
         # ação de "ver post completo" — tenta usar route_logics se existir
         def on_view_full(e):
@@ -153,14 +140,14 @@ def show_map(page: ft.Page, state: dict, route_logics: dict):
             # se você tiver uma rota para posts (ex: 'lost_post' / 'found_post'), chame-a
             # aqui estamos seguindo sua convenção de rotas: route_logics é um dicionário.
             # caso não exista rota, apenas mostra um aviso.
-            if info["type"] == "lost":
+            if info.kind == "lost":
                 # exemplo: setar estado e tentar chamar rota (descomente se tiver rota)
-                state["view_lost_post_id"] = info["id"]
+                state["view_lost_post_id"] = info.id
                 if "view_lost_post" in route_logics:
                     route_logics["view_lost_post"]()
                     return
             else:
-                state["view_found_post_id"] = info["id"]
+                state["view_found_post_id"] = info.id
                 if "view_found_post" in route_logics:
                     route_logics["view_found_post"]()
                     return
@@ -201,7 +188,7 @@ def show_map(page: ft.Page, state: dict, route_logics: dict):
 
         # tenta detectar clique em marcador (proximidade em metros)
         for mk in marker_info_list:
-            d = distance_m(lat, lon, mk["lat"], mk["lon"])
+            d = distance_m(lat, lon, mk.lat, mk.lon)
             if d < 20:  # threshold (m) — ajuste se quiser
                 open_info_popup(mk)
                 return
@@ -211,17 +198,28 @@ def show_map(page: ft.Page, state: dict, route_logics: dict):
         page.snack_bar.open = True
         page.update()
 
+    def handle_position_change(e):
+        # recarrega só quando a área visível sai da região já carregada
+        width, height = viewport_size()
+        visible = viewport_bbox(e.coordinates.latitude, e.coordinates.longitude, e.zoom, width, height, margin=0)
+        if bbox_contains(loaded["bbox"], visible):
+            return
+        load_viewport(e.coordinates.latitude, e.coordinates.longitude, e.zoom)
+        marker_layer.markers = list(markers)
+        page.update()
+
     # ---------------------------------------------------------
     # 5) camadas e mapa
     # ---------------------------------------------------------
     tile_layer = fmap.TileLayer(url_template="https://tile.openstreetmap.org/{z}/{x}/{y}.png")
-    marker_layer = fmap.MarkerLayer(markers=markers)
+    marker_layer = fmap.MarkerLayer(markers=list(markers))
     m = fmap.Map(
         layers=[tile_layer, marker_layer],
-        initial_center=fmap.MapLatitudeLongitude(-25.4284, -49.2733),
-        initial_zoom=13,
+        initial_center=fmap.MapLatitudeLongitude(*DEFAULT_CENTER),
+        initial_zoom=DEFAULT_ZOOM,
         expand=True,
         on_tap=handle_map_tap,
+        on_position_change=handle_position_change,
     )
 
     # ---------------------------------------------------------
@@ -1,5 +1,7 @@
 import flet as ft
-from models import LostAnimal, FoundReport, session_scope 
+from services.post_repository import user_posts
+from services.image_pipeline import variant_url
+from services.image_server import image_src
 from functools import partial
 from urllib.parse import quote 
 
@@ -51,7 +53,8 @@ def build_post_card(page: ft.Page, title, location_text, description, lat, lon,
 
     # Imagem do Animal
     if image_url:
-        main_image = ft.Image(src=image_url, width=200, height=200, fit=ft.ImageFit.COVER, border_radius=ft.border_radius.all(5))
+        # Derivada WebP do tamanho do card, quando existir, pelo servidor de imagens
+        main_image = ft.Image(src=image_src(variant_url(image_url, "card")), width=200, height=200, fit=ft.ImageFit.COVER, border_radius=ft.border_radius.all(5))
         
     else:
         # Imagem do Mapa Estático (Fallback)
@@ -106,79 +109,55 @@ def show_my_posts(page, state, go_to_home_func, create_edit_handler_func, create
     my_lost_list = ft.ListView(expand=1, spacing=10, padding=20)
     my_found_list = ft.ListView(expand=1, spacing=10, padding=20)
 
-    # Listas para armazenar dados desconectados da sessão
-    lost_animals_data = []
-    found_reports_data = []
-
     try:
-        # ---- 1. Carregamento dos Dados (Dentro da Sessão) ----
-        with session_scope() as s:
-            
-            # Posts de Animais Perdidos
-            for a in s.query(LostAnimal).filter_by(owner_id=cur["id"]).all():
-                # Conversão para dicionário para desanexar da sessão
-                lost_animals_data.append({
-                    'id': a.id,
-                    'name': a.name,
-                    'location': a.lost_location,
-                    'desc': a.desc_animal,
-                    'lat': a.latitude,
-                    'lon': a.longitude,
-                    'image_url': a.image_url
-                })
-
-            # Relatos de Animais Encontrados
-            for r in s.query(FoundReport).filter_by(finder_id=cur["id"]).all():
-                # Conversão para dicionário para desanexar da sessão
-                found_reports_data.append({
-                    'id': r.id,
-                    'species': r.species,
-                    'location': r.found_location,
-                    'desc': r.found_description,
-                    'lat': r.latitude,
-                    'lon': r.longitude,
-                    'image_url': r.image_url
-                })
-        
+        # ---- 1. Carregamento dos Dados ----
+        # Uma única consulta à view `posts` (perdidos + encontrados), já em PostSummary;
+        # após uma exclusão a lista já vem consultada (app._handle_delete_post_logic)
+        user_posts_data = state.pop("my_posts_data", None)
+        if user_posts_data is None:
+            user_posts_data = user_posts(cur["id"])
+        lost_animals_data = [p for p in user_posts_data if p.kind == "lost"]
+        found_reports_data = [p for p in user_posts_data if p.kind == "found"]
+
         # ---- 2. Construção da UI (Fora da Sessão) ----
         
         # Posts de Animais Perdidos
         for a in lost_animals_data:
-            edit_handler = create_edit_handler_func(item_id=a['id'], is_lost=True)
-            delete_handler = create_delete_handler_func(item_id=a['id'], is_lost=True)
+            edit_handler = create_edit_handler_func(item_id=a.id, is_lost=True)
+            delete_handler = create_delete_handler_func(item_id=a.id, is_lost=True)
             
             card = build_post_card(
                 page, 
-                title=a['name'] or "Animal perdido", 
-                location_text=a['location'], 
-                description=a['desc'], 
-                lat=a['lat'], 
-                lon=a['lon'], 
+                title=a.name or "Animal perdido", 
+                location_text=a.location, 
+                description=a.description, 
+                lat=a.lat, 
+                lon=a.lon, 
                 is_lost=True, 
-                item_id=a['id'],
+                item_id=a.id,
                 on_edit_click=edit_handler,     
                 on_delete_click=delete_handler,
-                image_url=a['image_url'] 
+                image_url=a.image_url 
             )
             my_lost_list.controls.append(card)
 
         # Relatos de Animais Encontrados
         for r in found_reports_data:
-            edit_handler = create_edit_handler_func(item_id=r['id'], is_lost=False)
-            delete_handler = create_delete_handler_func(item_id=r['id'], is_lost=False)
+            edit_handler = create_edit_handler_func(item_id=r.id, is_lost=False)
+            delete_handler = create_delete_handler_func(item_id=r.id, is_lost=False)
 
             card = build_post_card(
                 page, 
-                title=f"{r['species'] or 'Animal'} encontrado", 
-                location_text=r['location'], 
-                description=r['desc'], 
-                lat=r['lat'], 
-                lon=r['lon'], 
+                title=f"{r.species or 'Animal'} encontrado", 
+                location_text=r.location, 
+                description=r.description, 
+                lat=r.lat, 
+                lon=r.lon, 
                 is_lost=False, 
-                item_id=r['id'],
+                item_id=r.id,
                 on_edit_click=edit_handler,     
                 on_delete_click=delete_handler,
-                image_url=r['image_url'] 
+                image_url=r.image_url 
             )
             my_found_list.controls.append(card)
 